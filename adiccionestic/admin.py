@@ -1,15 +1,20 @@
-from django.contrib import admin
+from django.contrib import admin, messages
 from django.http import HttpResponse
-from django.urls import path
-from django.shortcuts import render
+from django.urls import path, reverse
+from django.shortcuts import render, redirect
 from django.utils.html import format_html
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
 from datetime import datetime
 from .models import (
     Participant, BergenTikTok, BergenInstagram,
-    UCLALoneliness, PrefrontalSymptoms, CAIDS
+    UCLALoneliness, PrefrontalSymptoms, CAIDS, EmailOutbox, StatisticsCounter, CircuitBreaker, ExportJob
 )
+from .exports import ExcelExport, XLSX_CONTENT_TYPE
+from .emails import queue_feedback_emails
+from .export_jobs import queue_export_job
+from .resend import unsent_participants
+
+# Larger admin exports are handed to run_export_worker
+ADMIN_SYNC_EXPORT_LIMIT = 500
 
 
 class ParticipantAdmin(admin.ModelAdmin):
@@ -17,7 +22,7 @@ class ParticipantAdmin(admin.ModelAdmin):
     search_fields = ['email', 'country', 'university']
     list_filter = ['location', 'gender', 'marital_status', 'residence_sector', 'socioeconomic_level', 'consent_accepted', 'feedback_sent', 'created_at']
     readonly_fields = ['created_at', 'updated_at', 'consent_date']
-    actions = ['export_to_excel_action']
+    actions = ['export_to_excel_action', 'resend_feedback_action']
     
     fieldsets = (
         ('Contact Information', {
@@ -54,9 +59,27 @@ class ParticipantAdmin(admin.ModelAdmin):
     
     def export_to_excel_action(self, request, queryset):
         """Admin action to export selected participants to Excel"""
+        if queryset.count() > ADMIN_SYNC_EXPORT_LIMIT:
+            ids = list(queryset.values_list('id', flat=True))
+            return self.queue_background_export(request, ids=ids)
         return self.export_participants_to_excel(queryset)
     
     export_to_excel_action.short_description = "Export selected participants to Excel"
+
+    def resend_feedback_action(self, request, queryset):
+        """Admin action to queue feedback for the selected participants that have not received it.
+
+        Delivery is left to run_email_worker, so the request never waits on Mailgun.
+        """
+        participants = list(unsent_participants(queryset))
+        queue_feedback_emails(participants)
+        self.message_user(
+            request,
+            f'{len(participants)} feedback emails queued for run_email_worker.',
+            messages.INFO,
+        )
+
+    resend_feedback_action.short_description = "Queue feedback email for selected participants"
     
     def get_urls(self):
         urls = super().get_urls()
@@ -72,336 +95,32 @@ class ParticipantAdmin(admin.ModelAdmin):
         
         if participant_id:
             queryset = Participant.objects.filter(id=participant_id)
-        else:
-            queryset = Participant.objects.all()
-        
-        return self.export_participants_to_excel(queryset)
-    
+            return self.export_participants_to_excel(queryset)
+
+        return self.queue_background_export(request)
+
     def export_all_view(self, request):
-        """Export all participants"""
-        queryset = Participant.objects.all()
-        return self.export_participants_to_excel(queryset)
+        """Export all participants in the background"""
+        return self.queue_background_export(request)
+
+    def queue_background_export(self, request, **filters):
+        """Queue an export job and send the user to its status page"""
+        job = queue_export_job(**filters)
+        self.message_user(
+            request,
+            'Export queued. It will be available for download here once run_export_worker finishes it.',
+            messages.INFO,
+        )
+        return redirect(reverse('admin:adiccionestic_exportjob_change', args=[job.pk]))
     
     def export_participants_to_excel(self, queryset):
         """Generate Excel file with all survey data"""
-        # Create workbook
-        wb = openpyxl.Workbook()
-        
-        # Remove default sheet
-        wb.remove(wb.active)
-        
-        # Create sheets for each data type
-        self._create_participants_sheet(wb, queryset)
-        self._create_bergen_tiktok_sheet(wb, queryset)
-        self._create_bergen_instagram_sheet(wb, queryset)
-        self._create_ucla_loneliness_sheet(wb, queryset)
-        self._create_prefrontal_symptoms_sheet(wb, queryset)
-        self._create_caids_sheet(wb, queryset)
-        self._create_summary_sheet(wb, queryset)
-        
-        # Prepare response
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        response = HttpResponse(content_type=XLSX_CONTENT_TYPE)
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
         response['Content-Disposition'] = f'attachment; filename=survey_data_{timestamp}.xlsx'
-        
-        # Save workbook to response
-        wb.save(response)
+
+        ExcelExport(queryset).save(response)
         return response
-    
-    def _create_participants_sheet(self, wb, queryset):
-        """Create sheet with participant demographic data"""
-        ws = wb.create_sheet("Participants")
-        
-        # Headers
-        headers = [
-            'Email', 'Location', 'Country', 'Age', 'Gender', 'Gender Other',
-            'Living With', 'Living With Other', 'University', 'Career',
-            'Current Semester', 'Marital Status', 'GPA Last Semester',
-            'Repeated Cycles', 'Repeated Cycles Count', 'Residence Sector',
-            'Socioeconomic Level', 'Income Sources', 
-             'uses_conversational_ai', 'ai_daily_hours_weekday', 'ai_daily_hours_weekend', 'ai_start_age', 'ai_use_purpose',
-             'has_tiktok_account', 'tiktok_daily_hours_weekday', 'tiktok_daily_hours_weekend', 'tiktok_start_age',
-             'has_instagram_account', 'instagram_daily_hours_weekday', 'instagram_daily_hours_weekend', 'instagram_start_age',
-             'parents_control_screen_time', 'has_stable_friend_group', 'has_frequent_positive_communication', 'participates_in_social_activities',
-              'Consent Accepted',
-            'Consent Date', 'Feedback Sent', 'Created At'
-        ]
-        
-        self._write_header_row(ws, headers)
-        
-        # Data
-        for participant in queryset:
-            row = [
-                participant.email,
-                participant.get_location_display(),
-                participant.country or '',
-                participant.age or '',
-                participant.get_gender_display() if participant.gender else '',
-                participant.gender_other or '',
-                participant.get_living_with_display() if participant.living_with else '',
-                participant.living_with_other or '',
-                participant.university or '',
-                participant.career or '',
-                participant.get_current_semester_display() if participant.current_semester else '',
-                participant.get_marital_status_display() if participant.marital_status else '',
-                float(participant.gpa_last_semester) if participant.gpa_last_semester else '',
-                'Sí' if participant.repeated_cycles else 'No',
-                participant.repeated_cycles_count or '',
-                participant.get_residence_sector_display() if participant.residence_sector else '',
-                participant.get_socioeconomic_level_display() if participant.socioeconomic_level else '',
-                participant.income_sources or '',
-                'Yes' if participant.uses_conversational_ai else 'No',
-                participant.ai_daily_hours_weekday if participant.uses_conversational_ai else '',
-                participant.ai_daily_hours_weekend if participant.uses_conversational_ai else '',
-                participant.ai_start_age if participant.uses_conversational_ai else '',
-                participant.ai_use_purpose if participant.uses_conversational_ai else '',
-                'Yes' if participant.has_tiktok_account else 'No',
-                participant.tiktok_daily_hours_weekday if participant.has_tiktok_account else '',
-                participant.tiktok_daily_hours_weekend if participant.has_tiktok_account else '',
-                participant.tiktok_start_age if participant.has_tiktok_account else '',
-                'Yes' if participant.has_instagram_account else 'No',
-                participant.instagram_daily_hours_weekday if participant.has_instagram_account else '',
-                participant.instagram_daily_hours_weekend if participant.has_instagram_account else '',
-                participant.instagram_start_age if participant.has_instagram_account else '',
-                'Yes' if participant.parents_control_screen_time else 'No',
-                'Yes' if participant.has_stable_friend_group else 'No',
-                'Yes' if participant.has_frequent_positive_communication else 'No',
-                'Yes' if participant.participates_in_social_activities else 'No',
-                
-                'Sí' if participant.consent_accepted else 'No',
-                participant.consent_date.strftime('%Y-%m-%d %H:%M:%S') if participant.consent_date else '',
-                'Sí' if participant.feedback_sent else 'No',
-                participant.created_at.strftime('%Y-%m-%d %H:%M:%S') if participant.created_at else '',
-            ]
-            ws.append(row)
-        
-        self._auto_adjust_column_width(ws)
-    
-    def _create_bergen_tiktok_sheet(self, wb, queryset):
-        """Create sheet for Bergen TikTok data"""
-        ws = wb.create_sheet("Bergen TikTok")
-        
-        headers = [
-            'Email', 'Q1 Salience', 'Q2 Tolerance', 'Q3 Mood Modification',
-            'Q4 Relapse', 'Q5 Withdrawal', 'Q6 Conflict', 'Total Score',
-            'Feedback', 'Created At'
-        ]
-        
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'bergen_tiktok'):
-                bt = participant.bergen_tiktok
-                row = [
-                    participant.email,
-                    bt.q1_salience,
-                    bt.q2_tolerance,
-                    bt.q3_mood_modification,
-                    bt.q4_relapse,
-                    bt.q5_withdrawal,
-                    bt.q6_conflict,
-                    bt.total_score,
-                    bt.get_feedback(),
-                    bt.created_at.strftime('%Y-%m-%d %H:%M:%S') if bt.created_at else '',
-                ]
-                ws.append(row)
-        
-        self._auto_adjust_column_width(ws)
-    
-    def _create_bergen_instagram_sheet(self, wb, queryset):
-        """Create sheet for Bergen Instagram data"""
-        ws = wb.create_sheet("Bergen Instagram")
-        
-        headers = [
-            'Email', 'Q1 Salience', 'Q2 Tolerance', 'Q3 Mood Modification',
-            'Q4 Relapse', 'Q5 Withdrawal', 'Q6 Conflict', 'Total Score',
-            'Feedback', 'Created At'
-        ]
-        
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'bergen_instagram'):
-                bi = participant.bergen_instagram
-                row = [
-                    participant.email,
-                    bi.q1_salience,
-                    bi.q2_tolerance,
-                    bi.q3_mood_modification,
-                    bi.q4_relapse,
-                    bi.q5_withdrawal,
-                    bi.q6_conflict,
-                    bi.total_score,
-                    bi.get_feedback(),
-                    bi.created_at.strftime('%Y-%m-%d %H:%M:%S') if bi.created_at else '',
-                ]
-                ws.append(row)
-        
-        self._auto_adjust_column_width(ws)
-    
-    def _create_ucla_loneliness_sheet(self, wb, queryset):
-        """Create sheet for UCLA Loneliness data"""
-        ws = wb.create_sheet("UCLA Loneliness")
-        
-        headers = ['Email'] + [f'Q{i}' for i in range(1, 11)] + ['Total Score', 'Feedback', 'Created At']
-        
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'ucla_loneliness'):
-                ul = participant.ucla_loneliness
-                row = [participant.email]
-                row.extend([getattr(ul, f'q{i}') for i in range(1, 11)])
-                row.extend([
-                    ul.total_score,
-                    ul.get_feedback(),
-                    ul.created_at.strftime('%Y-%m-%d %H:%M:%S') if ul.created_at else '',
-                ])
-                ws.append(row)
-        
-        self._auto_adjust_column_width(ws)
-    
-    def _create_prefrontal_symptoms_sheet(self, wb, queryset):
-        """Create sheet for Prefrontal Symptoms data"""
-        ws = wb.create_sheet("Prefrontal Symptoms")
-        
-        headers = ['Email'] + [f'Q{i}' for i in range(1, 21)] + ['Total Score', 'Feedback', 'Created At']
-        
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'prefrontal_symptoms'):
-                ps = participant.prefrontal_symptoms
-                row = [participant.email]
-                row.extend([getattr(ps, f'q{i}') for i in range(1, 21)])
-                row.extend([
-                    ps.total_score,
-                    ps.get_feedback(),
-                    ps.created_at.strftime('%Y-%m-%d %H:%M:%S') if ps.created_at else '',
-                ])
-                ws.append(row)
-        
-        self._auto_adjust_column_width(ws)
-    
-    def _create_caids_sheet(self, wb, queryset):
-        """Create sheet for CAIDS data"""
-        ws = wb.create_sheet("CAIDS")
-        
-        headers = ['Email'] + [f'Q{i}' for i in range(1, 21)] + ['Total Score', 'Feedback', 'Created At']
-        
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'caids'):
-                caids = participant.caids
-                row = [participant.email]
-                row.extend([getattr(caids, f'q{i}') for i in range(1, 21)])
-                row.extend([
-                    caids.total_score,
-                    caids.get_feedback(),
-                    caids.created_at.strftime('%Y-%m-%d %H:%M:%S') if caids.created_at else '',
-                ])
-                ws.append(row)
-        
-        self._auto_adjust_column_width(ws)
-    
-    def _create_summary_sheet(self, wb, queryset):
-        """Create summary sheet with key statistics"""
-        ws = wb.create_sheet("Summary", 0)  # Insert as first sheet
-        
-        # Title
-        ws['A1'] = 'SURVEY DATA SUMMARY'
-        ws['A1'].font = Font(size=16, bold=True)
-        ws.merge_cells('A1:D1')
-        
-        # Export info
-        ws['A3'] = 'Export Date:'
-        ws['B3'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        ws['A4'] = 'Total Participants:'
-        ws['B4'] = queryset.count()
-        
-        # Statistics by instrument
-        row = 6
-        ws[f'A{row}'] = 'Instrument Statistics'
-        ws[f'A{row}'].font = Font(bold=True)
-        row += 1
-        
-        instruments = [
-            ('Bergen TikTok', 'bergen_tiktok'),
-            ('Bergen Instagram', 'bergen_instagram'),
-            ('UCLA Loneliness', 'ucla_loneliness'),
-            ('Prefrontal Symptoms', 'prefrontal_symptoms'),
-            ('CAIDS', 'caids'),
-        ]
-        
-        for name, attr in instruments:
-            count = sum(1 for p in queryset if hasattr(p, attr))
-            ws[f'A{row}'] = name
-            ws[f'B{row}'] = count
-            ws[f'C{row}'] = f'{(count/queryset.count()*100):.1f}%' if queryset.count() > 0 else '0%'
-            row += 1
-        
-        # Demographics summary
-        row += 2
-        ws[f'A{row}'] = 'Demographics Summary'
-        ws[f'A{row}'].font = Font(bold=True)
-        row += 1
-        
-        # Location breakdown
-        for location in ['EC', 'CL']:
-            count = queryset.filter(location=location).count()
-            ws[f'A{row}'] = f'Location - {dict(Participant.LOCATION_CHOICES)[location]}'
-            ws[f'B{row}'] = count
-            ws[f'C{row}'] = f'{(count/queryset.count()*100):.1f}%' if queryset.count() > 0 else '0%'
-            row += 1
-        
-        # Gender breakdown
-        for gender_code, gender_name in Participant.GENDER_CHOICES:
-            count = queryset.filter(gender=gender_code).count()
-            if count > 0:
-                ws[f'A{row}'] = f'Gender - {gender_name}'
-                ws[f'B{row}'] = count
-                ws[f'C{row}'] = f'{(count/queryset.count()*100):.1f}%' if queryset.count() > 0 else '0%'
-                row += 1
-        
-        self._auto_adjust_column_width(ws)
-    
-    def _write_header_row(self, ws, headers):
-        """Write and style header row"""
-        ws.append(headers)
-        
-        # Style headers
-        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-        header_font = Font(color='FFFFFF', bold=True)
-        
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    def _auto_adjust_column_width(self, ws):
-        """Auto-adjust column widths, skipping merged cells"""
-        for column in ws.columns:
-            max_length = 0
-            column_letter = None
-
-            for cell in column:
-                # Skip merged cells — they don't have column_letter
-                if cell.__class__.__name__ == 'MergedCell':
-                    continue
-                if column_letter is None:
-                    column_letter = cell.column_letter
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-
-            if column_letter:
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
 
 
 # Register models
@@ -435,4 +154,49 @@ class PrefrontalSymptomsAdmin(admin.ModelAdmin):
 @admin.register(CAIDS)
 class CAIDSAdmin(admin.ModelAdmin):
     list_display = ['participant', 'total_score', 'created_at']
-    search_fields = ['participant__email']
\ No newline at end of file
+    search_fields = ['participant__email']
+
+
+@admin.register(EmailOutbox)
+class EmailOutboxAdmin(admin.ModelAdmin):
+    list_display = ['participant', 'status', 'attempts', 'next_attempt_at', 'sent_at', 'created_at']
+    list_filter = ['status']
+    search_fields = ['participant__email']
+    readonly_fields = ['created_at', 'sent_at', 'last_error']
+
+
+@admin.register(StatisticsCounter)
+class StatisticsCounterAdmin(admin.ModelAdmin):
+    list_display = ['key', 'value', 'updated_at']
+    readonly_fields = ['key', 'value', 'updated_at']
+
+
+@admin.register(CircuitBreaker)
+class CircuitBreakerAdmin(admin.ModelAdmin):
+    list_display = ['name', 'state', 'consecutive_failures', 'calls', 'failures', 'rejected', 'avg_latency_ms', 'updated_at']
+    readonly_fields = [
+        'name', 'state', 'consecutive_failures', 'opened_at', 'calls', 'failures',
+        'rejected', 'last_latency_ms', 'avg_latency_ms', 'updated_at',
+    ]
+
+
+@admin.register(ExportJob)
+class ExportJobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'status', 'progress', 'total_records', 'created_at', 'finished_at', 'download_link']
+    list_filter = ['status']
+    readonly_fields = [
+        'status', 'filters', 'total_records', 'progress', 'file_name', 'error',
+        'created_at', 'started_at', 'finished_at', 'lease_until', 'attempts', 'download_link',
+    ]
+
+    def download_link(self, obj):
+        if obj.status != ExportJob.STATUS_DONE:
+            return '-'
+        return format_html(
+            '<a class="button" href="{}">Download</a>',
+            reverse('exportjob-download', args=[obj.pk])
+        )
+    download_link.short_description = 'Download'
+
+    def has_add_permission(self, request):
+        return False
@@ -0,0 +1,187 @@
+import fcntl
+import hashlib
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import connection
+
+logger = logging.getLogger(__name__)
+
+# CACHES alias holding aggregate results (see settings.CACHES)
+AGGREGATE_CACHE_ALIAS = 'aggregates'
+# Seconds a request waits for another worker's computation before doing it itself
+AGGREGATE_LOCK_TIMEOUT = 30
+AGGREGATE_LOCK_POLL = 0.05
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+# Keys this process is refreshing in the background
+_refreshing = set()
+_refreshing_lock = threading.Lock()
+
+
+def aggregate_cache():
+    return caches[AGGREGATE_CACHE_ALIAS]
+
+
+def count(event):
+    with _counters_lock:
+        _counters[event] += 1
+
+
+class AdvisoryLock:
+    """PostgreSQL session advisory lock, held on this thread's connection"""
+
+    def __init__(self, name):
+        digest = hashlib.sha256(f'aggregate:{name}'.encode('utf-8')).digest()
+        self.key = int.from_bytes(digest[:8], 'big', signed=True)
+
+    def acquire(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_try_advisory_lock(%s)', [self.key])
+            return cursor.fetchone()[0]
+
+    def release(self):
+        with connection.cursor() as cursor:
+            cursor.execute('SELECT pg_advisory_unlock(%s)', [self.key])
+
+
+class FileLock:
+    """flock on a file in AGGREGATE_LOCK_DIR, for databases without advisory locks.
+
+    Each acquire opens the file anew, so threads of one process exclude
+    each other as well as other processes on the same host.
+    """
+
+    def __init__(self, name):
+        self.path = os.path.join(settings.AGGREGATE_LOCK_DIR, f'aggregate-{name}.lock')
+        self.fd = None
+
+    def acquire(self):
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            os.close(fd)
+            return False
+        self.fd = fd
+        return True
+
+    def release(self):
+        fcntl.flock(self.fd, fcntl.LOCK_UN)
+        os.close(self.fd)
+        self.fd = None
+
+
+def aggregate_lock(name):
+    """Non-blocking cross-process lock named ``name`` for the current database"""
+    if connection.vendor == 'postgresql':
+        return AdvisoryLock(name)
+    return FileLock(name)
+
+
+def cached_aggregate(name, ttl=None, stale_ttl=None):
+    """Cache an aggregate function's result, computing it once across workers.
+
+    Results count as fresh for ``ttl`` seconds (default
+    settings.AGGREGATE_CACHE_TTL). For ``stale_ttl`` more seconds (default
+    settings.AGGREGATE_CACHE_STALE_TTL) the stale result is still returned
+    at once, while a background thread recomputes it. Only a missing
+    result makes callers wait. Either way the computation is
+    single-flight: it runs under aggregate_lock(name), and every other
+    caller serves the cached result or waits for it.
+
+    Arguments of the wrapped function are part of the cache key. The
+    wrapper's invalidate(*args, **kwargs) drops a result.
+    """
+    def decorator(func):
+        def cache_key(args, kwargs):
+            digest = hashlib.sha256(repr((args, sorted(kwargs.items()))).encode('utf-8')).hexdigest()
+            return f'aggregate:{name}:{digest}'
+
+        def compute(key, args, kwargs):
+            fresh_for = settings.AGGREGATE_CACHE_TTL if ttl is None else ttl
+            stale_for = settings.AGGREGATE_CACHE_STALE_TTL if stale_ttl is None else stale_ttl
+            value = func(*args, **kwargs)
+            count('computed')
+            aggregate_cache().set(
+                key, {'value': value, 'fresh_until': time.time() + fresh_for}, fresh_for + stale_for,
+            )
+            return value
+
+        def compute_once(key, args, kwargs):
+            lock = aggregate_lock(name)
+            deadline = time.monotonic() + AGGREGATE_LOCK_TIMEOUT
+            while not lock.acquire():
+                if time.monotonic() >= deadline:
+                    logger.warning('Timed out waiting for aggregate %s, computing it anyway', name)
+                    return compute(key, args, kwargs)
+                time.sleep(AGGREGATE_LOCK_POLL)
+                entry = aggregate_cache().get(key)
+                if entry is not None:
+                    return entry['value']
+            try:
+                # Whoever held the lock may have just stored it
+                entry = aggregate_cache().get(key)
+                if entry is not None:
+                    return entry['value']
+                return compute(key, args, kwargs)
+            finally:
+                lock.release()
+
+        def refresh(key, args, kwargs):
+            lock = aggregate_lock(name)
+            try:
+                # Another worker holding the lock is refreshing it already
+                if lock.acquire():
+                    try:
+                        entry = aggregate_cache().get(key)
+                        if entry is None or entry['fresh_until'] <= time.time():
+                            compute(key, args, kwargs)
+                    finally:
+                        lock.release()
+            except Exception:
+                logger.exception('Error refreshing aggregate %s', name)
+            finally:
+                with _refreshing_lock:
+                    _refreshing.discard(key)
+                # The thread opened its own connection
+                connection.close()
+
+        def refresh_in_background(key, args, kwargs):
+            with _refreshing_lock:
+                if key in _refreshing:
+                    return
+                _refreshing.add(key)
+            threading.Thread(target=refresh, args=(key, args, kwargs), daemon=True).start()
+
+        @wraps(func)
+        def wrapper(*args, **kwargs):
+            key = cache_key(args, kwargs)
+            entry = aggregate_cache().get(key)
+            if entry is None:
+                count('misses')
+                return compute_once(key, args, kwargs)
+            if entry['fresh_until'] <= time.time():
+                count('stale')
+                refresh_in_background(key, args, kwargs)
+            else:
+                count('hits')
+            return entry['value']
+
+        wrapper.invalidate = lambda *args, **kwargs: aggregate_cache().delete(cache_key(args, kwargs))
+        return wrapper
+
+    return decorator
+
+
+def aggregate_cache_stats():
+    """Fresh hits, stale hits, misses and computations of this process"""
+    with _counters_lock:
+        return {event: _counters[event] for event in ['hits', 'stale', 'misses', 'computed']}
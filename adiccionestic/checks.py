@@ -0,0 +1,22 @@
+from django.conf import settings
+from django.core.checks import Warning, register
+
+# Cache aliases every process must share (see settings.CACHES)
+SHARED_CACHE_ALIASES = ['feedback', 'aggregates']
+PROCESS_LOCAL_BACKENDS = ['django.core.cache.backends.locmem.LocMemCache']
+
+
+@register()
+def shared_caches_check(app_configs, **kwargs):
+    """Warn when a cache that is invalidated across processes is private to each one"""
+    warnings = []
+    for alias in SHARED_CACHE_ALIASES:
+        backend = settings.CACHES.get(alias, {}).get('BACKEND')
+        if backend in PROCESS_LOCAL_BACKENDS:
+            warnings.append(Warning(
+                f"The '{alias}' cache uses {backend}, which each process keeps to itself.",
+                hint='Invalidations from other workers and management commands will not reach it; '
+                     'use DatabaseCache, or FileBasedCache on a shared LOCATION.',
+                id='adiccionestic.W001',
+            ))
+    return warnings
@@ -0,0 +1,111 @@
+import time
+
+from django.db.models import F, Q, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import CircuitBreaker
+
+# Consecutive failures that open a breaker
+BREAKER_FAILURE_THRESHOLD = 5
+# Seconds an open breaker rejects calls before letting one trial call through
+BREAKER_RESET_SECONDS = 60
+# Weight of the newest call in avg_latency_ms
+LATENCY_SMOOTHING = 0.2
+
+
+class CircuitOpen(Exception):
+    """Raised instead of calling a dependency whose breaker is open"""
+
+    def __init__(self, name, retry_at):
+        super().__init__(f'Circuit {name} is open until {retry_at.isoformat()}')
+        self.name = name
+        self.retry_at = retry_at
+
+
+def allow_call(name, reset_seconds=BREAKER_RESET_SECONDS):
+    """Whether a call may go through; raises CircuitOpen when it may not.
+
+    State lives in the circuit_breakers table, so every worker process
+    sees the same breaker. After reset_seconds an open breaker turns
+    half-open and exactly one worker wins the trial call: the conditional
+    UPDATE on opened_at only matches once.
+    """
+    breaker, _ = CircuitBreaker.objects.get_or_create(name=name)
+    if breaker.state == CircuitBreaker.STATE_CLOSED:
+        return True
+
+    now = timezone.now()
+    retry_at = breaker.opened_at + timezone.timedelta(seconds=reset_seconds)
+    if retry_at <= now:
+        # A half-open breaker whose trial never reported back is retried too
+        claimed = CircuitBreaker.objects.filter(
+            name=name, state=breaker.state, opened_at=breaker.opened_at,
+        ).update(state=CircuitBreaker.STATE_HALF_OPEN, opened_at=now)
+        if claimed:
+            return True
+        retry_at = now + timezone.timedelta(seconds=reset_seconds)
+
+    CircuitBreaker.objects.filter(name=name).update(rejected=F('rejected') + 1)
+    raise CircuitOpen(name, retry_at)
+
+
+def latency_updates(latency_ms):
+    return {
+        'calls': F('calls') + 1,
+        'last_latency_ms': latency_ms,
+        'avg_latency_ms': (
+            Coalesce(F('avg_latency_ms'), Value(latency_ms)) * (1 - LATENCY_SMOOTHING)
+            + latency_ms * LATENCY_SMOOTHING
+        ),
+    }
+
+
+def record_success(name, latency_ms):
+    CircuitBreaker.objects.filter(name=name).update(
+        state=CircuitBreaker.STATE_CLOSED,
+        consecutive_failures=0,
+        opened_at=None,
+        **latency_updates(latency_ms),
+    )
+
+
+def record_failure(name, latency_ms, threshold=BREAKER_FAILURE_THRESHOLD):
+    CircuitBreaker.objects.filter(name=name).update(
+        consecutive_failures=F('consecutive_failures') + 1,
+        failures=F('failures') + 1,
+        **latency_updates(latency_ms),
+    )
+    # A failed trial call reopens at once; a closed breaker opens at the threshold
+    CircuitBreaker.objects.filter(
+        Q(state=CircuitBreaker.STATE_HALF_OPEN)
+        | Q(state=CircuitBreaker.STATE_CLOSED, consecutive_failures__gte=threshold),
+        name=name,
+    ).update(state=CircuitBreaker.STATE_OPEN, opened_at=timezone.now())
+
+
+def guarded_call(name, func, *args, threshold=BREAKER_FAILURE_THRESHOLD,
+                 reset_seconds=BREAKER_RESET_SECONDS, **kwargs):
+    """Call func through the named breaker, recording its outcome and latency.
+
+    Raises CircuitOpen without calling func while the breaker is open;
+    exceptions raised by func count as failures and are re-raised.
+    """
+    allow_call(name, reset_seconds=reset_seconds)
+
+    started = time.perf_counter()
+    try:
+        result = func(*args, **kwargs)
+    except Exception:
+        record_failure(name, (time.perf_counter() - started) * 1000, threshold=threshold)
+        raise
+    record_success(name, (time.perf_counter() - started) * 1000)
+    return result
+
+
+def breaker_metrics():
+    """State and call metrics of every breaker, for the email_status endpoint"""
+    return list(CircuitBreaker.objects.order_by('name').values(
+        'name', 'state', 'consecutive_failures', 'opened_at', 'calls', 'failures',
+        'rejected', 'last_latency_ms', 'avg_latency_ms',
+    ))
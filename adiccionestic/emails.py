@@ -0,0 +1,275 @@
+import logging
+from datetime import timedelta
+from functools import lru_cache
+
+from django.conf import settings
+from django.core.mail import EmailMultiAlternatives, get_connection
+from django.db import transaction
+from django.db.models import Count
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from .circuit import CircuitOpen, breaker_metrics, guarded_call
+from .models import INSTRUMENT_RELATIONS, Participant, EmailOutbox
+from .stats import bump_counters
+
+logger = logging.getLogger(__name__)
+
+FEEDBACK_SUBJECT = 'Resultados de tu Encuesta Psicológica'
+
+# Outbox delivery defaults (overridable from run_email_worker)
+OUTBOX_BATCH_SIZE = 50
+OUTBOX_MAX_ATTEMPTS = 5
+OUTBOX_BACKOFF_SECONDS = 30
+OUTBOX_MAX_BACKOFF_SECONDS = 3600
+# How long a claimed batch stays invisible to other workers
+OUTBOX_LEASE_SECONDS = 300
+
+# Circuit breaker guarding the email backend (see circuit.py)
+MAIL_CIRCUIT = 'mailgun'
+
+INSTRUMENT_TITLES = {
+    'bergen_tiktok': 'Bergen TikTok - Escala de Adicción a TikTok',
+    'bergen_instagram': 'Bergen Instagram - Escala de Adicción a Instagram',
+    'ucla_loneliness': 'UCLA - Escala de Soledad',
+    'prefrontal_symptoms': 'Síntomas Prefrontales - Inventario Abreviado',
+    'caids': 'CAIDS - Dependencia de IA Conversacional',
+}
+# Shown before the title in the HTML email
+INSTRUMENT_ICONS = {
+    'bergen_tiktok': '📱',
+    'bergen_instagram': '📸',
+    'ucla_loneliness': '👥',
+    'prefrontal_symptoms': '🧠',
+    'caids': '🤖',
+}
+# Stands in for per-email values while a template is pre-rendered (a private-use character)
+TEMPLATE_SLOT = '\ue000'
+
+
+def generate_feedback(participant):
+    """Generate feedback for all completed instruments"""
+    feedback = {
+        'email': participant.email,
+        'instruments': {}
+    }
+
+    # Load participants with Participant.objects.load() / with_instruments()
+    # so this does not query each relation
+    for attr in INSTRUMENT_RELATIONS:
+        if hasattr(participant, attr):
+            instrument = getattr(participant, attr)
+            feedback['instruments'][attr] = {
+                'score': instrument.total_score,
+                'risk_level': instrument.get_risk_level(),
+                'feedback': instrument.get_feedback()
+            }
+
+    return feedback
+
+
+def build_feedback_email(participant, connection=None):
+    """Build the feedback email (plain text + HTML) for a participant"""
+    feedback = generate_feedback(participant)
+
+    context = {
+        'email': participant.email,
+        'location': participant.get_location_display(),
+        'instruments': feedback['instruments'],
+    }
+
+    email = EmailMultiAlternatives(
+        subject=FEEDBACK_SUBJECT,
+        body=render_feedback_text(context),
+        from_email=settings.DEFAULT_FROM_EMAIL,
+        to=[participant.email],
+        connection=connection,
+    )
+    email.attach_alternative(render_feedback_html(context), "text/html")
+    return email
+
+
+def send_feedback_email(participant, connection=None):
+    """Send feedback email to participant and flag it as sent.
+
+    Raises whatever the email backend raises; returns True when the
+    backend accepted the message.
+    """
+    email = build_feedback_email(participant, connection=connection)
+    result = email.send()
+
+    if result:
+        with transaction.atomic():
+            flipped = Participant.objects.filter(pk=participant.pk, feedback_sent=False).update(feedback_sent=True)
+            if flipped:
+                bump_counters({'feedback_sent': 1})
+        participant.feedback_sent = True
+        logger.info("Feedback email sent to %s", participant.email)
+        return True
+
+    logger.warning("Email sending returned False for %s", participant.email)
+    return False
+
+
+def queue_feedback_email(participant):
+    """Queue a feedback email in the outbox.
+
+    Meant to be called inside the submission transaction. A participant
+    has at most one pending message (the body is rendered at send time,
+    so a resubmission is picked up by the message already queued).
+    """
+    queue_feedback_emails([participant])
+
+
+def queue_feedback_emails(participants):
+    """Queue feedback emails for many participants with one INSERT"""
+    EmailOutbox.objects.bulk_create(
+        [EmailOutbox(participant=participant) for participant in participants],
+        ignore_conflicts=True,
+    )
+
+
+def get_backoff(attempts, base=OUTBOX_BACKOFF_SECONDS, cap=OUTBOX_MAX_BACKOFF_SECONDS):
+    """Exponential backoff delay after the given number of failed attempts"""
+    return timedelta(seconds=min(base * 2 ** max(attempts - 1, 0), cap))
+
+
+def claim_pending_emails(batch_size=OUTBOX_BATCH_SIZE, lease=OUTBOX_LEASE_SECONDS):
+    """Claim a batch of due outbox messages for this worker.
+
+    Rows are picked with SELECT ... FOR UPDATE SKIP LOCKED and pushed
+    ``lease`` seconds into the future before the transaction commits, so
+    no row lock is held while Mailgun is called and other workers skip
+    them. A worker that dies mid-batch leaves its messages to be picked up
+    again once the lease runs out.
+    """
+    with transaction.atomic():
+        messages = list(
+            EmailOutbox.objects
+            .select_for_update(skip_locked=True, of=('self',))
+            .select_related('participant', *[f'participant__{relation}' for relation in INSTRUMENT_RELATIONS])
+            .filter(status=EmailOutbox.STATUS_PENDING, next_attempt_at__lte=timezone.now())
+            .order_by('next_attempt_at', 'id')[:batch_size]
+        )
+        if messages:
+            EmailOutbox.objects.filter(pk__in=[message.pk for message in messages]).update(
+                next_attempt_at=timezone.now() + timedelta(seconds=lease)
+            )
+    return messages
+
+
+def deliver_pending_emails(batch_size=OUTBOX_BATCH_SIZE, max_attempts=OUTBOX_MAX_ATTEMPTS,
+                           backoff=OUTBOX_BACKOFF_SECONDS):
+    """Send one batch of due outbox messages.
+
+    Sends go through the 'mailgun' circuit breaker. While it is open the
+    rest of the batch is deferred to when the breaker lets a trial call
+    through, without spending an attempt. Returns a dict with the number
+    of messages sent, retried, deferred and given up on.
+    """
+    stats = {'sent': 0, 'retried': 0, 'deferred': 0, 'failed': 0}
+
+    messages = claim_pending_emails(batch_size)
+    if not messages:
+        return stats
+
+    connection = get_connection()
+    with connection:
+        for index, message in enumerate(messages):
+            try:
+                sent = guarded_call(MAIL_CIRCUIT, send_feedback_email, message.participant, connection=connection)
+                error = '' if sent else 'Email backend did not accept the message'
+            except CircuitOpen as e:
+                for deferred in messages[index:]:
+                    deferred.next_attempt_at = e.retry_at
+                    deferred.last_error = str(e)
+                stats['deferred'] += len(messages) - index
+                logger.warning("%s; deferring %d emails", e, len(messages) - index)
+                break
+            except Exception as e:
+                logger.exception("Error sending email to %s", message.participant.email)
+                sent = False
+                error = str(e)
+
+            message.attempts += 1
+            if sent:
+                message.status = EmailOutbox.STATUS_SENT
+                message.sent_at = timezone.now()
+                message.last_error = ''
+                stats['sent'] += 1
+            elif message.attempts >= max_attempts:
+                message.status = EmailOutbox.STATUS_FAILED
+                message.last_error = error
+                stats['failed'] += 1
+            else:
+                message.next_attempt_at = timezone.now() + get_backoff(message.attempts, base=backoff)
+                message.last_error = error
+                stats['retried'] += 1
+
+    EmailOutbox.objects.bulk_update(
+        messages, ['status', 'attempts', 'next_attempt_at', 'last_error', 'sent_at']
+    )
+
+    return stats
+
+
+def email_status():
+    """Outbox message counts by status and the metrics of every circuit breaker"""
+    counts = dict(EmailOutbox.objects.order_by().values_list('status').annotate(count=Count('id')))
+    return {
+        'outbox': {status: counts.get(status, 0) for status, label in EmailOutbox.STATUS_CHOICES},
+        'breakers': breaker_metrics(),
+    }
+
+
+@lru_cache(maxsize=None)
+def template_parts(template_name, fixed=(), slots=()):
+    """``template_name`` rendered once per process, split where the per-email values go.
+
+    ``fixed`` are the (name, value) pairs the output depends on; every
+    name in ``slots`` is rendered as a marker instead. Templates must use
+    each slot once, in ``slots`` order.
+    """
+    context = dict(fixed)
+    context.update({name: TEMPLATE_SLOT for name in slots})
+    return tuple(render_to_string(template_name, context).split(TEMPLATE_SLOT))
+
+
+def fill_template(template_name, fixed=(), **values):
+    """Memoized render of ``template_name``: the cached parts joined with ``values``"""
+    parts = template_parts(template_name, fixed, tuple(values))
+    pieces = [parts[0]]
+    for value, part in zip(values.values(), parts[1:]):
+        pieces += [str(value), part]
+    return ''.join(pieces)
+
+
+def render_instrument_results(template_name, instruments):
+    # One cached block per (instrument, risk level); only the score is filled in
+    return ''.join(
+        fill_template(
+            template_name,
+            (
+                ('icon', INSTRUMENT_ICONS.get(relation, '')),
+                ('title', INSTRUMENT_TITLES.get(relation, relation)),
+                ('risk_level', data['risk_level']),
+                ('feedback', data['feedback']),
+            ),
+            score=data['score'],
+        )
+        for relation, data in instruments.items()
+    )
+
+
+def render_feedback_html(context):
+    """Render HTML email template"""
+    results = render_instrument_results('emails/feedback_instrument.html', context['instruments'])
+    return fill_template('emails/feedback.html', results=results)
+
+
+def render_feedback_text(context):
+    """Render plain text email"""
+    results = render_instrument_results('emails/feedback_instrument.txt', context['instruments'])
+    return fill_template(
+        'emails/feedback.txt', email=context['email'], location=context['location'], results=results,
+    )
@@ -0,0 +1,141 @@
+import logging
+import os
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .exports import ExcelExport, filter_participants
+from .models import Participant, ExportJob
+
+logger = logging.getLogger(__name__)
+
+# Seconds a running job may go without a progress report before another
+# worker takes it over
+EXPORT_JOB_LEASE_SECONDS = 600
+# Claims of one job before an export that keeps killing its worker is failed
+EXPORT_JOB_MAX_ATTEMPTS = 3
+
+
+def export_path(job):
+    """Location of a finished job's file on disk"""
+    return os.path.join(settings.EXPORT_ROOT, job.file_name)
+
+
+def queue_export_job(**filters):
+    """Queue an export of the participants matching the export_excel filters"""
+    filters = {key: value for key, value in filters.items() if value is not None and value != ''}
+    return ExportJob.objects.create(filters=filters)
+
+
+def claim_next_job(lease=EXPORT_JOB_LEASE_SECONDS, max_attempts=EXPORT_JOB_MAX_ATTEMPTS):
+    """Mark the oldest claimable job as running and return it (None if idle).
+
+    Queued jobs are claimable, and so are running jobs whose lease ran
+    out because their worker died. The claim holds for ``lease`` seconds,
+    and run_export_job renews it on each progress report. A job
+    whose worker died ``max_attempts`` times is marked failed instead of
+    being run again.
+    """
+    while True:
+        now = timezone.now()
+        with transaction.atomic():
+            job = (
+                ExportJob.objects
+                .select_for_update(skip_locked=True)
+                .filter(
+                    Q(status=ExportJob.STATUS_QUEUED)
+                    # No lease: claimed before leases existed
+                    | Q(status=ExportJob.STATUS_RUNNING) & (Q(lease_until__lt=now) | Q(lease_until=None))
+                )
+                .order_by('created_at')
+                .first()
+            )
+            if job is None:
+                return None
+
+            if job.attempts >= max_attempts:
+                logger.error("Export job %s abandoned after %s attempts", job.id, job.attempts)
+                job.status = ExportJob.STATUS_FAILED
+                job.error = f'Export worker stopped {job.attempts} times while running this job'
+                job.finished_at = now
+                job.save(update_fields=['status', 'error', 'finished_at'])
+                continue
+
+            job.status = ExportJob.STATUS_RUNNING
+            job.started_at = now
+            job.lease_until = now + timedelta(seconds=lease)
+            job.attempts += 1
+            job.save(update_fields=['status', 'started_at', 'lease_until', 'attempts'])
+            return job
+
+
+def run_export_job(job, lease=EXPORT_JOB_LEASE_SECONDS):
+    """Generate a job's workbook on disk, recording progress as it goes.
+
+    Every progress report also renews the job's lease by ``lease`` seconds.
+    """
+    queryset = filter_participants(Participant.objects.all(), **job.filters)
+    file_name = f'survey_export_{job.id}.xlsx'
+    path = os.path.join(settings.EXPORT_ROOT, file_name)
+    partial_path = f'{path}.part'
+
+    def report_progress(done, total):
+        percent = done * 100 // total if total else 100
+        if percent != job.progress:
+            job.progress = percent
+            job.lease_until = timezone.now() + timedelta(seconds=lease)
+            ExportJob.objects.filter(pk=job.pk).update(progress=percent, lease_until=job.lease_until)
+
+    export = ExcelExport(queryset, progress=report_progress)
+    try:
+        os.makedirs(settings.EXPORT_ROOT, exist_ok=True)
+        with open(partial_path, 'wb') as fileobj:
+            export.save(fileobj)
+        os.replace(partial_path, path)
+    except Exception as e:
+        logger.exception("Export job %s failed", job.id)
+        if os.path.exists(partial_path):
+            os.remove(partial_path)
+        job.status = ExportJob.STATUS_FAILED
+        job.error = str(e)
+        job.finished_at = timezone.now()
+        job.save(update_fields=['status', 'error', 'finished_at'])
+        return job
+
+    job.status = ExportJob.STATUS_DONE
+    job.total_records = export.total
+    job.progress = 100
+    job.file_name = file_name
+    job.finished_at = timezone.now()
+    job.save(update_fields=['status', 'total_records', 'progress', 'file_name', 'finished_at'])
+    return job
+
+
+def mark_export_missing(job):
+    """Fail a finished job whose file is gone, e.g. written on another host"""
+    job.status = ExportJob.STATUS_FAILED
+    job.error = f'Export file {job.file_name} not found in EXPORT_ROOT'
+    job.save(update_fields=['status', 'error'])
+    return job
+
+
+def purge_expired_exports(max_age_hours=None):
+    """Delete the files of jobs finished more than ``max_age_hours`` ago.
+
+    The jobs stay, marked expired, so their download answers 410.
+    Returns how many were expired.
+    """
+    if max_age_hours is None:
+        max_age_hours = settings.EXPORT_RETENTION_HOURS
+    cutoff = timezone.now() - timezone.timedelta(hours=max_age_hours)
+    expired = list(ExportJob.objects.filter(status=ExportJob.STATUS_DONE, finished_at__lt=cutoff))
+    for job in expired:
+        try:
+            os.remove(export_path(job))
+        except FileNotFoundError:
+            pass
+    ExportJob.objects.filter(pk__in=[job.pk for job in expired]).update(status=ExportJob.STATUS_EXPIRED)
+    return len(expired)
@@ -0,0 +1,587 @@
+import csv
+import json
+import tempfile
+import zipfile
+from collections import namedtuple
+from datetime import datetime
+from operator import attrgetter
+
+import openpyxl
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Alignment
+from openpyxl.utils import get_column_letter
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db.models import Count
+from django.http import StreamingHttpResponse
+
+from .instruments import REGISTRY
+from .models import INSTRUMENT_RELATIONS, Participant
+from .stats import aggregate_counts
+
+XLSX_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
+CSV_CONTENT_TYPE = 'text/csv; charset=utf-8'
+ZIP_CONTENT_TYPE = 'application/zip'
+NDJSON_CONTENT_TYPE = 'application/x-ndjson'
+
+# Rows buffered per sheet to size the columns before they are flushed
+WIDTH_SAMPLE_ROWS = 500
+MAX_COLUMN_WIDTH = 50
+STREAM_CHUNK_SIZE = 64 * 1024
+
+# Participants fetched per round-trip when iterating an export
+EXPORT_CHUNK_SIZE = 2000
+
+
+def filter_participants(queryset, location=None, start_date=None, end_date=None, ids=None):
+    """Apply the export filters accepted by export_excel and export jobs"""
+    if location:
+        queryset = queryset.filter(location=location)
+
+    if start_date:
+        queryset = queryset.filter(created_at__gte=start_date)
+
+    if end_date:
+        queryset = queryset.filter(created_at__lte=end_date)
+
+    if ids is not None:
+        queryset = queryset.filter(id__in=ids)
+
+    return queryset
+
+
+def iter_export_participants(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Export row source: participants with every instrument preloaded.
+
+    One SELECT with LEFT JOINs on the five instrument tables, read in
+    chunks, so ``hasattr(participant, 'caids')`` and friends never hit the
+    database and memory stays bounded by ``chunk_size``.
+    """
+    return queryset.with_instruments().iterator(chunk_size=chunk_size)
+
+
+def count_instruments(queryset):
+    """Number of participants in the queryset that completed each instrument"""
+    return queryset.order_by().aggregate(
+        **{relation: Count(relation) for relation in INSTRUMENT_RELATIONS}
+    )
+
+
+DATETIME_FORMAT = '%Y-%m-%d %H:%M:%S'
+
+
+# Column spec: the sheet header, the record key (the model field name, used
+# by NDJSON) and a function computing the cell from the row's object
+Column = namedtuple('Column', ['header', 'key', 'value'])
+
+
+def field(header, name):
+    """Raw attribute, blank when empty"""
+    return Column(header, name, lambda obj: getattr(obj, name) or '')
+
+
+def display(header, name):
+    """Choice label, blank when unset"""
+    return Column(header, name, lambda obj: getattr(obj, f'get_{name}_display')() if getattr(obj, name) else '')
+
+
+def yes_no(header, name):
+    return Column(header, name, lambda obj: 'Yes' if getattr(obj, name) else 'No')
+
+
+def when(header, flag, name):
+    """Attribute only when ``flag`` is set (follow-up questions)"""
+    return Column(header, name, lambda obj: getattr(obj, name) if getattr(obj, flag) else '')
+
+
+def timestamp(header, name):
+    return Column(
+        header, name, lambda obj: getattr(obj, name).strftime(DATETIME_FORMAT) if getattr(obj, name) else ''
+    )
+
+
+class Sheet:
+    """One data sheet (or CSV file) of an export.
+
+    Rows are built from the participant itself, or from one of its
+    instruments when ``relation`` is set; participants that did not
+    complete that instrument get no row.
+    """
+
+    def __init__(self, title, columns, relation=None):
+        self.title = title
+        self.columns = columns
+        self.relation = relation
+
+    @property
+    def headers(self):
+        return [column.header for column in self.columns]
+
+    @property
+    def keys(self):
+        return [column.key for column in self.columns]
+
+    def row(self, participant):
+        """Row for ``participant``, or None when the instrument is missing"""
+        obj = participant if self.relation is None else getattr(participant, self.relation, None)
+        if obj is None:
+            return None
+        return [column.value(obj) for column in self.columns]
+
+
+PARTICIPANT_COLUMNS = [
+    field('Email', 'email'),
+    display('Location', 'location'),
+    field('Country', 'country'),
+    field('Age', 'age'),
+    display('Gender', 'gender'),
+    field('Gender Other', 'gender_other'),
+    display('Living With', 'living_with'),
+    field('Living With Other', 'living_with_other'),
+    field('University', 'university'),
+    field('Career', 'career'),
+    display('Current Semester', 'current_semester'),
+    display('Marital Status', 'marital_status'),
+    Column(
+        'GPA Last Semester', 'gpa_last_semester', lambda p: float(p.gpa_last_semester) if p.gpa_last_semester else ''
+    ),
+    yes_no('Repeated Cycles', 'repeated_cycles'),
+    field('Repeated Cycles Count', 'repeated_cycles_count'),
+    display('Residence Sector', 'residence_sector'),
+    display('Socioeconomic Level', 'socioeconomic_level'),
+    field('Income Sources', 'income_sources'),
+
+    yes_no('uses_conversational_ai', 'uses_conversational_ai'),
+    when('ai_daily_hours_weekday', 'uses_conversational_ai', 'ai_daily_hours_weekday'),
+    when('ai_daily_hours_weekend', 'uses_conversational_ai', 'ai_daily_hours_weekend'),
+    when('ai_start_age', 'uses_conversational_ai', 'ai_start_age'),
+    when('ai_use_purpose', 'uses_conversational_ai', 'ai_use_purpose'),
+    yes_no('has_tiktok_account', 'has_tiktok_account'),
+    when('tiktok_daily_hours_weekday', 'has_tiktok_account', 'tiktok_daily_hours_weekday'),
+    when('tiktok_daily_hours_weekend', 'has_tiktok_account', 'tiktok_daily_hours_weekend'),
+    when('tiktok_start_age', 'has_tiktok_account', 'tiktok_start_age'),
+    yes_no('has_instagram_account', 'has_instagram_account'),
+    when('instagram_daily_hours_weekday', 'has_instagram_account', 'instagram_daily_hours_weekday'),
+    when('instagram_daily_hours_weekend', 'has_instagram_account', 'instagram_daily_hours_weekend'),
+    when('instagram_start_age', 'has_instagram_account', 'instagram_start_age'),
+    yes_no('parents_control_screen_time', 'parents_control_screen_time'),
+    yes_no('has_stable_friend_group', 'has_stable_friend_group'),
+    yes_no('has_frequent_positive_communication', 'has_frequent_positive_communication'),
+    yes_no('participates_in_social_activities', 'participates_in_social_activities'),
+
+    yes_no('Consent Accepted', 'consent_accepted'),
+    timestamp('Consent Date', 'consent_date'),
+    yes_no('Feedback Sent', 'feedback_sent'),
+    timestamp('Created At', 'created_at'),
+]
+
+
+def instrument_columns(instrument):
+    """Email, one column per item, then score, feedback and date"""
+    columns = [Column('Email', 'email', lambda row: row.participant.email)]
+    # q3_mood_modification -> Q3 Mood Modification
+    columns.extend(Column(item.replace('_', ' ').title(), item, attrgetter(item)) for item in instrument.items)
+    columns.extend([
+        Column('Total Score', 'total_score', attrgetter('total_score')),
+        Column('Feedback', 'feedback', lambda row: row.get_feedback()),
+        timestamp('Created At', 'created_at'),
+    ])
+    return columns
+
+
+# Every data sheet / CSV file, in workbook order
+SHEETS = [Sheet('Participants', PARTICIPANT_COLUMNS)] + [
+    Sheet(instrument.name, instrument_columns(instrument), relation=relation)
+    for relation, instrument in REGISTRY.items()
+]
+PARTICIPANT_SHEET = SHEETS[0]
+INSTRUMENT_SHEETS = SHEETS[1:]
+
+
+class StreamingSheet:
+    """Write-only worksheet that sizes its columns while rows are written.
+
+    openpyxl writes column widths before the first row, so the header and
+    the first WIDTH_SAMPLE_ROWS rows are held back and measured; everything
+    after that goes straight to the sheet's temporary file.
+    """
+
+    def __init__(self, ws, sample_rows=WIDTH_SAMPLE_ROWS):
+        self.ws = ws
+        self.sample_rows = sample_rows
+        self.widths = []
+        self._buffer = []
+        self._flushed = False
+
+    def write_header(self, headers):
+        """Write styled header row"""
+        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+        header_font = Font(color='FFFFFF', bold=True)
+        alignment = Alignment(horizontal='center', vertical='center')
+
+        cells = []
+        for header in headers:
+            cell = WriteOnlyCell(self.ws, value=header)
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.alignment = alignment
+            cells.append(cell)
+
+        self._add(cells, headers)
+
+    def append_styled(self, row, font):
+        """Write a row whose cells all use ``font``"""
+        cells = []
+        for value in row:
+            cell = WriteOnlyCell(self.ws, value=value)
+            cell.font = font
+            cells.append(cell)
+        self._add(cells, row)
+
+    def append(self, row):
+        self._add(row, row)
+
+    def _add(self, row, values):
+        """Write ``row``, sizing columns from its plain ``values``"""
+        if self._flushed:
+            self.ws.append(row)
+            return
+
+        self._measure(values)
+        self._buffer.append(row)
+        if len(self._buffer) > self.sample_rows:
+            self.flush()
+
+    def flush(self):
+        """Apply the measured widths and write the buffered rows"""
+        if self._flushed:
+            return
+
+        for index, width in enumerate(self.widths, 1):
+            if width:
+                self.ws.column_dimensions[get_column_letter(index)].width = min(width + 2, MAX_COLUMN_WIDTH)
+
+        for row in self._buffer:
+            self.ws.append(row)
+        self._buffer = []
+        self._flushed = True
+
+    def _measure(self, row):
+        for index, value in enumerate(row):
+            if index >= len(self.widths):
+                self.widths.append(0)
+            if value is not None:
+                self.widths[index] = max(self.widths[index], len(str(value)))
+
+
+class StreamingWorkbook:
+    """openpyxl write-only workbook made of StreamingSheet objects"""
+
+    def __init__(self):
+        self.wb = openpyxl.Workbook(write_only=True)
+        self.sheets = []
+
+    def create_sheet(self, title, index=None):
+        sheet = StreamingSheet(self.wb.create_sheet(title, index))
+        self.sheets.append(sheet)
+        return sheet
+
+    def save(self, fileobj):
+        for sheet in self.sheets:
+            sheet.flush()
+        self.wb.save(fileobj)
+
+
+def iter_file(fileobj, chunk_size=STREAM_CHUNK_SIZE):
+    """Yield a file in chunks and close it once exhausted"""
+    try:
+        fileobj.seek(0)
+        while True:
+            chunk = fileobj.read(chunk_size)
+            if not chunk:
+                break
+            yield chunk
+    finally:
+        fileobj.close()
+
+
+def streaming_file_response(write, filename, content_type=XLSX_CONTENT_TYPE):
+    """Build a file on disk with ``write(fileobj)`` and stream it back.
+
+    The file lives in an anonymous temporary file, so memory use does not
+    depend on the size of the export.
+    """
+    fileobj = tempfile.TemporaryFile()
+    try:
+        write(fileobj)
+        size = fileobj.tell()
+    except Exception:
+        fileobj.close()
+        raise
+
+    response = StreamingHttpResponse(iter_file(fileobj), content_type=content_type)
+    response['Content-Length'] = str(size)
+    response['Content-Disposition'] = f'attachment; filename={filename}'
+    return response
+
+
+class ExcelExport:
+    """Survey workbook: summary plus one sheet per data set.
+
+    The one builder behind export_excel, export jobs, the admin export
+    and export_survey_data.
+
+    Sheets are write-only (StreamingWorkbook) unless ``stream`` is False,
+    which builds the whole workbook in memory.
+
+    ``progress(done, total)`` is called as participant rows are written,
+    ``total`` being the participant count times the number of data sheets.
+    """
+    PROGRESS_EVERY = EXPORT_CHUNK_SIZE
+
+    def __init__(self, queryset, stream=True, progress=None, participants=None):
+        self.queryset = queryset
+        self.stream = stream
+        self.progress = progress
+        # Already loaded (with instruments) rows of ``queryset``, if any
+        self.participants = participants
+        self.total = 0
+        self.done = 0
+
+    def save(self, fileobj):
+        """Build the workbook and write it to ``fileobj``"""
+        if self.stream:
+            wb = StreamingWorkbook()
+        else:
+            wb = openpyxl.Workbook()
+            wb.remove(wb.active)
+
+        # One query for the summary; total also drives progress
+        counts = aggregate_counts(self.queryset)
+        self.total = counts['total']
+        self.done = 0
+
+        # Create sheets
+        for sheet in SHEETS:
+            self._create_data_sheet(wb, sheet)
+        self._create_summary_sheet(wb, counts)
+
+        wb.save(fileobj)
+        self._report_progress()
+
+    def _rows(self, queryset):
+        """Iterate export rows, reporting progress every PROGRESS_EVERY rows"""
+        if self.participants is not None:
+            participants = self.participants
+        else:
+            participants = iter_export_participants(queryset)
+        for participant in participants:
+            yield participant
+            self.done += 1
+            if self.done % self.PROGRESS_EVERY == 0:
+                self._report_progress()
+
+    def _report_progress(self):
+        if self.progress:
+            self.progress(self.done, self.total * len(SHEETS))
+
+    def _create_data_sheet(self, wb, sheet):
+        """Create one sheet from its column spec"""
+        ws = wb.create_sheet(sheet.title)
+        self._write_header_row(ws, sheet.headers)
+
+        for participant in self._rows(self.queryset):
+            row = sheet.row(participant)
+            if row is not None:
+                ws.append(row)
+
+        self._auto_adjust_columns(ws)
+
+    def _create_summary_sheet(self, wb, counts):
+        """Create summary sheet"""
+        ws = wb.create_sheet("Summary", 0)
+        bold = Font(bold=True)
+
+        self._append_styled(ws, ['SURVEY DATA EXPORT'], Font(size=16, bold=True))
+        ws.append([])
+        ws.append(['Export Date:', datetime.now().strftime(DATETIME_FORMAT)])
+        ws.append(['Total Records:', self.total])
+
+        ws.append([])
+        self._append_styled(ws, ['Instrument Statistics'], bold)
+        for sheet in INSTRUMENT_SHEETS:
+            ws.append(self._summary_row(sheet.title, counts[f'instrument_{sheet.relation}']))
+
+        ws.append([])
+        self._append_styled(ws, ['Demographics Summary'], bold)
+        for code, name in Participant.LOCATION_CHOICES:
+            ws.append(self._summary_row(f'Location - {name}', counts[f'location_{code}']))
+        for code, name in Participant.GENDER_CHOICES:
+            if counts[f'gender_{code}']:
+                ws.append(self._summary_row(f'Gender - {name}', counts[f'gender_{code}']))
+
+        self._auto_adjust_columns(ws)
+
+    def _summary_row(self, label, count):
+        share = f'{count / self.total * 100:.1f}%' if self.total else '0%'
+        return [label, count, share]
+
+    def _append_styled(self, ws, row, font):
+        """Append a row whose cells all use ``font``"""
+        if isinstance(ws, StreamingSheet):
+            ws.append_styled(row, font)
+            return
+
+        ws.append(row)
+        for cell in ws[ws.max_row]:
+            cell.font = font
+
+    def _write_header_row(self, ws, headers):
+        """Write styled header row"""
+        if isinstance(ws, StreamingSheet):
+            ws.write_header(headers)
+            return
+
+        ws.append(headers)
+        
+        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+        header_font = Font(color='FFFFFF', bold=True)
+        
+        for cell in ws[1]:
+            cell.fill = header_fill
+            cell.font = header_font
+            cell.alignment = Alignment(horizontal='center', vertical='center')
+    
+    def _auto_adjust_columns(self, ws):
+        """Auto-adjust column widths"""
+        if isinstance(ws, StreamingSheet):
+            # Widths were measured while the rows were written
+            ws.flush()
+            return
+
+        for column in ws.columns:
+            max_length = 0
+            column_letter = column[0].column_letter
+            
+            for cell in column:
+                try:
+                    if len(str(cell.value)) > max_length:
+                        max_length = len(str(cell.value))
+                except Exception:
+                    pass
+            
+            adjusted_width = min(max_length + 2, 50)
+            ws.column_dimensions[column_letter].width = adjusted_width
+
+
+class StreamBuffer:
+    """Write-only file object whose contents are drained after each write.
+
+    Lets csv.writer and zipfile (which falls back to data descriptors on
+    unseekable files) produce output that is yielded as it is generated.
+    """
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(data)
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        """Return (and forget) everything written since the last drain"""
+        if not self._chunks:
+            return b''
+        data = self._chunks[0][:0].join(self._chunks)
+        self._chunks = []
+        return data
+
+
+def iter_csv_rows(headers, rows):
+    """Yield CSV text one line at a time"""
+    buffer = StreamBuffer()
+    writer = csv.writer(buffer)
+    writer.writerow(headers)
+    yield buffer.drain()
+    for row in rows:
+        writer.writerow(row)
+        yield buffer.drain()
+
+
+def wide_headers():
+    """Headers of the single wide CSV: participant columns, then each instrument's"""
+    headers = PARTICIPANT_SHEET.headers
+    for sheet in INSTRUMENT_SHEETS:
+        headers.extend(f'{sheet.title} {header}' for header in sheet.headers[1:])
+    return headers
+
+
+def iter_wide_rows(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """One row per participant with every instrument side by side"""
+    for participant in iter_export_participants(queryset, chunk_size=chunk_size):
+        row = PARTICIPANT_SHEET.row(participant)
+        for sheet in INSTRUMENT_SHEETS:
+            instrument = sheet.row(participant)
+            row.extend(instrument[1:] if instrument else [''] * (len(sheet.columns) - 1))
+        yield row
+
+
+def iter_wide_csv(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream a single wide CSV (UTF-8 bytes)"""
+    for text in iter_csv_rows(wide_headers(), iter_wide_rows(queryset, chunk_size=chunk_size)):
+        yield text.encode('utf-8')
+
+
+def iter_csv_zip(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream a zip with one CSV per sheet.
+
+    Each file is a separate chunked pass over the joined row source, so
+    the query count stays constant and nothing is held in memory.
+    """
+    buffer = StreamBuffer()
+    with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+        for sheet in SHEETS:
+            rows = (
+                row for row in map(sheet.row, iter_export_participants(queryset, chunk_size=chunk_size))
+                if row is not None
+            )
+            file_name = sheet.title.lower().replace(' ', '_') + '.csv'
+            with archive.open(file_name, 'w', force_zip64=True) as member:
+                for text in iter_csv_rows(sheet.headers, rows):
+                    member.write(text.encode('utf-8'))
+                    data = buffer.drain()
+                    if data:
+                        yield data
+    yield buffer.drain()
+
+
+def iter_ndjson(queryset, chunk_size=EXPORT_CHUNK_SIZE):
+    """Stream one JSON object per participant, instruments nested (null if missing).
+
+    Keys are model field names (``email``, ``total_score``...), not the
+    sheet headers; the values are the same cells as the other formats.
+    """
+    for participant in iter_export_participants(queryset, chunk_size=chunk_size):
+        record = dict(zip(PARTICIPANT_SHEET.keys, PARTICIPANT_SHEET.row(participant)))
+        for sheet in INSTRUMENT_SHEETS:
+            row = sheet.row(participant)
+            record[sheet.relation] = dict(zip(sheet.keys[1:], row[1:])) if row else None
+        yield (json.dumps(record, cls=DjangoJSONEncoder, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+# ?format= / --format values other than xlsx: (generator, content type, extension)
+TEXT_FORMATS = {
+    'csv': (iter_csv_zip, ZIP_CONTENT_TYPE, 'zip'),
+    'csv-wide': (iter_wide_csv, CSV_CONTENT_TYPE, 'csv'),
+    'ndjson': (iter_ndjson, NDJSON_CONTENT_TYPE, 'ndjson'),
+}
+
+
+def streaming_export_response(queryset, export_format, filename_base):
+    """StreamingHttpResponse for one of TEXT_FORMATS"""
+    generator, content_type, extension = TEXT_FORMATS[export_format]
+    response = StreamingHttpResponse(generator(queryset), content_type=content_type)
+    response['Content-Disposition'] = f'attachment; filename={filename_base}.{extension}'
+    return response
@@ -0,0 +1,77 @@
+import hashlib
+import threading
+from collections import Counter
+
+from django.core.cache import caches
+from django.db import transaction
+
+from .instruments import REGISTRY_STAMP
+
+# CACHES alias holding feedback responses (see settings.CACHES)
+FEEDBACK_CACHE_ALIAS = 'feedback'
+# Bump when the cached entry's shape changes
+FEEDBACK_CACHE_VERSION = 1
+
+_counters = Counter()
+_counters_lock = threading.Lock()
+
+
+def feedback_cache():
+    return caches[FEEDBACK_CACHE_ALIAS]
+
+
+def feedback_cache_key(email):
+    """Key for a participant's entry.
+
+    Emails are hashed, since memcached rejects some of their characters.
+    The version and registry stamp retire every entry when the payload
+    shape or any scoring rule changes.
+    """
+    digest = hashlib.sha256(email.encode('utf-8')).hexdigest()
+    return f'feedback:{FEEDBACK_CACHE_VERSION}:{REGISTRY_STAMP}:{digest}'
+
+
+def get_cached_feedback(email):
+    """Cached {'feedback': ..., 'timestamps': ...} entry of a participant, or None"""
+    entry = feedback_cache().get(feedback_cache_key(email))
+    with _counters_lock:
+        _counters['hits' if entry is not None else 'misses'] += 1
+    return entry
+
+
+def cache_feedback(email, feedback, timestamps):
+    feedback_cache().set(feedback_cache_key(email), {'feedback': feedback, 'timestamps': timestamps})
+
+
+def invalidate_feedback(emails):
+    """Drop the entries of participants whose answers changed"""
+    feedback_cache().delete_many([feedback_cache_key(email) for email in emails])
+
+
+def invalidate_feedback_after_write(emails):
+    """invalidate_feedback() once the current transaction commits.
+
+    Deleting any earlier would not help: until the commit, concurrent
+    reads still see (and may cache again) the old answers.
+    """
+    emails = list(emails)
+    if emails:
+        transaction.on_commit(lambda: invalidate_feedback(emails))
+
+
+def clear_feedback_cache():
+    """Drop every entry, after rows were rescored in bulk"""
+    feedback_cache().clear()
+
+
+def feedback_cache_stats():
+    """Hit and miss counts of this process (each worker counts its own)"""
+    with _counters_lock:
+        hits, misses = _counters['hits'], _counters['misses']
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': round(hits / lookups, 4) if lookups else None,
+        'backend': feedback_cache().__class__.__name__,
+    }
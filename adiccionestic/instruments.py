@@ -0,0 +1,208 @@
+import hashlib
+
+import numpy as np
+
+# Risk levels, lowest first; an instrument's cut-offs split its scores into these
+RISK_LEVEL_CHOICES = [
+    ('low', 'Bajo'),
+    ('moderate', 'Moderado'),
+    ('high', 'Alto'),
+]
+RISK_LEVELS = [code for code, label in RISK_LEVEL_CHOICES]
+
+
+class Instrument:
+    """Scoring definition of one questionnaire.
+
+    ``items`` are the model fields holding the answers, each in
+    ``[min_value, max_value]``. Answers to ``reverse_items`` are flipped
+    (``min + max - answer``) before summing. ``cutoffs`` are the highest
+    total of every level but the last: ``[12, 18]`` means low up to 12,
+    moderate up to 18, high above. ``feedback`` maps each level to the
+    text shown to participants.
+    """
+
+    def __init__(self, relation, name, items, min_value, max_value, cutoffs, feedback,
+                 reverse_items=()):
+        self.relation = relation
+        self.name = name
+        self.items = list(items)
+        self.min_value = min_value
+        self.max_value = max_value
+        self.cutoffs = list(cutoffs)
+        self.feedback = feedback
+        self.reverse_items = list(reverse_items)
+        self.levels = RISK_LEVELS[:len(self.cutoffs) + 1]
+        self._reverse_columns = [self.items.index(item) for item in self.reverse_items]
+        # Packed responses hold two 4-bit answers per byte
+        if min_value < 0 or max_value > 15:
+            raise ValueError(f'{relation}: answers must lie in 0-15 to be packed')
+        self.packed_size = (len(self.items) + 1) // 2
+
+    def __repr__(self):
+        return f'<Instrument {self.relation}>'
+
+    def answers(self, responses):
+        """Answers of one response set (a model instance or a dict), in ``items`` order"""
+        if isinstance(responses, dict):
+            return [responses[item] for item in self.items]
+        return [getattr(responses, item) for item in self.items]
+
+    def check_range(self, lowest, highest):
+        """Raise ValueError unless every answer lies in [min_value, max_value]"""
+        if lowest < self.min_value or highest > self.max_value:
+            raise ValueError(f'{self.relation}: answers must be between {self.min_value} and {self.max_value}')
+
+    def score(self, responses):
+        """Total score of one response set (a model instance or a dict).
+
+        Raises ValueError for answers outside the valid range, as score_matrix does.
+        """
+        answers = self.answers(responses)
+        if answers:
+            self.check_range(min(answers), max(answers))
+
+        total = 0
+        for item, answer in zip(self.items, answers):
+            if item in self.reverse_items:
+                answer = self.min_value + self.max_value - answer
+            total += answer
+        return total
+
+    def level(self, score):
+        """Risk level of a total score"""
+        for cutoff, level in zip(self.cutoffs, self.levels):
+            if score <= cutoff:
+                return level
+        return self.levels[-1]
+
+    def score_matrix(self, matrix):
+        """Total scores of a (participants x items) answer matrix.
+
+        One vectorized pass; columns follow ``items``. Raises ValueError for a wrongly shaped
+        matrix or answers outside the valid range.
+        """
+        answers = np.asarray(matrix, dtype=np.int64)
+        if answers.ndim != 2 or answers.shape[1] != len(self.items):
+            raise ValueError(f'{self.relation}: expected a (n, {len(self.items)}) matrix, got {answers.shape}')
+        if answers.size:
+            self.check_range(answers.min(), answers.max())
+
+        if self._reverse_columns:
+            answers = answers.copy()
+            answers[:, self._reverse_columns] = self.min_value + self.max_value - answers[:, self._reverse_columns]
+        return answers.sum(axis=1)
+
+    def level_matrix(self, scores):
+        """Risk level of every score in an array (vectorized ``level``)"""
+        indexes = np.searchsorted(np.asarray(self.cutoffs), np.asarray(scores), side='left')
+        return np.asarray(self.levels, dtype=object)[indexes]
+
+    def pack(self, responses):
+        """Answers of one response set (a model instance or a dict) as packed bytes"""
+        return self.pack_matrix([self.answers(responses)])[0].tobytes()
+
+    def pack_matrix(self, matrix):
+        """(participants x items) answers -> (participants x packed_size) uint8.
+
+        Two answers per byte, high nibble first. Raises ValueError for answers outside the valid range.
+        """
+        answers = np.asarray(matrix, dtype=np.int64)
+        if answers.size:
+            self.check_range(answers.min(), answers.max())
+        answers = answers.astype(np.uint8)
+        if answers.shape[1] % 2:
+            answers = np.pad(answers, ((0, 0), (0, 1)))
+        return (answers[:, 0::2] << 4) | answers[:, 1::2]
+
+    def unpack(self, packed):
+        """Packed bytes -> {item: answer}"""
+        return dict(zip(self.items, self.unpack_matrix([packed])[0].tolist()))
+
+    def unpack_matrix(self, packed_rows):
+        """Packed responses of many rows -> (participants x items) int64.
+
+        One frombuffer over the concatenated rows, no per-item Python work.
+        Raises ValueError for missing or wrongly sized rows.
+        """
+        packed_rows = list(packed_rows)
+        if any(packed is None or len(packed) != self.packed_size for packed in packed_rows):
+            raise ValueError(f'{self.relation}: packed responses missing or not {self.packed_size} bytes')
+
+        packed = np.frombuffer(b''.join(packed_rows), dtype=np.uint8).reshape(len(packed_rows), self.packed_size)
+        answers = np.empty((len(packed_rows), self.packed_size * 2), dtype=np.int64)
+        answers[:, 0::2] = packed >> 4
+        answers[:, 1::2] = packed & 0x0F
+        return answers[:, :len(self.items)]
+
+    def response_matrix(self, queryset):
+        """Answer matrix of an instrument queryset, reading only the packed column"""
+        return self.unpack_matrix(queryset.values_list('responses', flat=True))
+
+
+BERGEN_ITEMS = [
+    'q1_salience', 'q2_tolerance', 'q3_mood_modification',
+    'q4_relapse', 'q5_withdrawal', 'q6_conflict',
+]
+
+
+def numbered_items(count):
+    return [f'q{i}' for i in range(1, count + 1)]
+
+
+# Every instrument, keyed by its reverse relation on Participant, in survey order
+REGISTRY = {instrument.relation: instrument for instrument in [
+    Instrument(
+        'bergen_tiktok', 'Bergen TikTok', BERGEN_ITEMS, 1, 5,
+        cutoffs=[12, 18],
+        feedback={
+            'low': 'Bajo riesgo de adicción a TikTok',
+            'moderate': 'Riesgo moderado de adicción a TikTok',
+            'high': 'Alto riesgo de adicción a TikTok',
+        },
+    ),
+    Instrument(
+        'bergen_instagram', 'Bergen Instagram', BERGEN_ITEMS, 1, 5,
+        cutoffs=[12, 18],
+        feedback={
+            'low': 'Bajo riesgo de adicción a Instagram',
+            'moderate': 'Riesgo moderado de adicción a Instagram',
+            'high': 'Alto riesgo de adicción a Instagram',
+        },
+    ),
+    Instrument(
+        'ucla_loneliness', 'UCLA Loneliness', numbered_items(10), 1, 4,
+        cutoffs=[25, 34],
+        feedback={
+            'low': 'Nivel bajo de soledad',
+            'moderate': 'Nivel moderado de soledad',
+            'high': 'Nivel alto de soledad',
+        },
+    ),
+    Instrument(
+        'prefrontal_symptoms', 'Prefrontal Symptoms', numbered_items(20), 0, 4,
+        cutoffs=[20, 40],
+        feedback={
+            'low': 'Síntomas prefrontales mínimos',
+            'moderate': 'Síntomas prefrontales leves a moderados',
+            'high': 'Síntomas prefrontales significativos',
+        },
+    ),
+    Instrument(
+        'caids', 'CAIDS', numbered_items(20), 1, 5,
+        cutoffs=[26, 39],
+        feedback={
+            'low': 'Baja dependencia de IA conversacional',
+            'moderate': 'Dependencia moderada de IA conversacional',
+            'high': 'Alta dependencia de IA conversacional',
+        },
+    ),
+]}
+
+# Changes whenever an item, range, cut-off or feedback text does, so caches
+# of derived results can key on it
+REGISTRY_STAMP = hashlib.sha256(repr([
+    (instrument.relation, instrument.items, instrument.min_value, instrument.max_value,
+     instrument.reverse_items, instrument.cutoffs, sorted(instrument.feedback.items()))
+    for instrument in REGISTRY.values()
+]).encode('utf-8')).hexdigest()[:12]
@@ -1,10 +1,7 @@
-# Save this file as: surveys/management/commands/export_survey_data.py
-
 from django.core.management.base import BaseCommand
-from django.utils import timezone
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
-from surveys.models import Participant
+from adiccionestic.models import Participant
+from adiccionestic.exports import ExcelExport, TEXT_FORMATS, count_instruments, filter_participants
+from adiccionestic.instruments import REGISTRY
 import os
 
 
@@ -30,8 +27,21 @@ class Command(BaseCommand):
         parser.add_argument(
             '--output',
             type=str,
-            default='survey_export.xlsx',
-            help='Output filename (default: survey_export.xlsx)',
+            help='Output filename (default: survey_export.<format extension>)',
+        )
+        parser.add_argument(
+            '--format',
+            type=str,
+            choices=['xlsx', 'csv', 'ndjson'],
+            default='xlsx',
+            help='xlsx workbook, csv (zip with one CSV per sheet) or ndjson (default: xlsx)',
+        )
+        parser.add_argument(
+            '--layout',
+            type=str,
+            choices=['sheets', 'wide'],
+            default='sheets',
+            help='With --format csv, "wide" writes a single CSV with one row per participant',
         )
         parser.add_argument(
             '--output-dir',
@@ -42,20 +52,20 @@ class Command(BaseCommand):
 
     def handle(self, *args, **options):
         # Build queryset
-        queryset = Participant.objects.all()
-
         if options['location']:
-            queryset = queryset.filter(location=options['location'])
             self.stdout.write(f"Filtering by location: {options['location']}")
-
         if options['start_date']:
-            queryset = queryset.filter(created_at__gte=options['start_date'])
             self.stdout.write(f"Filtering from date: {options['start_date']}")
-
         if options['end_date']:
-            queryset = queryset.filter(created_at__lte=options['end_date'])
             self.stdout.write(f"Filtering to date: {options['end_date']}")
 
+        queryset = filter_participants(
+            Participant.objects.all(),
+            location=options['location'],
+            start_date=options['start_date'],
+            end_date=options['end_date'],
+        )
+
         # Check if we have data
         count = queryset.count()
         if count == 0:
@@ -64,23 +74,21 @@ class Command(BaseCommand):
 
         self.stdout.write(f"Found {count} participants")
 
-        # Create workbook
-        self.stdout.write("Creating Excel workbook...")
-        wb = openpyxl.Workbook()
-        wb.remove(wb.active)
-
-        # Create sheets
-        self._create_summary_sheet(wb, queryset)
-        self._create_participants_sheet(wb, queryset)
-        self._create_bergen_tiktok_sheet(wb, queryset)
-        self._create_bergen_instagram_sheet(wb, queryset)
-        self._create_ucla_loneliness_sheet(wb, queryset)
-        self._create_prefrontal_symptoms_sheet(wb, queryset)
-        self._create_caids_sheet(wb, queryset)
+        export_format = options['format']
+        if export_format == 'csv' and options['layout'] == 'wide':
+            export_format = 'csv-wide'
+        if export_format in TEXT_FORMATS:
+            output_path = self._write_text_export(queryset, export_format, options)
+            self.stdout.write(
+                self.style.SUCCESS(f'✅ Successfully exported data to: {output_path}')
+            )
+            self.stdout.write(f'📊 Total participants: {count}')
+            return
 
-        # Save file
-        output_path = os.path.join(options['output_dir'], options['output'])
-        wb.save(output_path)
+        # Write-only workbook, so large exports do not need to fit in memory
+        self.stdout.write("Creating Excel workbook...")
+        output_path = os.path.join(options['output_dir'], options['output'] or 'survey_export.xlsx')
+        ExcelExport(queryset).save(output_path)
 
         self.stdout.write(
             self.style.SUCCESS(f'✅ Successfully exported data to: {output_path}')
@@ -88,247 +96,19 @@ class Command(BaseCommand):
         self.stdout.write(f'📊 Total participants: {count}')
         
         # Show statistics
-        instruments = [
-            ('Bergen TikTok', 'bergen_tiktok'),
-            ('Bergen Instagram', 'bergen_instagram'),
-            ('UCLA Loneliness', 'ucla_loneliness'),
-            ('Prefrontal Symptoms', 'prefrontal_symptoms'),
-            ('CAIDS', 'caids'),
-        ]
-        
         self.stdout.write("\n📈 Instrument Completion:")
-        for name, attr in instruments:
-            inst_count = sum(1 for p in queryset if hasattr(p, attr))
+        instrument_counts = count_instruments(queryset)
+        for attr, instrument in REGISTRY.items():
+            name = instrument.name
+            inst_count = instrument_counts[attr]
             percentage = (inst_count / count * 100) if count > 0 else 0
             self.stdout.write(f"  - {name}: {inst_count}/{count} ({percentage:.1f}%)")
 
-    def _create_summary_sheet(self, wb, queryset):
-        """Create summary sheet"""
-        ws = wb.create_sheet("Summary", 0)
-        
-        ws['A1'] = 'SURVEY DATA EXPORT - COMMAND LINE'
-        ws['A1'].font = Font(size=16, bold=True)
-        ws.merge_cells('A1:D1')
-        
-        ws['A3'] = 'Export Date:'
-        ws['B3'] = timezone.now().strftime('%Y-%m-%d %H:%M:%S')
-        ws['A4'] = 'Total Records:'
-        ws['B4'] = queryset.count()
-        
-        # Add filters info
-        row = 6
-        ws[f'A{row}'] = 'Applied Filters:'
-        ws[f'A{row}'].font = Font(bold=True)
-        
-        self._auto_adjust_columns(ws)
-
-    def _create_participants_sheet(self, wb, queryset):
-        """Create participants sheet"""
-        ws = wb.create_sheet("Participants")
-        
-        headers = [
-            'Email', 'Location', 'Country', 'Age', 'Gender', 'Gender Other',
-            'Living With', 'Living With Other', 'University', 'Career',
-            'Current Semester', 'Marital Status', 
-            'GPA Last Semester',
-            'Repeated Cycles', 'Repeated Cycles Count', 'Residence Sector',
-            'Socioeconomic Level', 'Income Sources', 
-             'uses_conversational_ai', 'ai_daily_hours_weekday', 'ai_daily_hours_weekend', 'ai_start_age', 'ai_use_purpose',
-             'has_tiktok_account', 'tiktok_daily_hours_weekday', 'tiktok_daily_hours_weekend', 'tiktok_start_age',
-             'has_instagram_account', 'instagram_daily_hours_weekday', 'instagram_daily_hours_weekend', 'instagram_start_age',
-             'parents_control_screen_time', 'has_stable_friend_group', 'has_frequent_positive_communication', 'participates_in_social_activities',
-              'Consent Accepted',
-            'Consent Date', 'Feedback Sent', 'Created At'
-        ]
-        
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            row = [
-                participant.email,
-                participant.get_location_display(),
-                participant.country or '',
-                participant.age or '',
-                participant.get_gender_display() if participant.gender else '',
-                participant.gender_other or '',
-                participant.get_living_with_display() if participant.living_with else '',
-                participant.living_with_other or '',
-                participant.university or '',
-                participant.career or '',
-                participant.get_current_semester_display() if participant.current_semester else '',
-                participant.get_marital_status_display() if participant.marital_status else '',
-                float(participant.gpa_last_semester) if participant.gpa_last_semester else '',
-                'Yes' if participant.repeated_cycles else 'No',
-                participant.repeated_cycles_count or '',
-                participant.get_residence_sector_display() if participant.residence_sector else '',
-                participant.get_socioeconomic_level_display() if participant.socioeconomic_level else '',
-                participant.income_sources or '',
-
-                'Yes' if participant.uses_conversational_ai else 'No',
-                participant.ai_daily_hours_weekday if participant.uses_conversational_ai else '',
-                participant.ai_daily_hours_weekend if participant.uses_conversational_ai else '',
-                participant.ai_start_age if participant.uses_conversational_ai else '',
-                participant.ai_use_purpose if participant.uses_conversational_ai else '',
-                'Yes' if participant.has_tiktok_account else 'No',
-                participant.tiktok_daily_hours_weekday if participant.has_tiktok_account else '',
-                participant.tiktok_daily_hours_weekend if participant.has_tiktok_account else '',
-                participant.tiktok_start_age if participant.has_tiktok_account else '',
-                'Yes' if participant.has_instagram_account else 'No',
-                participant.instagram_daily_hours_weekday if participant.has_instagram_account else '',
-                participant.instagram_daily_hours_weekend if participant.has_instagram_account else '',
-                participant.instagram_start_age if participant.has_instagram_account else '',
-                'Yes' if participant.parents_control_screen_time else 'No',
-                'Yes' if participant.has_stable_friend_group else 'No',
-                'Yes' if participant.has_frequent_positive_communication else 'No',
-                'Yes' if participant.participates_in_social_activities else 'No',
-                
-                'Yes' if participant.consent_accepted else 'No',
-                participant.consent_date.strftime('%Y-%m-%d %H:%M:%S') if participant.consent_date else '',
-                'Yes' if participant.feedback_sent else 'No',
-                participant.created_at.strftime('%Y-%m-%d %H:%M:%S') if participant.created_at else '',
-            ]
-            ws.append(row)
-        
-        self._auto_adjust_columns(ws)
-
-    def _create_bergen_tiktok_sheet(self, wb, queryset):
-        """Create Bergen TikTok sheet"""
-        ws = wb.create_sheet("Bergen TikTok")
-        
-        headers = [
-            'Email', 'Q1 Salience', 'Q2 Tolerance', 'Q3 Mood Modification',
-            'Q4 Relapse', 'Q5 Withdrawal', 'Q6 Conflict', 'Total Score',
-            'Feedback', 'Created At'
-        ]
-        
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'bergen_tiktok'):
-                bt = participant.bergen_tiktok
-                ws.append([
-                    participant.email, bt.q1_salience, bt.q2_tolerance,
-                    bt.q3_mood_modification, bt.q4_relapse, bt.q5_withdrawal,
-                    bt.q6_conflict, bt.total_score, bt.get_feedback(),
-                    bt.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-        
-        self._auto_adjust_columns(ws)
-
-    def _create_bergen_instagram_sheet(self, wb, queryset):
-        """Create Bergen Instagram sheet"""
-        ws = wb.create_sheet("Bergen Instagram")
-        
-        headers = [
-            'Email', 'Q1 Salience', 'Q2 Tolerance', 'Q3 Mood Modification',
-            'Q4 Relapse', 'Q5 Withdrawal', 'Q6 Conflict', 'Total Score',
-            'Feedback', 'Created At'
-        ]
-        
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'bergen_instagram'):
-                bi = participant.bergen_instagram
-                ws.append([
-                    participant.email, bi.q1_salience, bi.q2_tolerance,
-                    bi.q3_mood_modification, bi.q4_relapse, bi.q5_withdrawal,
-                    bi.q6_conflict, bi.total_score, bi.get_feedback(),
-                    bi.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-        
-        self._auto_adjust_columns(ws)
-
-    def _create_ucla_loneliness_sheet(self, wb, queryset):
-        """Create UCLA Loneliness sheet"""
-        ws = wb.create_sheet("UCLA Loneliness")
-        
-        headers = ['Email'] + [f'Q{i}' for i in range(1, 11)] + ['Total Score', 'Feedback', 'Created At']
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'ucla_loneliness'):
-                ul = participant.ucla_loneliness
-                row = [participant.email]
-                row.extend([getattr(ul, f'q{i}') for i in range(1, 11)])
-                row.extend([
-                    ul.total_score, ul.get_feedback(),
-                    ul.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-                ws.append(row)
-        
-        self._auto_adjust_columns(ws)
-
-    def _create_prefrontal_symptoms_sheet(self, wb, queryset):
-        """Create Prefrontal Symptoms sheet"""
-        ws = wb.create_sheet("Prefrontal Symptoms")
-        
-        headers = ['Email'] + [f'Q{i}' for i in range(1, 21)] + ['Total Score', 'Feedback', 'Created At']
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'prefrontal_symptoms'):
-                ps = participant.prefrontal_symptoms
-                row = [participant.email]
-                row.extend([getattr(ps, f'q{i}') for i in range(1, 21)])
-                row.extend([
-                    ps.total_score, ps.get_feedback(),
-                    ps.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-                ws.append(row)
-        
-        self._auto_adjust_columns(ws)
-
-    def _create_caids_sheet(self, wb, queryset):
-        """Create CAIDS sheet"""
-        ws = wb.create_sheet("CAIDS")
-        
-        headers = ['Email'] + [f'Q{i}' for i in range(1, 21)] + ['Total Score', 'Feedback', 'Created At']
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'caids'):
-                caids = participant.caids
-                row = [participant.email]
-                row.extend([getattr(caids, f'q{i}') for i in range(1, 21)])
-                row.extend([
-                    caids.total_score, caids.get_feedback(),
-                    caids.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-                ws.append(row)
-        
-        self._auto_adjust_columns(ws)
-
-    def _write_header_row(self, ws, headers):
-        """Write and style header row"""
-        ws.append(headers)
-        
-        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-        header_font = Font(color='FFFFFF', bold=True)
-        
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-
-    def _auto_adjust_columns(self, ws):
-        """Auto-adjust column widths, skipping merged cells"""
-        for column in ws.columns:
-            max_length = 0
-            column_letter = None
-
-            for cell in column:
-                # Skip merged cells — they don't have column_letter
-                if cell.__class__.__name__ == 'MergedCell':
-                    continue
-                if column_letter is None:
-                    column_letter = cell.column_letter
-                try:
-                    if cell.value and len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-
-            if column_letter:
-                adjusted_width = min(max_length + 2, 50)
-                ws.column_dimensions[column_letter].width = adjusted_width
\ No newline at end of file
+    def _write_text_export(self, queryset, export_format, options):
+        """Stream a csv/ndjson export to disk chunk by chunk"""
+        generator, content_type, extension = TEXT_FORMATS[export_format]
+        output_path = os.path.join(options['output_dir'], options['output'] or f'survey_export.{extension}')
+        with open(output_path, 'wb') as f:
+            for chunk in generator(queryset):
+                f.write(chunk)
+        return output_path
@@ -0,0 +1,44 @@
+from django.core.management.base import BaseCommand
+
+from adiccionestic.stats import aggregate_counts, counter_keys, dashboard_statistics, rebuild_counters
+from adiccionestic.models import StatisticsCounter
+
+
+class Command(BaseCommand):
+    help = (
+        'Backfill or repair the statistics counters from the base tables. '
+        'Run once after deploying the counters table, and after bulk deletes '
+        'or admin edits, which do not update the counters.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--check',
+            action='store_true',
+            help='Only report counters that drifted, without writing them',
+        )
+
+    def handle(self, *args, **options):
+        if options['check']:
+            existing = dict(StatisticsCounter.objects.values_list('key', 'value'))
+            counts = aggregate_counts()
+            changes = {
+                key: (existing.get(key), counts[key])
+                for key in counter_keys()
+                if existing.get(key) != counts[key]
+            }
+        else:
+            changes = rebuild_counters()
+            # Every worker serves the repaired counters without waiting for
+            # the shared aggregates cache to expire
+            dashboard_statistics.invalidate()
+
+        for key, (old_value, new_value) in sorted(changes.items()):
+            self.stdout.write(f"  - {key}: {old_value if old_value is not None else 'missing'} -> {new_value}")
+
+        if not changes:
+            self.stdout.write(self.style.SUCCESS('✅ Statistics counters are up to date'))
+        elif options['check']:
+            self.stdout.write(self.style.WARNING(f'{len(changes)} counters out of date'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ Rebuilt {len(changes)} counters'))
@@ -0,0 +1,153 @@
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection, transaction
+from django.utils import timezone
+
+from adiccionestic.feedback_cache import clear_feedback_cache
+from adiccionestic.models import INSTRUMENT_MODELS
+
+# Rows read, scored and written back per transaction
+RESCORE_CHUNK_SIZE = 5000
+# Changed rows listed per instrument by --dry-run
+DRY_RUN_SAMPLE = 10
+
+
+def rescore_model(model, chunk_size=RESCORE_CHUNK_SIZE, dry_run=False):
+    """Recompute total_score, risk_level and packed responses of every row of an instrument model.
+
+    Walks the table in primary-key order, one chunk per transaction:
+    a values_list read, one vectorized score_matrix / level_matrix /
+    pack_matrix call, and a bulk_update of the rows where any of them
+    changed. Returns a
+    report dict with the rows scanned and changed, a sample of (pk, old,
+    new) score changes and a Counter of (old level, new level) moves.
+    """
+    instrument = model.instrument
+    report = {'scanned': 0, 'changed': 0, 'sample': [], 'moves': Counter()}
+    last_pk = 0
+
+    while True:
+        with transaction.atomic():
+            rows = list(
+                model.objects.filter(pk__gt=last_pk).order_by('pk')
+                .values_list('pk', 'total_score', 'risk_level', 'responses', *instrument.items)[:chunk_size]
+            )
+            if not rows:
+                break
+            last_pk = rows[-1][0]
+
+            pks = np.array([row[0] for row in rows])
+            # Never-scored rows read as NaN / None, so they always count as changed
+            old_scores = np.array([row[1] for row in rows], dtype=np.float64)
+            old_levels = np.array([row[2] for row in rows], dtype=object)
+            answers = [row[4:] for row in rows]
+            try:
+                new_scores = instrument.score_matrix(answers)
+            except ValueError as exc:
+                raise CommandError(f'{model._meta.db_table} rows {rows[0][0]}-{last_pk}: {exc}')
+            new_levels = instrument.level_matrix(new_scores)
+            new_packed = [packed.tobytes() for packed in instrument.pack_matrix(answers)]
+            stale_packed = np.array([
+                row[3] is None or bytes(row[3]) != packed for row, packed in zip(rows, new_packed)
+            ], dtype=bool)
+
+            changed = np.flatnonzero((old_scores != new_scores) | (old_levels != new_levels) | stale_packed)
+            report['scanned'] += len(rows)
+            report['changed'] += len(changed)
+            report['moves'].update(zip(old_levels[changed].tolist(), new_levels[changed].tolist()))
+            for index in changed[:DRY_RUN_SAMPLE - len(report['sample'])]:
+                old_score = None if np.isnan(old_scores[index]) else int(old_scores[index])
+                report['sample'].append((int(pks[index]), old_score, int(new_scores[index])))
+
+            if not dry_run and len(changed):
+                # bulk_update skips auto_now; moving updated_at changes the participant's ETag
+                now = timezone.now()
+                model.objects.bulk_update(
+                    [
+                        model(
+                            pk=int(pks[index]),
+                            total_score=int(new_scores[index]),
+                            risk_level=new_levels[index],
+                            responses=new_packed[index],
+                            updated_at=now,
+                        )
+                        for index in changed
+                    ],
+                    ['total_score', 'risk_level', 'responses', 'updated_at'],
+                )
+
+    return report
+
+
+class Command(BaseCommand):
+    help = (
+        'Recompute every instrument total_score, risk_level and packed responses '
+        'from the instrument registry. Run after changing items, reverse-keyed items '
+        'or cut-offs, and once to backfill rows saved before those columns existed.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--instrument',
+            action='append',
+            choices=list(INSTRUMENT_MODELS),
+            help='Only rescore this instrument (repeatable, default: all)',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=RESCORE_CHUNK_SIZE,
+            help=f'Rows per read/update transaction (default: {RESCORE_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--jobs',
+            type=int,
+            default=1,
+            help='Instrument tables rescored in parallel, one connection each (default: 1)',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only report the scores and levels that would change, without writing them',
+        )
+
+    def handle(self, *args, **options):
+        relations = options['instrument'] or list(INSTRUMENT_MODELS)
+
+        def rescore(relation):
+            return rescore_model(INSTRUMENT_MODELS[relation], options['chunk_size'], options['dry_run'])
+
+        def rescore_in_thread(relation):
+            try:
+                return rescore(relation)
+            finally:
+                # Each worker thread opened its own connection
+                connection.close()
+
+        if options['jobs'] > 1:
+            with ThreadPoolExecutor(max_workers=options['jobs']) as pool:
+                reports = dict(zip(relations, pool.map(rescore_in_thread, relations)))
+        else:
+            reports = {relation: rescore(relation) for relation in relations}
+
+        verb = 'would change' if options['dry_run'] else 'changed'
+        for relation, report in reports.items():
+            self.stdout.write(f"{relation}: {report['scanned']} rows, {report['changed']} {verb}")
+            for pk, old_score, new_score in report['sample']:
+                self.stdout.write(f"  - id {pk}: {old_score if old_score is not None else 'missing'} -> {new_score}")
+            for (old_level, new_level), count in sorted(report['moves'].items(), key=str):
+                if old_level != new_level:
+                    self.stdout.write(f"  {old_level or 'missing'} -> {new_level}: {count}")
+
+        total = sum(report['changed'] for report in reports.values())
+        if total and not options['dry_run']:
+            clear_feedback_cache()
+        if not total:
+            self.stdout.write(self.style.SUCCESS('✅ Instrument scores are up to date'))
+        elif options['dry_run']:
+            self.stdout.write(self.style.WARNING(f'{total} scores out of date'))
+        else:
+            self.stdout.write(self.style.SUCCESS(f'✅ Rescored {total} rows'))
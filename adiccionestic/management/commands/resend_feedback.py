@@ -0,0 +1,100 @@
+import json
+import os
+
+from django.core.management.base import BaseCommand
+
+from adiccionestic.circuit import CircuitOpen
+from adiccionestic.resend import (
+    resend_feedback, unsent_participants, RESEND_CHUNK_SIZE, RESEND_RATE, RESEND_WORKERS
+)
+
+
+class Command(BaseCommand):
+    help = (
+        'Email feedback to every participant with feedback_sent=False that has no '
+        'pending outbox message. Progress is checkpointed after every chunk, so an '
+        'interrupted run, or one stopped by the open Mailgun circuit breaker, picks '
+        'up where it stopped.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--workers',
+            type=int,
+            default=RESEND_WORKERS,
+            help=f'Sending threads, each with its own email connection (default: {RESEND_WORKERS})',
+        )
+        parser.add_argument(
+            '--rate',
+            type=float,
+            default=RESEND_RATE,
+            help=f'Messages per second across all workers, 0 for no limit (default: {RESEND_RATE})',
+        )
+        parser.add_argument(
+            '--chunk-size',
+            type=int,
+            default=RESEND_CHUNK_SIZE,
+            help=f'Participants read and checkpointed at a time (default: {RESEND_CHUNK_SIZE})',
+        )
+        parser.add_argument(
+            '--checkpoint',
+            type=str,
+            default='resend_feedback.checkpoint',
+            help='Progress file, removed once the run completes (default: resend_feedback.checkpoint)',
+        )
+        parser.add_argument(
+            '--restart',
+            action='store_true',
+            help='Ignore an existing checkpoint and start from the first participant',
+        )
+        parser.add_argument(
+            '--dry-run',
+            action='store_true',
+            help='Only count the participants that would be mailed',
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = options['checkpoint']
+        state = {'last_pk': 0, 'sent': 0, 'failed': 0}
+        if os.path.exists(checkpoint) and not options['restart']:
+            with open(checkpoint) as f:
+                state = json.load(f)
+            self.stdout.write(f"Resuming after participant {state['last_pk']}")
+
+        if options['dry_run']:
+            count = unsent_participants().filter(pk__gt=state['last_pk']).count()
+            self.stdout.write(f'{count} participants would be mailed')
+            return
+
+        def progress(last_pk, stats):
+            # Write then rename, so an interruption never leaves a torn file
+            with open(f'{checkpoint}.tmp', 'w') as f:
+                json.dump({
+                    'last_pk': last_pk,
+                    'sent': state['sent'] + stats['sent'],
+                    'failed': state['failed'] + stats['failed'],
+                }, f)
+            os.replace(f'{checkpoint}.tmp', checkpoint)
+            self.stdout.write(f"Up to participant {last_pk}: sent {stats['sent']}, failed {stats['failed']}")
+
+        try:
+            stats = resend_feedback(
+                chunk_size=options['chunk_size'],
+                workers=options['workers'],
+                rate=options['rate'],
+                after_pk=state['last_pk'],
+                progress=progress,
+            )
+        except CircuitOpen as e:
+            # The checkpoint stays, so the next run resumes after the last settled participant
+            self.stdout.write(self.style.WARNING(f'{e}; run again after that to resume'))
+            return
+
+        if os.path.exists(checkpoint):
+            os.remove(checkpoint)
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Feedback resent - sent {state['sent'] + stats['sent']}, "
+                f"failed {state['failed'] + stats['failed']}"
+            )
+        )
@@ -0,0 +1,73 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from adiccionestic.emails import (
+    deliver_pending_emails, OUTBOX_BATCH_SIZE, OUTBOX_MAX_ATTEMPTS, OUTBOX_BACKOFF_SECONDS
+)
+
+
+class Command(BaseCommand):
+    help = 'Deliver queued feedback emails from the outbox'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=OUTBOX_BATCH_SIZE,
+            help=f'Messages claimed per batch (default: {OUTBOX_BATCH_SIZE})',
+        )
+        parser.add_argument(
+            '--max-attempts',
+            type=int,
+            default=OUTBOX_MAX_ATTEMPTS,
+            help=f'Attempts before a message is marked as failed (default: {OUTBOX_MAX_ATTEMPTS})',
+        )
+        parser.add_argument(
+            '--backoff',
+            type=int,
+            default=OUTBOX_BACKOFF_SECONDS,
+            help=f'Base retry delay in seconds, doubled on every attempt (default: {OUTBOX_BACKOFF_SECONDS})',
+        )
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds to sleep when the outbox is empty (default: 5)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Drain the due messages and exit instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        totals = {'sent': 0, 'retried': 0, 'deferred': 0, 'failed': 0}
+
+        while True:
+            stats = deliver_pending_emails(
+                batch_size=options['batch_size'],
+                max_attempts=options['max_attempts'],
+                backoff=options['backoff'],
+            )
+            for key, value in stats.items():
+                totals[key] += value
+
+            if any(stats.values()):
+                self.stdout.write(
+                    f"Sent: {stats['sent']}  Retrying: {stats['retried']}  "
+                    f"Deferred: {stats['deferred']}  Failed: {stats['failed']}"
+                )
+                continue
+
+            if options['once']:
+                break
+
+            time.sleep(options['poll_interval'])
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"✅ Outbox drained - sent {totals['sent']}, "
+                f"retrying {totals['retried']}, deferred {totals['deferred']}, failed {totals['failed']}"
+            )
+        )
@@ -0,0 +1,46 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from adiccionestic.export_jobs import claim_next_job, purge_expired_exports, run_export_job
+from adiccionestic.models import ExportJob
+
+
+class Command(BaseCommand):
+    help = 'Generate queued background exports and delete the files of expired ones'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--poll-interval',
+            type=float,
+            default=5,
+            help='Seconds to sleep when no job is queued (default: 5)',
+        )
+        parser.add_argument(
+            '--once',
+            action='store_true',
+            help='Process the queued jobs and exit instead of polling forever',
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            job = claim_next_job()
+
+            if job is None:
+                expired = purge_expired_exports()
+                if expired:
+                    self.stdout.write(f'Deleted {expired} expired export files')
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            self.stdout.write(f"Running export {job.id} with filters {job.filters}")
+            job = run_export_job(job)
+
+            if job.status == ExportJob.STATUS_DONE:
+                self.stdout.write(
+                    self.style.SUCCESS(f'✅ Export {job.id}: {job.total_records} participants -> {job.file_name}')
+                )
+            else:
+                self.stdout.write(self.style.ERROR(f'❌ Export {job.id} failed: {job.error}'))
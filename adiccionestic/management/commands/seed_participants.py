@@ -0,0 +1,92 @@
+import random
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from adiccionestic.models import Participant
+from adiccionestic.models import INSTRUMENT_MODELS
+
+
+class Command(BaseCommand):
+    help = 'Create synthetic participants with random responses (benchmark fixture)'
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--count',
+            type=int,
+            default=100000,
+            help='Number of participants to create (default: 100000)',
+        )
+        parser.add_argument(
+            '--batch-size',
+            type=int,
+            default=5000,
+            help='Rows per bulk INSERT (default: 5000)',
+        )
+        parser.add_argument(
+            '--completion-rate',
+            type=float,
+            default=0.8,
+            help='Probability that a participant completed each instrument (default: 0.8)',
+        )
+        parser.add_argument(
+            '--prefix',
+            type=str,
+            default='seed',
+            help='Email prefix, so repeated runs do not collide (default: seed)',
+        )
+        parser.add_argument(
+            '--seed',
+            type=int,
+            default=0,
+            help='Random seed (default: 0)',
+        )
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        count = options['count']
+        batch_size = options['batch_size']
+
+        created = 0
+        while created < count:
+            size = min(batch_size, count - created)
+            self._create_batch(rng, created, size, options)
+            created += size
+            self.stdout.write(f"Created {created}/{count} participants")
+
+        self.stdout.write(self.style.SUCCESS(f'✅ Seeded {count} participants'))
+
+    @transaction.atomic
+    def _create_batch(self, rng, offset, size, options):
+        participants = Participant.objects.bulk_create([
+            Participant(
+                email=f"{options['prefix']}-{offset + i}@example.com",
+                location=rng.choice(['EC', 'CL']),
+                age=rng.randint(17, 35),
+                gender=rng.choice(['M', 'F', 'O', None]),
+                university='Universidad de prueba',
+                feedback_sent=rng.random() < 0.5,
+            )
+            for i in range(size)
+        ])
+
+        for model in INSTRUMENT_MODELS.values():
+            instrument = model.instrument
+            rows = []
+            for participant in participants:
+                if rng.random() >= options['completion_rate']:
+                    continue
+                answers = {
+                    item: rng.randint(instrument.min_value, instrument.max_value)
+                    for item in instrument.items
+                }
+                # bulk_create skips save(), so score here
+                score = instrument.score(answers)
+                rows.append(model(
+                    participant=participant,
+                    total_score=score,
+                    risk_level=instrument.level(score),
+                    responses=instrument.pack(answers),
+                    **answers,
+                ))
+            model.objects.bulk_create(rows)
@@ -0,0 +1,17 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adiccionestic', '0004_export_jobs'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['-created_at', '-id'], name='participant_created_idx'),
+        ),
+    ]
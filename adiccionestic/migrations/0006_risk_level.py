@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adiccionestic', '0005_participant_created_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bergeninstagram',
+            name='risk_level',
+            field=models.CharField(choices=[('low', 'Bajo'), ('moderate', 'Moderado'), ('high', 'Alto')], db_index=True, editable=False, max_length=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='bergentiktok',
+            name='risk_level',
+            field=models.CharField(choices=[('low', 'Bajo'), ('moderate', 'Moderado'), ('high', 'Alto')], db_index=True, editable=False, max_length=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='caids',
+            name='risk_level',
+            field=models.CharField(choices=[('low', 'Bajo'), ('moderate', 'Moderado'), ('high', 'Alto')], db_index=True, editable=False, max_length=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='prefrontalsymptoms',
+            name='risk_level',
+            field=models.CharField(choices=[('low', 'Bajo'), ('moderate', 'Moderado'), ('high', 'Alto')], db_index=True, editable=False, max_length=8, null=True),
+        ),
+        migrations.AddField(
+            model_name='uclaloneliness',
+            name='risk_level',
+            field=models.CharField(choices=[('low', 'Bajo'), ('moderate', 'Moderado'), ('high', 'Alto')], db_index=True, editable=False, max_length=8, null=True),
+        ),
+    ]
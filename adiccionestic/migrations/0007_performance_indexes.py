@@ -0,0 +1,70 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adiccionestic', '0006_risk_level'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='bergeninstagram',
+            name='risk_level',
+            field=models.CharField(choices=[('low', 'Bajo'), ('moderate', 'Moderado'), ('high', 'Alto')], editable=False, max_length=8, null=True),
+        ),
+        migrations.AlterField(
+            model_name='bergentiktok',
+            name='risk_level',
+            field=models.CharField(choices=[('low', 'Bajo'), ('moderate', 'Moderado'), ('high', 'Alto')], editable=False, max_length=8, null=True),
+        ),
+        migrations.AlterField(
+            model_name='caids',
+            name='risk_level',
+            field=models.CharField(choices=[('low', 'Bajo'), ('moderate', 'Moderado'), ('high', 'Alto')], editable=False, max_length=8, null=True),
+        ),
+        migrations.AlterField(
+            model_name='prefrontalsymptoms',
+            name='risk_level',
+            field=models.CharField(choices=[('low', 'Bajo'), ('moderate', 'Moderado'), ('high', 'Alto')], editable=False, max_length=8, null=True),
+        ),
+        migrations.AlterField(
+            model_name='uclaloneliness',
+            name='risk_level',
+            field=models.CharField(choices=[('low', 'Bajo'), ('moderate', 'Moderado'), ('high', 'Alto')], editable=False, max_length=8, null=True),
+        ),
+        migrations.AddIndex(
+            model_name='bergeninstagram',
+            index=models.Index(fields=['risk_level', 'total_score'], name='bergen_instagram_risk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='bergentiktok',
+            index=models.Index(fields=['risk_level', 'total_score'], name='bergen_tiktok_risk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='caids',
+            index=models.Index(fields=['risk_level', 'total_score'], name='caids_risk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['location', '-created_at'], name='participant_loc_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(fields=['gender', '-created_at'], name='participant_gender_created_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(condition=models.Q(('feedback_sent', False)), fields=['-created_at'], name='participant_unsent_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='prefrontalsymptoms',
+            index=models.Index(fields=['risk_level', 'total_score'], name='prefrontal_symptoms_risk_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='uclaloneliness',
+            index=models.Index(fields=['risk_level', 'total_score'], name='ucla_loneliness_risk_idx'),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adiccionestic', '0007_performance_indexes'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='bergeninstagram',
+            name='responses',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='bergentiktok',
+            name='responses',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='caids',
+            name='responses',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='prefrontalsymptoms',
+            name='responses',
+            field=models.BinaryField(null=True),
+        ),
+        migrations.AddField(
+            model_name='uclaloneliness',
+            name='responses',
+            field=models.BinaryField(null=True),
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.2.8 on 2026-10-17 04:51
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('adiccionestic', '0009_circuit_breakers'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='exportjob',
+            name='status',
+            field=models.CharField(choices=[('queued', 'En cola'), ('running', 'En proceso'), ('done', 'Completado'), ('failed', 'Fallido'), ('expired', 'Expirado')], default='queued', max_length=10),
+        ),
+    ]
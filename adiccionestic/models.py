@@ -1,6 +1,25 @@
 from django.db import models
 from django.core.validators import EmailValidator, MinValueValidator, MaxValueValidator
 from django.utils import timezone
+import uuid
+
+from .instruments import REGISTRY, RISK_LEVEL_CHOICES
+
+# Reverse OneToOne relations holding each instrument's responses
+INSTRUMENT_RELATIONS = list(REGISTRY)
+
+
+class ParticipantQuerySet(models.QuerySet):
+    def with_instruments(self):
+        """Join all five instruments, so reading them never hits the database"""
+        return self.select_related(*INSTRUMENT_RELATIONS)
+
+    def load(self, email):
+        """Participant and every instrument in one joined query.
+
+        Raises Participant.DoesNotExist like get().
+        """
+        return self.with_instruments().get(email=email)
 
 
 class Participant(models.Model):
@@ -148,96 +167,135 @@ class Participant(models.Model):
     participates_in_social_activities = models.BooleanField(null=True, blank=True)
 
 
+    objects = ParticipantQuerySet.as_manager()
+
     class Meta:
         db_table = 'participants'
         ordering = ['-created_at']
+        indexes = [
+            # Keyset pagination of the participant list, created_at ranges
+            models.Index(fields=['-created_at', '-id'], name='participant_created_idx'),
+            # Filters of export_excel, export jobs and the admin, newest first
+            models.Index(fields=['location', '-created_at'], name='participant_loc_created_idx'),
+            models.Index(fields=['gender', '-created_at'], name='participant_gender_created_idx'),
+            # Participants still waiting for feedback, the small side of feedback_sent
+            models.Index(
+                fields=['-created_at'],
+                name='participant_unsent_idx',
+                condition=models.Q(feedback_sent=False),
+            ),
+        ]
     
     def __str__(self):
         return self.email
 
 
-class BergenTikTok(models.Model):
+def answer_validators(relation):
+    """Range validators of an instrument's answers, from its REGISTRY entry"""
+    instrument = REGISTRY[relation]
+    return [MinValueValidator(instrument.min_value), MaxValueValidator(instrument.max_value)]
+
+
+class ScoredInstrument:
+    """Scoring and feedback of an instrument model, from its REGISTRY entry"""
+    instrument = None
+
+    def save(self, *args, **kwargs):
+        self.total_score = self.instrument.score(self)
+        self.risk_level = self.instrument.level(self.total_score)
+        self.responses = self.instrument.pack(self)
+        super().save(*args, **kwargs)
+
+    def get_answers(self):
+        """{item: answer}, decoded from the packed responses when they are stored"""
+        if self.responses is not None:
+            return self.instrument.unpack(self.responses)
+        return {item: getattr(self, item) for item in self.instrument.items}
+
+    def get_risk_level(self):
+        # Rows saved before risk_level existed until rescore_instruments backfills them
+        return self.risk_level or self.instrument.level(self.total_score)
+
+    def get_feedback(self):
+        return self.instrument.feedback[self.get_risk_level()]
+
+
+class BergenTikTok(ScoredInstrument, models.Model):
     """Bergen TikTok Addiction Scale (6 items, 1-5 Likert scale)"""
     participant = models.OneToOneField(Participant, on_delete=models.CASCADE, related_name='bergen_tiktok')
     
     # Questions based on the Bergen scale structure
-    q1_salience = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q2_tolerance = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q3_mood_modification = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q4_relapse = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q5_withdrawal = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q6_conflict = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    q1_salience = models.IntegerField(validators=answer_validators('bergen_tiktok'))
+    q2_tolerance = models.IntegerField(validators=answer_validators('bergen_tiktok'))
+    q3_mood_modification = models.IntegerField(validators=answer_validators('bergen_tiktok'))
+    q4_relapse = models.IntegerField(validators=answer_validators('bergen_tiktok'))
+    q5_withdrawal = models.IntegerField(validators=answer_validators('bergen_tiktok'))
+    q6_conflict = models.IntegerField(validators=answer_validators('bergen_tiktok'))
     
     total_score = models.IntegerField(editable=False, null=True)
+    risk_level = models.CharField(max_length=8, choices=RISK_LEVEL_CHOICES, editable=False, null=True)
+    # Item answers packed two per byte (Instrument.pack), derived on every write;
+    # the item columns stay the source of truth, this serves narrow analytics scans
+    responses = models.BinaryField(editable=False, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Part of the participant's ETag: every write of the row moves it
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'bergen_tiktok'
-    
-    def save(self, *args, **kwargs):
-        self.total_score = sum([
-            self.q1_salience, self.q2_tolerance, self.q3_mood_modification,
-            self.q4_relapse, self.q5_withdrawal, self.q6_conflict
-        ])
-        super().save(*args, **kwargs)
-    
-    def get_feedback(self):
-        if self.total_score <= 12:
-            return "Bajo riesgo de adicción a TikTok"
-        elif self.total_score <= 18:
-            return "Riesgo moderado de adicción a TikTok"
-        else:
-            return "Alto riesgo de adicción a TikTok"
+        indexes = [
+            # Risk level filters, score ranges within a level
+            models.Index(fields=['risk_level', 'total_score'], name='bergen_tiktok_risk_idx'),
+        ]
+
+    instrument = REGISTRY['bergen_tiktok']
 
 
-class BergenInstagram(models.Model):
+class BergenInstagram(ScoredInstrument, models.Model):
     """Bergen Instagram Addiction Scale (6 items, 1-5 Likert scale)"""
     participant = models.OneToOneField(Participant, on_delete=models.CASCADE, related_name='bergen_instagram')
     
-    q1_salience = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q2_tolerance = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q3_mood_modification = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q4_relapse = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q5_withdrawal = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q6_conflict = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    q1_salience = models.IntegerField(validators=answer_validators('bergen_instagram'))
+    q2_tolerance = models.IntegerField(validators=answer_validators('bergen_instagram'))
+    q3_mood_modification = models.IntegerField(validators=answer_validators('bergen_instagram'))
+    q4_relapse = models.IntegerField(validators=answer_validators('bergen_instagram'))
+    q5_withdrawal = models.IntegerField(validators=answer_validators('bergen_instagram'))
+    q6_conflict = models.IntegerField(validators=answer_validators('bergen_instagram'))
     
     total_score = models.IntegerField(editable=False, null=True)
+    risk_level = models.CharField(max_length=8, choices=RISK_LEVEL_CHOICES, editable=False, null=True)
+    # Item answers packed two per byte (Instrument.pack), derived on every write;
+    # the item columns stay the source of truth, this serves narrow analytics scans
+    responses = models.BinaryField(editable=False, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Part of the participant's ETag: every write of the row moves it
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'bergen_instagram'
-    
-    def save(self, *args, **kwargs):
-        self.total_score = sum([
-            self.q1_salience, self.q2_tolerance, self.q3_mood_modification,
-            self.q4_relapse, self.q5_withdrawal, self.q6_conflict
-        ])
-        super().save(*args, **kwargs)
-    
-    def get_feedback(self):
-        if self.total_score <= 12:
-            return "Bajo riesgo de adicción a Instagram"
-        elif self.total_score <= 18:
-            return "Riesgo moderado de adicción a Instagram"
-        else:
-            return "Alto riesgo de adicción a Instagram"
+        indexes = [
+            # Risk level filters, score ranges within a level
+            models.Index(fields=['risk_level', 'total_score'], name='bergen_instagram_risk_idx'),
+        ]
+
+    instrument = REGISTRY['bergen_instagram']
 
 
-class UCLALoneliness(models.Model):
+class UCLALoneliness(ScoredInstrument, models.Model):
     """UCLA Loneliness Scale (10 items, 1-4 Likert scale)"""
     participant = models.OneToOneField(Participant, on_delete=models.CASCADE, related_name='ucla_loneliness')
     
     # 20 items from UCLA Loneliness Scale
-    q1 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
-    q2 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
-    q3 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
-    q4 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
-    q5 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
-    q6 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
-    q7 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
-    q8 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
-    q9 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
-    q10 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
+    q1 = models.IntegerField(validators=answer_validators('ucla_loneliness'))
+    q2 = models.IntegerField(validators=answer_validators('ucla_loneliness'))
+    q3 = models.IntegerField(validators=answer_validators('ucla_loneliness'))
+    q4 = models.IntegerField(validators=answer_validators('ucla_loneliness'))
+    q5 = models.IntegerField(validators=answer_validators('ucla_loneliness'))
+    q6 = models.IntegerField(validators=answer_validators('ucla_loneliness'))
+    q7 = models.IntegerField(validators=answer_validators('ucla_loneliness'))
+    q8 = models.IntegerField(validators=answer_validators('ucla_loneliness'))
+    q9 = models.IntegerField(validators=answer_validators('ucla_loneliness'))
+    q10 = models.IntegerField(validators=answer_validators('ucla_loneliness'))
     #q11 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
     #q12 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
     #q13 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
@@ -250,116 +308,235 @@ class UCLALoneliness(models.Model):
     #q20 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(4)])
     
     total_score = models.IntegerField(editable=False, null=True)
+    risk_level = models.CharField(max_length=8, choices=RISK_LEVEL_CHOICES, editable=False, null=True)
+    # Item answers packed two per byte (Instrument.pack), derived on every write;
+    # the item columns stay the source of truth, this serves narrow analytics scans
+    responses = models.BinaryField(editable=False, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Part of the participant's ETag: every write of the row moves it
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'ucla_loneliness'
-    
-    def save(self, *args, **kwargs):
-        self.total_score = sum([
-            getattr(self, f'q{i}') for i in range(1, 11)
-        ])
-        super().save(*args, **kwargs)
-    
-    def get_feedback(self):
-        if self.total_score <= 25:
-            return "Nivel bajo de soledad"
-        elif self.total_score <= 34:
-            return "Nivel moderado de soledad"
-        else:
-            return "Nivel alto de soledad"
+        indexes = [
+            # Risk level filters, score ranges within a level
+            models.Index(fields=['risk_level', 'total_score'], name='ucla_loneliness_risk_idx'),
+        ]
+
+    instrument = REGISTRY['ucla_loneliness']
 
 
-class PrefrontalSymptoms(models.Model):
+class PrefrontalSymptoms(ScoredInstrument, models.Model):
     """Abbreviated Prefrontal Symptoms Inventory (20 items, 0-4 Likert scale)"""
     participant = models.OneToOneField(Participant, on_delete=models.CASCADE, related_name='prefrontal_symptoms')
     
     # 20 items from the abbreviated inventory
-    q1 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q2 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q3 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q4 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q5 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q6 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q7 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q8 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q9 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q10 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q11 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q12 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q13 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q14 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q15 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q16 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q17 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q18 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q19 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
-    q20 = models.IntegerField(validators=[MinValueValidator(0), MaxValueValidator(4)])
+    q1 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q2 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q3 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q4 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q5 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q6 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q7 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q8 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q9 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q10 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q11 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q12 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q13 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q14 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q15 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q16 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q17 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q18 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q19 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
+    q20 = models.IntegerField(validators=answer_validators('prefrontal_symptoms'))
     
     total_score = models.IntegerField(editable=False, null=True)
+    risk_level = models.CharField(max_length=8, choices=RISK_LEVEL_CHOICES, editable=False, null=True)
+    # Item answers packed two per byte (Instrument.pack), derived on every write;
+    # the item columns stay the source of truth, this serves narrow analytics scans
+    responses = models.BinaryField(editable=False, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Part of the participant's ETag: every write of the row moves it
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'prefrontal_symptoms'
-    
-    def save(self, *args, **kwargs):
-        self.total_score = sum([
-            getattr(self, f'q{i}') for i in range(1, 21)
-        ])
-        super().save(*args, **kwargs)
-    
-    def get_feedback(self):
-        if self.total_score <= 20:
-            return "Síntomas prefrontales mínimos"
-        elif self.total_score <= 40:
-            return "Síntomas prefrontales leves a moderados"
-        else:
-            return "Síntomas prefrontales significativos"
+        indexes = [
+            # Risk level filters, score ranges within a level
+            models.Index(fields=['risk_level', 'total_score'], name='prefrontal_symptoms_risk_idx'),
+        ]
 
+    instrument = REGISTRY['prefrontal_symptoms']
 
-class CAIDS(models.Model):
+
+class CAIDS(ScoredInstrument, models.Model):
     """Conversational AI Dependency Scale (20 items, 1-5 Likert scale)"""
     participant = models.OneToOneField(Participant, on_delete=models.CASCADE, related_name='caids')
     
     # 13 items from CAIDS
-    q1 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q2 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q3 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q4 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q5 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q6 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q7 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q8 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q9 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q10 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q11 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q12 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q13 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q14 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q15 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q16 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q17 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q18 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q19 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
-    q20 = models.IntegerField(validators=[MinValueValidator(1), MaxValueValidator(5)])
+    q1 = models.IntegerField(validators=answer_validators('caids'))
+    q2 = models.IntegerField(validators=answer_validators('caids'))
+    q3 = models.IntegerField(validators=answer_validators('caids'))
+    q4 = models.IntegerField(validators=answer_validators('caids'))
+    q5 = models.IntegerField(validators=answer_validators('caids'))
+    q6 = models.IntegerField(validators=answer_validators('caids'))
+    q7 = models.IntegerField(validators=answer_validators('caids'))
+    q8 = models.IntegerField(validators=answer_validators('caids'))
+    q9 = models.IntegerField(validators=answer_validators('caids'))
+    q10 = models.IntegerField(validators=answer_validators('caids'))
+    q11 = models.IntegerField(validators=answer_validators('caids'))
+    q12 = models.IntegerField(validators=answer_validators('caids'))
+    q13 = models.IntegerField(validators=answer_validators('caids'))
+    q14 = models.IntegerField(validators=answer_validators('caids'))
+    q15 = models.IntegerField(validators=answer_validators('caids'))
+    q16 = models.IntegerField(validators=answer_validators('caids'))
+    q17 = models.IntegerField(validators=answer_validators('caids'))
+    q18 = models.IntegerField(validators=answer_validators('caids'))
+    q19 = models.IntegerField(validators=answer_validators('caids'))
+    q20 = models.IntegerField(validators=answer_validators('caids'))
 
 
     total_score = models.IntegerField(editable=False, null=True)
+    risk_level = models.CharField(max_length=8, choices=RISK_LEVEL_CHOICES, editable=False, null=True)
+    # Item answers packed two per byte (Instrument.pack), derived on every write;
+    # the item columns stay the source of truth, this serves narrow analytics scans
+    responses = models.BinaryField(editable=False, null=True)
     created_at = models.DateTimeField(auto_now_add=True)
+    # Part of the participant's ETag: every write of the row moves it
+    updated_at = models.DateTimeField(auto_now=True)
     
     class Meta:
         db_table = 'caids'
-    
-    def save(self, *args, **kwargs):
-        self.total_score = sum([
-            getattr(self, f'q{i}') for i in range(1, 21)
-        ])
-        super().save(*args, **kwargs)
-    
-    def get_feedback(self):
-        if self.total_score <= 26:
-            return "Baja dependencia de IA conversacional"
-        elif self.total_score <= 39:
-            return "Dependencia moderada de IA conversacional"
-        else:
-            return "Alta dependencia de IA conversacional"
\ No newline at end of file
+        indexes = [
+            # Risk level filters, score ranges within a level
+            models.Index(fields=['risk_level', 'total_score'], name='caids_risk_idx'),
+        ]
+
+    instrument = REGISTRY['caids']
+
+
+# Reverse relation -> instrument model, in REGISTRY order
+INSTRUMENT_MODELS = {model.instrument.relation: model for model in ScoredInstrument.__subclasses__()}
+INSTRUMENT_MODELS = {relation: INSTRUMENT_MODELS[relation] for relation in REGISTRY}
+
+class EmailOutbox(models.Model):
+    """Feedback emails waiting to be delivered by run_email_worker"""
+    STATUS_PENDING = 'pending'
+    STATUS_SENT = 'sent'
+    STATUS_FAILED = 'failed'
+    STATUS_CHOICES = [
+        (STATUS_PENDING, 'Pendiente'),
+        (STATUS_SENT, 'Enviado'),
+        (STATUS_FAILED, 'Fallido'),
+    ]
+
+    participant = models.ForeignKey(Participant, on_delete=models.CASCADE, related_name='outbox_emails')
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_PENDING)
+    attempts = models.IntegerField(default=0)
+    next_attempt_at = models.DateTimeField(default=timezone.now)
+    last_error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    sent_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        db_table = 'email_outbox'
+        ordering = ['next_attempt_at']
+        indexes = [
+            models.Index(fields=['status', 'next_attempt_at'], name='outbox_due_idx'),
+        ]
+        constraints = [
+            models.UniqueConstraint(
+                fields=['participant'],
+                condition=models.Q(status='pending'),
+                name='unique_pending_feedback_email',
+            ),
+        ]
+
+    def __str__(self):
+        return f'{self.participant} ({self.status})'
+
+
+class StatisticsCounter(models.Model):
+    """Rollup counters behind the statistics endpoint (see rebuild_statistics)"""
+    key = models.CharField(max_length=50, unique=True)
+    value = models.BigIntegerField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'statistics_counters'
+
+    def __str__(self):
+        return f'{self.key} = {self.value}'
+
+
+class CircuitBreaker(models.Model):
+    """Breaker state and call metrics shared by every worker (see circuit.py)"""
+    STATE_CLOSED = 'closed'
+    STATE_OPEN = 'open'
+    STATE_HALF_OPEN = 'half_open'
+    STATE_CHOICES = [
+        (STATE_CLOSED, 'Cerrado'),
+        (STATE_OPEN, 'Abierto'),
+        (STATE_HALF_OPEN, 'Semiabierto'),
+    ]
+
+    name = models.CharField(max_length=50, unique=True)
+    state = models.CharField(max_length=10, choices=STATE_CHOICES, default=STATE_CLOSED)
+    consecutive_failures = models.IntegerField(default=0)
+    opened_at = models.DateTimeField(null=True, blank=True)
+    calls = models.BigIntegerField(default=0)
+    failures = models.BigIntegerField(default=0)
+    rejected = models.BigIntegerField(default=0)
+    last_latency_ms = models.FloatField(null=True, blank=True)
+    avg_latency_ms = models.FloatField(null=True, blank=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        db_table = 'circuit_breakers'
+
+    def __str__(self):
+        return f'{self.name} ({self.state})'
+
+
+class ExportJob(models.Model):
+    """Survey export generated in the background by run_export_worker"""
+    STATUS_QUEUED = 'queued'
+    STATUS_RUNNING = 'running'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_EXPIRED = 'expired'
+    STATUS_CHOICES = [
+        (STATUS_QUEUED, 'En cola'),
+        (STATUS_RUNNING, 'En proceso'),
+        (STATUS_DONE, 'Completado'),
+        (STATUS_FAILED, 'Fallido'),
+        (STATUS_EXPIRED, 'Expirado'),
+    ]
+
+    # Random id so job URLs cannot be enumerated
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=STATUS_QUEUED)
+    # location / start_date / end_date, as accepted by export_excel
+    filters = models.JSONField(default=dict, blank=True)
+    total_records = models.IntegerField(null=True, blank=True)
+    progress = models.IntegerField(default=0)  # percentage
+    file_name = models.CharField(max_length=255, blank=True, default='')
+    error = models.TextField(blank=True, default='')
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    # While running: when the worker's claim runs out unless progress renews it
+    lease_until = models.DateTimeField(null=True, blank=True)
+    attempts = models.IntegerField(default=0)
+
+    class Meta:
+        db_table = 'export_jobs'
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['status', 'created_at'], name='export_job_queue_idx'),
+        ]
+
+    def __str__(self):
+        return f'Export {self.id} ({self.status})'
@@ -0,0 +1,30 @@
+from rest_framework.renderers import BaseRenderer
+
+from .exports import XLSX_CONTENT_TYPE, NDJSON_CONTENT_TYPE
+
+
+class PassthroughRenderer(BaseRenderer):
+    """Accepts ``?format=<format>`` on actions that return their own HttpResponse.
+
+    DRF treats the ``format`` query parameter as a renderer override, so
+    without a renderer registered for it ``?format=csv`` would be a 404.
+    """
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return data
+
+
+class XLSXRenderer(PassthroughRenderer):
+    media_type = XLSX_CONTENT_TYPE
+    format = 'xlsx'
+
+
+class CSVRenderer(PassthroughRenderer):
+    media_type = 'text/csv'
+    format = 'csv'
+    charset = 'utf-8'
+
+
+class NDJSONRenderer(PassthroughRenderer):
+    media_type = NDJSON_CONTENT_TYPE
+    format = 'ndjson'
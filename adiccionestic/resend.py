@@ -0,0 +1,156 @@
+import logging
+import threading
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+
+from django.core.mail import get_connection
+from django.db import transaction
+
+from .circuit import CircuitOpen, allow_call, record_failure, record_success
+from .emails import MAIL_CIRCUIT, build_feedback_email
+from .models import EmailOutbox, Participant
+from .stats import bump_counters
+
+logger = logging.getLogger(__name__)
+
+# resend_feedback defaults (overridable from the command)
+RESEND_CHUNK_SIZE = 200
+RESEND_WORKERS = 4
+RESEND_RATE = 10  # messages per second, 0 for no limit
+
+
+class TokenBucket:
+    """Thread-safe limiter: ``rate`` tokens per second, bursts of up to ``capacity``.
+
+    acquire() takes a token, sleeping outside the lock until it is due,
+    so waiting threads line up in the order they asked.
+    """
+
+    def __init__(self, rate, capacity=None):
+        self.rate = rate
+        self.capacity = capacity or max(1, rate)
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            wait = -self.tokens / self.rate if self.tokens < 0 else 0
+        if wait:
+            time.sleep(wait)
+
+
+def unsent_participants(queryset=None):
+    """Participants still without feedback that no outbox message is about to mail"""
+    if queryset is None:
+        queryset = Participant.objects.all()
+    pending = EmailOutbox.objects.filter(status=EmailOutbox.STATUS_PENDING).values('participant')
+    return queryset.filter(feedback_sent=False).exclude(pk__in=pending)
+
+
+def mark_feedback_sent(pks):
+    with transaction.atomic():
+        flipped = Participant.objects.filter(pk__in=pks, feedback_sent=False).update(feedback_sent=True)
+        if flipped:
+            bump_counters({'feedback_sent': flipped})
+
+
+def resend_feedback(queryset=None, chunk_size=RESEND_CHUNK_SIZE, workers=RESEND_WORKERS, rate=RESEND_RATE,
+                    after_pk=0, progress=None):
+    """Mail feedback to every unsent participant in ``queryset``, in primary-key order.
+
+    Participants are read ``chunk_size`` at a time with their instruments
+    joined, then sent by a pool of ``workers`` threads. Each thread keeps
+    one open email connection for the whole run and only sends; the
+    database is written from this thread, one UPDATE per chunk. ``rate``
+    caps messages per second across all threads.
+
+    Sends go through the MAIL_CIRCUIT breaker like deliver_pending_emails:
+    this thread checks it before handing each participant to a worker,
+    with at most ``workers`` sends in flight, and records every outcome
+    and latency. Once the breaker is open, the participants already
+    handed out are settled and reported to ``progress``, then CircuitOpen
+    is raised.
+
+    ``after_pk`` resumes after a checkpoint; ``progress(last_pk, stats)``
+    is called after every chunk. Returns {'sent': n, 'failed': n}.
+    """
+    queryset = unsent_participants(queryset).with_instruments().order_by('pk')
+    bucket = TokenBucket(rate) if rate else None
+    local = threading.local()
+    connections = []
+    stats = {'sent': 0, 'failed': 0}
+
+    def send(participant):
+        if not hasattr(local, 'connection'):
+            local.connection = get_connection()
+            local.connection.open()
+            connections.append(local.connection)
+        if bucket is not None:
+            bucket.acquire()
+        started = time.perf_counter()
+        try:
+            sent, raised = build_feedback_email(participant, connection=local.connection).send(), False
+        except Exception:
+            logger.exception("Error resending feedback to %s", participant.email)
+            sent, raised = 0, True
+        return sent, (time.perf_counter() - started) * 1000, raised
+
+    def send_chunk(pool, chunk):
+        """Send chunk in order; returns (participants handed out, pks sent, CircuitOpen or None)"""
+        in_flight = {}
+        sent = []
+
+        def settle(futures):
+            for future in futures:
+                participant = in_flight.pop(future)
+                result, latency_ms, raised = future.result()
+                if raised:
+                    record_failure(MAIL_CIRCUIT, latency_ms)
+                else:
+                    record_success(MAIL_CIRCUIT, latency_ms)
+                if result:
+                    sent.append(participant.pk)
+
+        handed_out = 0
+        circuit_open = None
+        for participant in chunk:
+            if len(in_flight) >= workers:
+                settle(wait(in_flight, return_when=FIRST_COMPLETED).done)
+            try:
+                allow_call(MAIL_CIRCUIT)
+            except CircuitOpen as e:
+                circuit_open = e
+                break
+            in_flight[pool.submit(send, participant)] = participant
+            handed_out += 1
+        settle(list(in_flight))
+        return handed_out, sent, circuit_open
+
+    try:
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            while True:
+                chunk = list(queryset.filter(pk__gt=after_pk)[:chunk_size])
+                if not chunk:
+                    break
+
+                handed_out, sent, circuit_open = send_chunk(pool, chunk)
+                mark_feedback_sent(sent)
+                stats['sent'] += len(sent)
+                stats['failed'] += handed_out - len(sent)
+
+                if handed_out:
+                    after_pk = chunk[handed_out - 1].pk
+                    if progress is not None:
+                        progress(after_pk, stats)
+                if circuit_open is not None:
+                    raise circuit_open
+    finally:
+        for connection in connections:
+            connection.close()
+
+    return stats
@@ -1,42 +1,54 @@
+from functools import lru_cache
+
 from rest_framework import serializers
-from django.utils import timezone
+from rest_framework.reverse import reverse
+from django.utils.dateparse import parse_date, parse_datetime
 from .models import (
-    Participant, BergenTikTok, BergenInstagram, 
-    UCLALoneliness, PrefrontalSymptoms, CAIDS
+    INSTRUMENT_RELATIONS, Participant, BergenTikTok, BergenInstagram,
+    UCLALoneliness, PrefrontalSymptoms, CAIDS, ExportJob
 )
+from .export_jobs import queue_export_job
+from .submissions import upsert_submission
 
 
 class BergenTikTokSerializer(serializers.ModelSerializer):
     class Meta:
         model = BergenTikTok
-        exclude = ['participant', 'total_score', 'created_at']
+        exclude = ['participant', 'total_score', 'risk_level', 'responses', 'created_at', 'updated_at']
 
 
 class BergenInstagramSerializer(serializers.ModelSerializer):
     class Meta:
         model = BergenInstagram
-        exclude = ['participant', 'total_score', 'created_at']
+        exclude = ['participant', 'total_score', 'risk_level', 'responses', 'created_at', 'updated_at']
 
 
 class UCLALonelinessSerializer(serializers.ModelSerializer):
     class Meta:
         model = UCLALoneliness
-        exclude = ['participant', 'total_score', 'created_at']
+        exclude = ['participant', 'total_score', 'risk_level', 'responses', 'created_at', 'updated_at']
 
 
 class PrefrontalSymptomsSerializer(serializers.ModelSerializer):
     class Meta:
         model = PrefrontalSymptoms
-        exclude = ['participant', 'total_score', 'created_at']
+        exclude = ['participant', 'total_score', 'risk_level', 'responses', 'created_at', 'updated_at']
 
 
 class CAIDSSerializer(serializers.ModelSerializer):
     class Meta:
         model = CAIDS
-        exclude = ['participant', 'total_score', 'created_at']
+        exclude = ['participant', 'total_score', 'risk_level', 'responses', 'created_at', 'updated_at']
 
 
 class ParticipantSerializer(serializers.ModelSerializer):
+    """Participant with nested instruments.
+
+    ``fields`` limits the output to a subset of Meta.fields (see
+    sparse_fields).
+    """
+    INSTRUMENT_FIELDS = INSTRUMENT_RELATIONS
+
     bergen_tiktok = BergenTikTokSerializer(required=False)
     bergen_instagram = BergenInstagramSerializer(required=False)
     ucla_loneliness = UCLALonelinessSerializer(required=False)
@@ -84,10 +96,125 @@ class ParticipantSerializer(serializers.ModelSerializer):
             'participates_in_social_activities',
 
             # Instruments
-            'bergen_tiktok', 'bergen_instagram', 'ucla_loneliness',
-            'prefrontal_symptoms', 'caids'
+            *INSTRUMENT_RELATIONS,
         ]
 
+    def __init__(self, *args, fields=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        if fields is not None:
+            for name in set(self.fields) - set(fields):
+                self.fields.pop(name)
+
+
+def sparse_fields(query_params):
+    """ParticipantSerializer fields selected by ``?fields=`` and ``?include=``.
+
+    ``fields`` picks participant fields (instruments may be listed too),
+    ``include`` picks instruments. Returns None when neither is given.
+    """
+    requested = {}
+    for param in ['fields', 'include']:
+        if param in query_params:
+            requested[param] = [name for name in query_params[param].split(',') if name]
+    if not requested:
+        return None
+
+    instruments = ParticipantSerializer.INSTRUMENT_FIELDS
+    allowed = {
+        'fields': ParticipantSerializer.Meta.fields,
+        'include': instruments,
+    }
+    for param, names in requested.items():
+        unknown = [name for name in names if name not in allowed[param]]
+        if unknown:
+            raise serializers.ValidationError({param: f"Campos desconocidos: {', '.join(unknown)}"})
+
+    if 'fields' in requested:
+        fields = requested['fields']
+    else:
+        fields = [name for name in ParticipantSerializer.Meta.fields if name not in instruments]
+    fields = fields + [name for name in requested.get('include', []) if name not in fields]
+    # Keep Meta.fields order in the output
+    return [name for name in ParticipantSerializer.Meta.fields if name in fields]
+
+
+def sparse_queryset(queryset, fields):
+    """Load only the columns and instrument joins that ``fields`` serializes"""
+    instruments = ParticipantSerializer.INSTRUMENT_FIELDS
+    if fields is None:
+        return queryset.select_related(*instruments)
+
+    relations = [name for name in fields if name in instruments]
+    columns = ['created_at']  # keyset pagination cursors
+    columns += [name for name in fields if name not in instruments]
+    for relation in relations:
+        model = Participant._meta.get_field(relation).related_model
+        columns += [f'{relation}__{field.attname}' for field in model._meta.concrete_fields]
+    return queryset.select_related(*relations).only(*columns)
+
+
+class ParticipantRowPlan:
+    """Precompiled ParticipantSerializer output built from values() rows.
+
+    Produces the same dicts as ParticipantSerializer(fields=fields).data
+    without model or serializer instances: fields whose representation is
+    the database value itself are copied, the rest (decimals) go through
+    the serializer field's to_representation once per value.
+    """
+    # Fields whose to_representation returns database values unchanged
+    PASSTHROUGH_FIELDS = (
+        serializers.CharField, serializers.ChoiceField,
+        serializers.BooleanField, serializers.IntegerField,
+    )
+
+    def __init__(self, fields=None):
+        serializer = ParticipantSerializer(fields=fields)
+        self.columns = ['id', 'created_at']  # pagination cursors
+        self.steps = []  # (key, column, converter, nested steps or None)
+
+        for name, field in serializer.fields.items():
+            if isinstance(field, serializers.BaseSerializer):
+                nested = [
+                    (key, f'{name}__{subfield.source}', self._converter(subfield))
+                    for key, subfield in field.fields.items()
+                ]
+                self.columns += [column for key, column, converter in nested]
+                # A missing instrument comes back as a row of NULLs
+                self.steps.append((name, f'{name}__id', None, nested))
+            else:
+                self.columns.append(field.source)
+                self.steps.append((name, field.source, self._converter(field), None))
+
+        self.columns = list(dict.fromkeys(self.columns))
+
+    def _converter(self, field):
+        if isinstance(field, self.PASSTHROUGH_FIELDS):
+            return None
+        return field.to_representation
+
+    def build(self, row):
+        data = {}
+        for key, column, converter, nested in self.steps:
+            if nested is None:
+                value = row[column]
+                data[key] = converter(value) if converter and value is not None else value
+            elif row[column] is None:
+                data[key] = None
+            else:
+                data[key] = {
+                    nested_key: nested_converter(row[nested_column])
+                    if nested_converter and row[nested_column] is not None else row[nested_column]
+                    for nested_key, nested_column, nested_converter in nested
+                }
+        return data
+
+
+@lru_cache(maxsize=64)
+def participant_row_plan(fields=None):
+    """ParticipantRowPlan for a tuple of sparse fields (None: all)"""
+    return ParticipantRowPlan(fields)
+
+
 class SociodemographicDataSerializer(serializers.Serializer):
     """Serializer for sociodemographic information - matches all Participant model fields"""
 
@@ -199,49 +326,51 @@ class SurveySubmissionSerializer(serializers.Serializer):
         return value
     
     def create(self, validated_data):
-        email = validated_data.pop('email')
-        location = validated_data.pop('location')
-        consent_accepted = validated_data.pop('consent_accepted')
-        sociodemographic_data = validated_data.pop('sociodemographic_data', {})
-        
-        # Create or update participant
-        participant, created = Participant.objects.get_or_create(
-            email=email,
-            defaults={
-                'location': location,
-                'consent_accepted': consent_accepted,
-                'consent_date': timezone.now(),
-            }
-        )
-        
-        if not created:
-            participant.location = location
-            participant.consent_accepted = consent_accepted
-            participant.consent_date = timezone.now()
-        
-        # Add sociodemographic data
-        if sociodemographic_data:
-            for field, value in sociodemographic_data.items():
-                setattr(participant, field, value)
-        
-        participant.save()
-        
-        # Save each instrument if provided
-        for instrument_name in ['bergen_tiktok', 'bergen_instagram', 'ucla_loneliness', 
-                                'prefrontal_symptoms', 'caids']:
-            if instrument_name in validated_data:
-                instrument_data = validated_data[instrument_name]
-                model_class = {
-                    'bergen_tiktok': BergenTikTok,
-                    'bergen_instagram': BergenInstagram,
-                    'ucla_loneliness': UCLALoneliness,
-                    'prefrontal_symptoms': PrefrontalSymptoms,
-                    'caids': CAIDS
-                }[instrument_name]
-                
-                model_class.objects.update_or_create(
-                    participant=participant,
-                    defaults=instrument_data
-                )
-        
-        return participant
\ No newline at end of file
+        # Locking read plus single-statement upserts, in one transaction;
+        # also queues the feedback email and bumps the statistics counters
+        participant, created = upsert_submission(validated_data)
+        return participant
+
+
+class ExportJobSerializer(serializers.ModelSerializer):
+    # Same filters as export_excel
+    location = serializers.ChoiceField(choices=['EC', 'CL'], required=False, write_only=True)
+    start_date = serializers.CharField(required=False, write_only=True)
+    end_date = serializers.CharField(required=False, write_only=True)
+    download_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = ExportJob
+        fields = [
+            'id', 'status', 'filters', 'total_records', 'progress', 'error',
+            'created_at', 'started_at', 'finished_at', 'download_url',
+            'location', 'start_date', 'end_date',
+        ]
+        read_only_fields = [
+            'id', 'status', 'filters', 'total_records', 'progress', 'error',
+            'created_at', 'started_at', 'finished_at',
+        ]
+
+    def validate_date(self, value):
+        try:
+            # Well-formed but impossible dates (2024-02-30) raise ValueError
+            valid = parse_datetime(value) is not None or parse_date(value) is not None
+        except ValueError:
+            valid = False
+        if not valid:
+            raise serializers.ValidationError("Formato de fecha inválido (YYYY-MM-DD)")
+        return value
+
+    def validate_start_date(self, value):
+        return self.validate_date(value)
+
+    def validate_end_date(self, value):
+        return self.validate_date(value)
+
+    def get_download_url(self, obj):
+        if obj.status != ExportJob.STATUS_DONE:
+            return None
+        return reverse('exportjob-download', args=[obj.pk], request=self.context.get('request'))
+
+    def create(self, validated_data):
+        return queue_export_job(**validated_data)
@@ -0,0 +1,22 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from .feedback_cache import invalidate_feedback_after_write
+from .models import INSTRUMENT_MODELS, Participant
+
+
+@receiver([post_save, post_delete], sender=Participant)
+def participant_changed(sender, instance, **kwargs):
+    """Admin edits and deletes of a participant retire its cached feedback"""
+    invalidate_feedback_after_write([instance.email])
+
+
+def instrument_changed(sender, instance, **kwargs):
+    """Same for one of its instruments; bulk submissions invalidate explicitly"""
+    emails = Participant.objects.filter(pk=instance.participant_id).values_list('email', flat=True)
+    invalidate_feedback_after_write(emails)
+
+
+for relation, model in INSTRUMENT_MODELS.items():
+    post_save.connect(instrument_changed, sender=model, dispatch_uid=f'feedback_cache_{relation}_save')
+    post_delete.connect(instrument_changed, sender=model, dispatch_uid=f'feedback_cache_{relation}_delete')
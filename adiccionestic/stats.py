@@ -0,0 +1,182 @@
+from django.db import transaction
+from django.db.models import Case, Count, F, Q, Value, When
+
+from .aggregate_cache import cached_aggregate
+from .instruments import REGISTRY
+from .models import Participant, StatisticsCounter
+
+# (relation, display name) for each instrument reported by statistics
+INSTRUMENTS = [(relation, instrument.name) for relation, instrument in REGISTRY.items()]
+
+
+def percentage(count, total):
+    return round(count / total * 100, 2) if total > 0 else 0
+
+
+def aggregate_counts(queryset=None):
+    """Every count the statistics endpoint needs, in a single query.
+
+    Location, gender and feedback counts are conditional aggregates over
+    the participants table; instrument completion counts the LEFT JOINed
+    reverse OneToOne rows, which never multiply participants.
+    """
+    if queryset is None:
+        queryset = Participant.objects.all()
+
+    aggregates = {
+        'total': Count('id'),
+        'feedback_sent': Count('id', filter=Q(feedback_sent=True)),
+    }
+    for code, name in Participant.LOCATION_CHOICES:
+        aggregates[f'location_{code}'] = Count('id', filter=Q(location=code))
+    for code, name in Participant.GENDER_CHOICES:
+        aggregates[f'gender_{code}'] = Count('id', filter=Q(gender=code))
+    for attr, name in INSTRUMENTS:
+        aggregates[f'instrument_{attr}'] = Count(attr)
+
+    return queryset.order_by().aggregate(**aggregates)
+
+
+def build_statistics(counts):
+    """Shape raw counts into the statistics endpoint response"""
+    total_participants = counts['total']
+
+    stats = {
+        'total_participants': total_participants,
+        'by_location': {},
+        'by_gender': {},
+        'instruments': {},
+        'feedback_sent': counts['feedback_sent'],
+    }
+
+    for code, name in Participant.LOCATION_CHOICES:
+        count = counts[f'location_{code}']
+        stats['by_location'][name] = {
+            'count': count,
+            'percentage': percentage(count, total_participants)
+        }
+
+    for code, name in Participant.GENDER_CHOICES:
+        count = counts[f'gender_{code}']
+        if count > 0:
+            stats['by_gender'][name] = {
+                'count': count,
+                'percentage': percentage(count, total_participants)
+            }
+
+    for attr, name in INSTRUMENTS:
+        count = counts[f'instrument_{attr}']
+        stats['instruments'][name] = {
+            'count': count,
+            'percentage': percentage(count, total_participants)
+        }
+
+    return stats
+
+
+def compute_statistics(queryset=None):
+    """Summary statistics of survey data, computed from the base tables"""
+    return build_statistics(aggregate_counts(queryset))
+
+
+def read_statistics():
+    """Summary statistics of survey data, read from the counters table.
+
+    Falls back to the aggregate query until rebuild_statistics has
+    populated the counters.
+    """
+    counts = dict(StatisticsCounter.objects.values_list('key', 'value'))
+    if 'total' not in counts:
+        return compute_statistics()
+
+    return build_statistics({key: counts.get(key, 0) for key in counter_keys()})
+
+
+@cached_aggregate('statistics')
+def dashboard_statistics():
+    """read_statistics() behind the aggregate cache, for the statistics endpoint.
+
+    Dashboards opening several tabs at once share one computation; the
+    numbers may lag submissions by up to AGGREGATE_CACHE_TTL seconds.
+    """
+    return read_statistics()
+
+
+def counter_keys():
+    """Every key kept in the counters table"""
+    keys = ['total', 'feedback_sent']
+    keys += [f'location_{code}' for code, name in Participant.LOCATION_CHOICES]
+    keys += [f'gender_{code}' for code, name in Participant.GENDER_CHOICES]
+    keys += [f'instrument_{attr}' for attr, name in INSTRUMENTS]
+    return keys
+
+
+def participant_deltas(old, new):
+    """Counter changes for a participant moving from ``old`` to ``new``.
+
+    Both are dicts with ``location`` and ``gender`` (``old`` is None for a
+    newly created participant).
+    """
+    deltas = {}
+    if old is None:
+        deltas['total'] = 1
+    for field in ['location', 'gender']:
+        old_value = old[field] if old else None
+        new_value = new[field]
+        if old_value == new_value:
+            continue
+        if old_value:
+            key = f'{field}_{old_value}'
+            deltas[key] = deltas.get(key, 0) - 1
+        if new_value:
+            key = f'{field}_{new_value}'
+            deltas[key] = deltas.get(key, 0) + 1
+    return deltas
+
+
+def bump_counters(deltas):
+    """Apply counter deltas with one UPDATE in the caller's transaction.
+
+    Counters that do not exist yet are left alone: until rebuild_statistics
+    creates them, statistics are computed from the base tables instead.
+    """
+    deltas = {key: delta for key, delta in deltas.items() if delta}
+    if not deltas:
+        return
+
+    StatisticsCounter.objects.filter(key__in=deltas).update(
+        value=F('value') + Case(
+            *[When(key=key, then=Value(delta)) for key, delta in deltas.items()],
+            default=Value(0),
+        )
+    )
+
+
+@transaction.atomic
+def rebuild_counters():
+    """Recompute every counter from the base tables.
+
+    Existing counter rows are locked first so concurrent submissions wait
+    and apply their deltas on top of the rebuilt values. Returns a dict of
+    key -> (old value, new value) for the counters that changed.
+    """
+    existing = {
+        counter.key: counter
+        for counter in StatisticsCounter.objects.select_for_update()
+    }
+    counts = aggregate_counts()
+
+    changes = {}
+    for key in counter_keys():
+        counter = existing.get(key)
+        old_value = counter.value if counter else None
+        if old_value != counts[key]:
+            changes[key] = (old_value, counts[key])
+
+    StatisticsCounter.objects.bulk_create(
+        [StatisticsCounter(key=key, value=counts[key]) for key in counter_keys()],
+        update_conflicts=True,
+        unique_fields=['key'],
+        update_fields=['value', 'updated_at'],
+    )
+    return changes
@@ -0,0 +1,168 @@
+from collections import Counter
+
+from django.db import IntegrityError, transaction
+from django.utils import timezone
+
+from .emails import queue_feedback_emails
+from .feedback_cache import invalidate_feedback_after_write
+from .models import INSTRUMENT_MODELS, Participant
+from .stats import bump_counters, participant_deltas
+
+# Submissions upserted per transaction by submit_batch
+SUBMIT_BATCH_CHUNK_SIZE = 200
+# Attempts at a chunk that keeps losing insert races on new emails
+UPSERT_ATTEMPTS = 3
+
+# Everything a resubmission may overwrite (email is the conflict key)
+PARTICIPANT_UPDATE_FIELDS = [
+    field.name for field in Participant._meta.concrete_fields
+    if field.name not in ('id', 'email', 'created_at')
+]
+
+
+def upsert_submission(data):
+    """Save one validated SurveySubmissionSerializer payload.
+
+    ``4 + instruments submitted`` queries, one more for an existing
+    participant.
+    Returns ``(participant, created)``.
+    """
+    return upsert_submissions([data])[0]
+
+
+def upsert_submissions(submissions, chunk_size=SUBMIT_BATCH_CHUNK_SIZE):
+    """Save validated SurveySubmissionSerializer data in bulk.
+
+    Each chunk is one transaction: a locking read of the current rows (plus
+    a read of their instruments, when any exist), then single-statement
+    writes (participants, one upsert per instrument, counters, outbox).
+    That is ``4 + instrument tables written`` statements per chunk of new
+    participants, one more with existing ones: every table needs its own
+    write, and folding them into one statement would take backend-specific
+    data-modifying CTEs. Counters are skipped when nothing they count
+    changed. Emails must be unique within ``submissions``.
+    Returns ``(participant, created)`` for every submission, in order.
+    """
+    results = []
+    for start in range(0, len(submissions), chunk_size):
+        results.extend(_upsert_chunk(submissions[start:start + chunk_size]))
+    return results
+
+
+def _upsert_chunk(submissions):
+    """Run _write_chunk, retrying when a new email was created concurrently.
+
+    Rows found by the locking read stay locked until commit. An email that
+    was not found is INSERTed without ON CONFLICT, so a concurrent request
+    creating it first makes this chunk fail and roll back; the retry then
+    finds and locks that row, keeping created flags and counters exact.
+    """
+    for attempt in range(UPSERT_ATTEMPTS):
+        try:
+            with transaction.atomic():
+                return _write_chunk(submissions)
+        except IntegrityError:
+            if attempt == UPSERT_ATTEMPTS - 1:
+                raise
+
+
+def _write_chunk(submissions):
+    now = timezone.now()
+
+    # Current rows: counter deltas are computed against them and fields a
+    # submission leaves out keep their stored values. Lock first, then read:
+    # after waiting on a lock PostgreSQL re-checks only the locked row, so
+    # joining the instruments into the locking read could miss rows that
+    # the transaction holding the lock had just inserted
+    locked = list(
+        Participant.objects
+        .select_for_update()
+        .filter(email__in=[data['email'] for data in submissions])
+        .values_list('pk', flat=True)
+    )
+    existing = {
+        participant.email: participant
+        for participant in Participant.objects.select_related(*INSTRUMENT_MODELS).filter(pk__in=locked)
+    } if locked else {}
+
+    deltas = Counter()
+    participants = []
+    for data in submissions:
+        previous = existing.get(data['email'])
+        participant = Participant(email=data['email'])
+        if previous is not None:
+            for name in PARTICIPANT_UPDATE_FIELDS:
+                setattr(participant, name, getattr(previous, name))
+
+        participant.location = data['location']
+        participant.consent_accepted = data['consent_accepted']
+        participant.consent_date = now
+        for field, value in data.get('sociodemographic_data', {}).items():
+            setattr(participant, field, value)
+
+        deltas.update(participant_deltas(
+            previous and {'location': previous.location, 'gender': previous.gender},
+            {'location': participant.location, 'gender': participant.gender},
+        ))
+        participants.append(participant)
+
+    new = [participant for participant in participants if participant.email not in existing]
+    updated = [participant for participant in participants if participant.email in existing]
+    if new:
+        Participant.objects.bulk_create(new)
+        if any(participant.pk is None for participant in new):
+            # Backend without INSERT ... RETURNING
+            ids = dict(
+                Participant.objects.filter(email__in=[p.email for p in new]).values_list('email', 'id')
+            )
+            for participant in new:
+                participant.pk = ids[participant.email]
+    if updated:
+        # The rows are locked, so this always takes the DO UPDATE branch
+        Participant.objects.bulk_create(
+            updated,
+            update_conflicts=True,
+            unique_fields=['email'],
+            update_fields=PARTICIPANT_UPDATE_FIELDS,
+        )
+        for participant in updated:
+            participant.pk = existing[participant.email].pk
+
+    for name, model in INSTRUMENT_MODELS.items():
+        rows = []
+        for data, participant in zip(submissions, participants):
+            if name not in data:
+                continue
+            answers = data[name]
+            # bulk_create skips save(), so score here the way it would
+            score = model.instrument.score(answers)
+            rows.append(model(
+                participant=participant,
+                total_score=score,
+                risk_level=model.instrument.level(score),
+                responses=model.instrument.pack(answers),
+                **answers,
+            ))
+
+            previous = existing.get(data['email'])
+            if previous is None or not hasattr(previous, name):
+                deltas[f'instrument_{name}'] += 1
+
+        if rows:
+            model.objects.bulk_create(
+                rows,
+                update_conflicts=True,
+                unique_fields=['participant'],
+                update_fields=model.instrument.items + ['total_score', 'risk_level', 'responses', 'updated_at'],
+            )
+
+    bump_counters(deltas)
+
+    # Feedback emails are delivered by run_email_worker once this commits
+    queue_feedback_emails(participants)
+
+    # Write-through: bulk writes send no signals, so drop the cached feedback
+    # here; new participants cannot have any
+    invalidate_feedback_after_write(existing)
+
+    return [(participant, participant.email not in existing) for participant in participants]
@@ -1,3 +1,1566 @@
-from django.test import TestCase
+import csv
+import json
+import multiprocessing
+import os
+import shutil
+import tempfile
+import threading
+import time
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import zipfile
+from io import BytesIO, StringIO
 
-# Create your tests here.
+import numpy as np
+import openpyxl
+
+from django.conf import settings
+from django.core import mail
+from django.core.cache.backends.db import DatabaseCache
+from django.core.mail.backends import locmem
+from django.core.mail.backends.base import BaseEmailBackend
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.test import TestCase, TransactionTestCase, override_settings, skipUnlessDBFeature
+from django.utils import timezone
+from rest_framework.test import APIClient
+
+from .admin import ParticipantAdmin
+from .aggregate_cache import FileLock, aggregate_cache, cached_aggregate
+from .export_jobs import claim_next_job, export_path, queue_export_job
+from .resend import TokenBucket
+from .checks import shared_caches_check
+from .feedback_cache import clear_feedback_cache, feedback_cache_key, feedback_cache_stats, get_cached_feedback
+from .emails import (
+    build_feedback_email, deliver_pending_emails, generate_feedback,
+    render_feedback_html, render_feedback_text, template_parts,
+)
+from .instruments import REGISTRY, Instrument
+from .serializers import ParticipantSerializer, participant_row_plan, sparse_queryset
+from .models import Participant, BergenTikTok, CAIDS, UCLALoneliness, CircuitBreaker, EmailOutbox, StatisticsCounter, ExportJob
+from .stats import compute_statistics, dashboard_statistics, read_statistics
+
+
+def survey_payload(email='student@example.com', location='EC', **overrides):
+    """Build a submission payload; pass ``instrument=None`` to leave one out"""
+    payload = {
+        'email': email,
+        'location': location,
+        'consent_accepted': True,
+        'sociodemographic_data': {'age': 20, 'gender': 'F', 'university': 'UTPL'},
+        'bergen_tiktok': {
+            'q1_salience': 3, 'q2_tolerance': 3, 'q3_mood_modification': 3,
+            'q4_relapse': 3, 'q5_withdrawal': 3, 'q6_conflict': 3,
+        },
+        'bergen_instagram': {
+            'q1_salience': 1, 'q2_tolerance': 1, 'q3_mood_modification': 1,
+            'q4_relapse': 1, 'q5_withdrawal': 1, 'q6_conflict': 1,
+        },
+        'ucla_loneliness': {f'q{i}': 2 for i in range(1, 11)},
+        'prefrontal_symptoms': {f'q{i}': 1 for i in range(1, 21)},
+        'caids': {f'q{i}': 5 for i in range(1, 21)},
+    }
+    for key, value in overrides.items():
+        if value is None:
+            payload.pop(key, None)
+        else:
+            payload[key] = value
+    return payload
+
+
+def data_queries(queries):
+    """Captured queries minus the aggregate cache's PostgreSQL advisory lock calls"""
+    return [query for query in queries if 'pg_try_advisory_lock' not in query['sql']
+            and 'pg_advisory_unlock' not in query['sql']]
+
+
+class FailingEmailBackend(BaseEmailBackend):
+    """Email backend standing in for an unreachable Mailgun"""
+
+    def send_messages(self, email_messages):
+        raise ConnectionError('Mailgun unavailable')
+
+
+class CountingEmailBackend(locmem.EmailBackend):
+    """locmem backend that counts how many connections were opened"""
+    opened = 0
+
+    def open(self):
+        CountingEmailBackend.opened += 1
+        return True
+
+
+class FakeMailgun:
+    """Local stand-in for the Mailgun messages API, with injectable latency and errors.
+
+    ``delay`` seconds are slept before answering ``status``; ``requests``
+    counts the messages the server received.
+    """
+
+    def __init__(self, delay=0, status=200):
+        self.delay = delay
+        self.status = status
+        self.requests = 0
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                self.rfile.read(int(self.headers['Content-Length']))
+                fake.requests += 1
+                time.sleep(fake.delay)
+                body = json.dumps({'id': f'<{fake.requests}@fake.mailgun>', 'message': 'Queued'}).encode()
+                try:
+                    self.send_response(fake.status)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                except (BrokenPipeError, ConnectionResetError):
+                    pass  # the client already timed out
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.server.daemon_threads = True
+
+    def __enter__(self):
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        host, port = self.server.server_address
+        self.settings = override_settings(
+            EMAIL_BACKEND='anymail.backends.mailgun.EmailBackend',
+            ANYMAIL={
+                'MAILGUN_API_KEY': 'key-test',
+                'MAILGUN_SENDER_DOMAIN': 'example.com',
+                'MAILGUN_API_URL': f'http://{host}:{port}/v3',
+                'REQUESTS_TIMEOUT': 0.5,
+            },
+        )
+        self.settings.enable()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.settings.disable()
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class EmailOutboxTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+
+    def submit(self, **kwargs):
+        return self.client.post('/api/surveys/submit/', survey_payload(**kwargs), format='json')
+
+    def test_submit_queues_email_without_sending(self):
+        response = self.submit()
+
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(len(mail.outbox), 0)
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.status, EmailOutbox.STATUS_PENDING)
+        self.assertEqual(message.participant.email, 'student@example.com')
+
+    def test_resubmission_keeps_a_single_pending_message(self):
+        self.submit()
+        self.submit(location='CL')
+
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_PENDING).count(), 1)
+
+    def test_worker_sends_and_flags_participant(self):
+        self.submit()
+
+        call_command('run_email_worker', '--once', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertEqual(mail.outbox[0].to, ['student@example.com'])
+        self.assertTrue(Participant.objects.get().feedback_sent)
+        message = EmailOutbox.objects.get()
+        self.assertEqual(message.status, EmailOutbox.STATUS_SENT)
+        self.assertEqual(message.attempts, 1)
+
+    def test_worker_retries_with_backoff_then_gives_up(self):
+        self.submit()
+
+        with override_settings(EMAIL_BACKEND='adiccionestic.tests.FailingEmailBackend'):
+            call_command('run_email_worker', '--once', '--max-attempts=2', stdout=StringIO())
+            message = EmailOutbox.objects.get()
+            self.assertEqual(message.status, EmailOutbox.STATUS_PENDING)
+            self.assertEqual(message.attempts, 1)
+            self.assertGreater(message.next_attempt_at, timezone.now())
+            self.assertIn('Mailgun unavailable', message.last_error)
+
+            EmailOutbox.objects.update(next_attempt_at=timezone.now())
+            call_command('run_email_worker', '--once', '--max-attempts=2', stdout=StringIO())
+
+        message.refresh_from_db()
+        self.assertEqual(message.status, EmailOutbox.STATUS_FAILED)
+        self.assertFalse(Participant.objects.get().feedback_sent)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(6):
+            self.client.post('/api/surveys/submit/', survey_payload(email=f'p{i}@example.com'), format='json')
+
+    def test_sends_through_mailgun(self):
+        with FakeMailgun() as mailgun:
+            call_command('run_email_worker', '--once', stdout=StringIO())
+
+        self.assertEqual(mailgun.requests, 6)
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_SENT).count(), 6)
+        breaker = CircuitBreaker.objects.get(name='mailgun')
+        self.assertEqual((breaker.state, breaker.calls, breaker.failures), ('closed', 6, 0))
+        self.assertIsNotNone(breaker.avg_latency_ms)
+
+    def test_slow_mailgun_times_out(self):
+        started = time.monotonic()
+        with FakeMailgun(delay=2) as mailgun:
+            deliver_pending_emails(batch_size=1)
+
+        self.assertLess(time.monotonic() - started, 1.5)
+        self.assertEqual(mailgun.requests, 1)
+        message = EmailOutbox.objects.get(attempts=1)
+        self.assertEqual(message.status, EmailOutbox.STATUS_PENDING)
+        self.assertIn('timed out', message.last_error.lower())
+
+    def test_breaker_opens_and_defers_the_rest(self):
+        with FakeMailgun(status=500) as mailgun:
+            stats = deliver_pending_emails()
+
+        # Five failures open the breaker; the sixth email never reaches Mailgun
+        self.assertEqual(mailgun.requests, 5)
+        self.assertEqual((stats['retried'], stats['deferred']), (5, 1))
+        deferred = EmailOutbox.objects.get(attempts=0)
+        self.assertIn('Circuit mailgun is open', deferred.last_error)
+        self.assertGreater(deferred.next_attempt_at, timezone.now())
+        self.assertEqual(CircuitBreaker.objects.get(name='mailgun').state, 'open')
+
+        response = self.client.get('/api/surveys/email_status/')
+        breaker = response.json()['breakers'][0]
+        self.assertEqual((breaker['name'], breaker['state'], breaker['failures']), ('mailgun', 'open', 5))
+        self.assertEqual(response.json()['outbox']['pending'], 6)
+
+    def test_trial_call_closes_the_breaker(self):
+        CircuitBreaker.objects.create(
+            name='mailgun', state='open', consecutive_failures=5,
+            opened_at=timezone.now() - timezone.timedelta(seconds=61),
+        )
+
+        with FakeMailgun() as mailgun:
+            stats = deliver_pending_emails()
+
+        self.assertEqual(stats['sent'], 6)
+        self.assertEqual(mailgun.requests, 6)
+        self.assertEqual(CircuitBreaker.objects.get(name='mailgun').state, 'closed')
+
+    def test_open_breaker_rejects_without_calling(self):
+        CircuitBreaker.objects.create(name='mailgun', state='open', consecutive_failures=5, opened_at=timezone.now())
+
+        with FakeMailgun() as mailgun:
+            stats = deliver_pending_emails()
+
+        self.assertEqual((mailgun.requests, stats['deferred']), (0, 6))
+        self.assertEqual(CircuitBreaker.objects.get(name='mailgun').rejected, 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ResendFeedbackTests(TestCase):
+    def setUp(self):
+        client = APIClient()
+        for i in range(5):
+            client.post('/api/surveys/submit/', survey_payload(email=f'p{i}@example.com'), format='json')
+        # As if every delivery had been given up on
+        EmailOutbox.objects.update(status=EmailOutbox.STATUS_FAILED)
+        self.tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.tmpdir)
+        self.checkpoint = os.path.join(self.tmpdir, 'resend.checkpoint')
+
+    def resend(self, *args):
+        out = StringIO()
+        call_command('resend_feedback', '--checkpoint', self.checkpoint, '--rate', '0', *args, stdout=out)
+        return out.getvalue()
+
+    def test_resends_unsent_feedback(self):
+        output = self.resend('--chunk-size', '2')
+
+        self.assertIn('sent 5, failed 0', output)
+        self.assertEqual(sorted(message.to[0] for message in mail.outbox), [f'p{i}@example.com' for i in range(5)])
+        self.assertFalse(Participant.objects.filter(feedback_sent=False).exists())
+        self.assertEqual(read_statistics()['feedback_sent'], 5)
+        self.assertFalse(os.path.exists(self.checkpoint))
+
+    def test_resumes_from_checkpoint(self):
+        third = Participant.objects.order_by('pk')[2]
+        with open(self.checkpoint, 'w') as f:
+            json.dump({'last_pk': third.pk, 'sent': 3, 'failed': 0}, f)
+
+        output = self.resend()
+
+        self.assertIn(f'Resuming after participant {third.pk}', output)
+        self.assertEqual(len(mail.outbox), 2)
+        self.assertIn('sent 5, failed 0', output)
+
+    def test_skips_participants_with_a_pending_email(self):
+        EmailOutbox.objects.filter(participant__email='p0@example.com').update(status=EmailOutbox.STATUS_PENDING)
+
+        self.resend()
+
+        self.assertNotIn(['p0@example.com'], [message.to for message in mail.outbox])
+        self.assertEqual(len(mail.outbox), 4)
+
+    @override_settings(EMAIL_BACKEND='adiccionestic.tests.CountingEmailBackend')
+    def test_one_connection_per_worker(self):
+        CountingEmailBackend.opened = 0
+
+        self.resend('--workers', '2')
+
+        self.assertEqual(len(mail.outbox), 5)
+        self.assertLessEqual(CountingEmailBackend.opened, 2)
+
+    def test_sends_are_recorded_by_the_circuit_breaker(self):
+        self.resend()
+
+        self.assertEqual(CircuitBreaker.objects.get(name='mailgun').calls, 5)
+
+    @override_settings(EMAIL_BACKEND='adiccionestic.tests.FailingEmailBackend')
+    def test_stops_once_the_circuit_opens(self):
+        client = APIClient()
+        for i in range(5, 8):
+            client.post('/api/surveys/submit/', survey_payload(email=f'p{i}@example.com'), format='json')
+        EmailOutbox.objects.update(status=EmailOutbox.STATUS_FAILED)
+
+        with self.assertLogs('adiccionestic.resend', 'ERROR'):
+            output = self.resend('--workers', '1', '--chunk-size', '3')
+
+        # Five failures open the breaker; the other three are never tried
+        self.assertIn('Circuit mailgun is open', output)
+        self.assertEqual(CircuitBreaker.objects.get(name='mailgun').calls, 5)
+        with open(self.checkpoint) as f:
+            state = json.load(f)
+        self.assertEqual(state['last_pk'], Participant.objects.order_by('pk')[4].pk)
+        self.assertEqual(state['failed'], 5)
+
+    def test_token_bucket_limits_the_rate(self):
+        bucket = TokenBucket(rate=50, capacity=1)
+
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=4) as pool:
+            list(pool.map(lambda i: bucket.acquire(), range(11)))
+
+        # The first token is free, the other ten come 20 ms apart
+        self.assertGreaterEqual(time.monotonic() - started, 0.19)
+
+    def test_admin_action(self):
+        notes = []
+        participant_admin = ParticipantAdmin(Participant, None)
+        participant_admin.message_user = lambda request, message, level: notes.append(message)
+
+        selected = Participant.objects.filter(email__in=['p1@example.com', 'p2@example.com'])
+        participant_admin.resend_feedback_action(None, selected)
+
+        # Queued for the worker, nothing sent within the request
+        self.assertEqual(notes, ['2 feedback emails queued for run_email_worker.'])
+        self.assertEqual(len(mail.outbox), 0)
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_PENDING).count(), 2)
+
+        call_command('run_email_worker', '--once', stdout=StringIO())
+        self.assertEqual(len(mail.outbox), 2)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ExcelExportTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.output_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.output_dir)
+        for i in range(3):
+            self.client.post('/api/surveys/submit/', survey_payload(email=f'p{i}@example.com'), format='json')
+        self.client.post(
+            '/api/surveys/submit/',
+            survey_payload(email='partial@example.com', location='CL', caids=None),
+            format='json',
+        )
+
+    def load_workbook(self, response):
+        content = b''.join(response.streaming_content) if response.streaming else response.content
+        return openpyxl.load_workbook(BytesIO(content))
+
+    def sheet_values(self, wb, title):
+        return [list(row) for row in wb[title].iter_rows(values_only=True)]
+
+    def test_streaming_export_matches_in_memory_export(self):
+        legacy = self.client.get('/api/surveys/export_excel/', {'mode': 'memory'})
+        streamed = self.client.get('/api/surveys/export_excel/')
+
+        self.assertFalse(legacy.streaming)
+        self.assertTrue(streamed.streaming)
+        legacy_wb = self.load_workbook(legacy)
+        streamed_wb = self.load_workbook(streamed)
+
+        self.assertEqual(legacy_wb.sheetnames, streamed_wb.sheetnames)
+        for title in legacy_wb.sheetnames[1:]:
+            self.assertEqual(self.sheet_values(legacy_wb, title), self.sheet_values(streamed_wb, title))
+        self.assertEqual(len(self.sheet_values(streamed_wb, 'CAIDS')), 1 + 3)
+
+    def test_streaming_export_sizes_columns(self):
+        response = self.client.get('/api/surveys/export_excel/')
+        ws = self.load_workbook(response)['Participants']
+
+        self.assertEqual(ws.column_dimensions['A'].width, len('partial@example.com') + 2)
+
+    def count_export_queries(self, export):
+        with CaptureQueriesContext(connection) as queries:
+            export()
+        return len(queries)
+
+    def test_export_query_count_does_not_grow_with_participants(self):
+        exports = {
+            'api': lambda: b''.join(self.client.get('/api/surveys/export_excel/').streaming_content),
+            'admin': lambda: ParticipantAdmin(Participant, None).export_participants_to_excel(Participant.objects.all()),
+            'command': lambda: call_command(
+                'export_survey_data', output_dir=self.output_dir, stdout=StringIO()
+            ),
+        }
+        small = {name: self.count_export_queries(export) for name, export in exports.items()}
+
+        for i in range(20):
+            self.client.post('/api/surveys/submit/', survey_payload(email=f'more{i}@example.com'), format='json')
+        large = {name: self.count_export_queries(export) for name, export in exports.items()}
+
+        self.assertEqual(small, large)
+
+    def test_api_admin_and_command_exports_match(self):
+        api = self.load_workbook(self.client.get('/api/surveys/export_excel/'))
+        admin = self.load_workbook(
+            ParticipantAdmin(Participant, None).export_participants_to_excel(Participant.objects.all())
+        )
+        call_command('export_survey_data', output_dir=self.output_dir, stdout=StringIO())
+        command = openpyxl.load_workbook(os.path.join(self.output_dir, 'survey_export.xlsx'))
+
+        for wb in (admin, command):
+            self.assertEqual(wb.sheetnames, api.sheetnames)
+            for title in api.sheetnames:
+                expected = self.sheet_values(api, title)
+                actual = self.sheet_values(wb, title)
+                if title == 'Summary':
+                    # Export Date row
+                    del expected[2], actual[2]
+                self.assertEqual(actual, expected)
+
+        summary = self.sheet_values(api, 'Summary')
+        self.assertIn(['CAIDS', 3, '75.0%'], summary)
+        self.assertIn(['Gender - Femenino', 4, '100.0%'], summary)
+
+    def test_csv_export_is_a_zip_with_one_csv_per_sheet(self):
+        response = self.client.get('/api/surveys/export_excel/', {'format': 'csv'})
+
+        self.assertTrue(response.streaming)
+        self.assertEqual(response['Content-Type'], 'application/zip')
+        archive = zipfile.ZipFile(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(len(archive.namelist()), 6)
+        participants = list(csv.reader(StringIO(archive.read('participants.csv').decode('utf-8'))))
+        caids = list(csv.reader(StringIO(archive.read('caids.csv').decode('utf-8'))))
+        self.assertEqual(len(participants), 5)
+        self.assertEqual(len(caids), 4)
+
+    def test_wide_csv_export(self):
+        response = self.client.get('/api/surveys/export_excel/', {'format': 'csv', 'layout': 'wide'})
+
+        rows = list(csv.reader(StringIO(b''.join(response.streaming_content).decode('utf-8'))))
+        self.assertEqual(len(rows), 5)
+        self.assertEqual({len(row) for row in rows}, {len(rows[0])})
+
+    def test_ndjson_export(self):
+        response = self.client.get('/api/surveys/export_excel/', {'format': 'ndjson'})
+
+        records = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(len(records), 4)
+        partial = next(r for r in records if r['email'] == 'partial@example.com')
+        self.assertIsNone(partial['caids'])
+        self.assertEqual(partial['bergen_tiktok']['total_score'], 18)
+        self.assertIn('q1_salience', partial['bergen_tiktok'])
+
+    def test_unknown_formats_are_not_found(self):
+        for export_format in ['json', 'pdf']:
+            response = self.client.get('/api/surveys/export_excel/', {'format': export_format})
+            self.assertEqual(response.status_code, 404)
+
+    def test_command_writes_csv(self):
+        call_command('export_survey_data', output_dir=self.output_dir, format='csv', stdout=StringIO())
+
+        with zipfile.ZipFile(os.path.join(self.output_dir, 'survey_export.zip')) as archive:
+            self.assertIn('participants.csv', archive.namelist())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StatisticsTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.post('/api/surveys/submit/', survey_payload(email='a@example.com'), format='json')
+        self.client.post(
+            '/api/surveys/submit/',
+            survey_payload(email='b@example.com', location='CL', caids=None,
+                           sociodemographic_data={'gender': 'M'}),
+            format='json',
+        )
+        self.client.post(
+            '/api/surveys/submit/',
+            survey_payload(email='c@example.com', location='CL', caids=None, ucla_loneliness=None),
+            format='json',
+        )
+        Participant.objects.filter(email='a@example.com').update(feedback_sent=True)
+        call_command('rebuild_statistics', stdout=StringIO())
+
+    @override_settings(CACHES=dict(settings.CACHES, aggregates={'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}))
+    def test_statistics_response(self):
+        # Without the aggregates cache in the way
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get('/api/surveys/statistics/')
+        self.assertEqual(len(data_queries(queries)), 1)
+
+        self.assertEqual(response.json(), {
+            'total_participants': 3,
+            'by_location': {
+                'Ecuador': {'count': 1, 'percentage': 33.33},
+                'Chile': {'count': 2, 'percentage': 66.67},
+            },
+            'by_gender': {
+                'Masculino': {'count': 1, 'percentage': 33.33},
+                'Femenino': {'count': 2, 'percentage': 66.67},
+            },
+            'instruments': {
+                'Bergen TikTok': {'count': 3, 'percentage': 100.0},
+                'Bergen Instagram': {'count': 3, 'percentage': 100.0},
+                'UCLA Loneliness': {'count': 2, 'percentage': 66.67},
+                'Prefrontal Symptoms': {'count': 3, 'percentage': 100.0},
+                'CAIDS': {'count': 1, 'percentage': 33.33},
+            },
+            'feedback_sent': 1,
+        })
+
+    def test_statistics_empty_table(self):
+        Participant.objects.all().delete()
+        call_command('rebuild_statistics', stdout=StringIO())
+
+        response = self.client.get('/api/surveys/statistics/')
+
+        self.assertEqual(response.json()['total_participants'], 0)
+        self.assertEqual(response.json()['by_location']['Ecuador'], {'count': 0, 'percentage': 0})
+        self.assertEqual(response.json()['by_gender'], {})
+
+    def test_counters_follow_submissions_and_emails(self):
+        self.client.post('/api/surveys/submit/', survey_payload(email='d@example.com'), format='json')
+        # Resubmission moving to another location and gender, adding CAIDS
+        self.client.post(
+            '/api/surveys/submit/',
+            survey_payload(email='b@example.com', location='EC', sociodemographic_data={'gender': 'O'}),
+            format='json',
+        )
+        call_command('run_email_worker', '--once', stdout=StringIO())
+
+        self.assertEqual(read_statistics(), compute_statistics())
+        self.assertEqual(read_statistics()['feedback_sent'], 4)
+
+    def test_statistics_fall_back_to_aggregates_without_counters(self):
+        StatisticsCounter.objects.all().delete()
+
+        self.assertEqual(read_statistics(), compute_statistics())
+
+    def test_rebuild_repairs_drift(self):
+        Participant.objects.filter(email='c@example.com').delete()
+        out = StringIO()
+
+        call_command('rebuild_statistics', '--check', stdout=out)
+        self.assertIn('total: 3 -> 2', out.getvalue())
+        self.assertNotEqual(read_statistics(), compute_statistics())
+
+        call_command('rebuild_statistics', stdout=StringIO())
+        self.assertEqual(read_statistics(), compute_statistics())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SubmitBatchTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.post(
+            '/api/surveys/submit/',
+            survey_payload(email='old@example.com', caids=None,
+                           sociodemographic_data={'gender': 'M', 'university': 'UNL'}),
+            format='json',
+        )
+        call_command('rebuild_statistics', stdout=StringIO())
+
+    def submit_batch(self, items):
+        return self.client.post('/api/surveys/submit_batch/', items, format='json')
+
+    def test_batch_reports_each_item(self):
+        response = self.submit_batch([
+            survey_payload(email='new1@example.com'),
+            survey_payload(email='old@example.com', location='CL', sociodemographic_data={'gender': 'F'}),
+            survey_payload(email='bad@example.com', consent_accepted=False),
+            survey_payload(email='new1@example.com', ucla_loneliness=None),
+        ])
+
+        self.assertEqual(response.status_code, 200)
+        body = response.json()
+        self.assertEqual((body['created'], body['updated'], body['invalid']), (1, 1, 1))
+        self.assertEqual(
+            [result['status'] for result in body['results']],
+            ['duplicate', 'updated', 'invalid', 'created'],
+        )
+        self.assertIn('consent_accepted', body['results'][2]['errors'])
+
+        old = Participant.objects.get(email='old@example.com')
+        self.assertEqual((old.location, old.gender), ('CL', 'F'))
+        # Fields the resubmission left out keep their stored values
+        self.assertEqual(old.university, 'UNL')
+        self.assertEqual(old.caids.total_score, 100)
+        self.assertEqual(old.bergen_tiktok.total_score, 18)
+        self.assertFalse(hasattr(Participant.objects.get(email='new1@example.com'), 'ucla_loneliness'))
+
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_PENDING).count(), 2)
+        self.assertEqual(read_statistics(), compute_statistics())
+
+    def test_batch_query_count_does_not_grow_with_size(self):
+        def count_queries(prefix, size):
+            items = [survey_payload(email=f'{prefix}{i}@example.com') for i in range(size)]
+            with CaptureQueriesContext(connection) as queries:
+                self.submit_batch(items)
+            return len(queries)
+
+        # Small enough that SQLite's parameter limit does not split INSERTs
+        self.assertEqual(count_queries('small', 2), count_queries('large', 20))
+        self.assertEqual(Participant.objects.count(), 23)
+
+    def test_rejects_non_list_body(self):
+        response = self.submit_batch(survey_payload())
+
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SubmitQueryTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        call_command('rebuild_statistics', stdout=StringIO())
+
+    def submit_statements(self, **kwargs):
+        """Statements run by one submission, ignoring the test's savepoints"""
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post('/api/surveys/submit/', survey_payload(**kwargs), format='json')
+        self.assertEqual(response.status_code, 201)
+        return [q['sql'] for q in queries if 'SAVEPOINT' not in q['sql']]
+
+    def test_submit_is_a_read_plus_one_write_per_table(self):
+        # locking read, participant, 5 instruments, counters, outbox
+        self.assertEqual(len(self.submit_statements()), 9)
+        # existing participant: its instruments are read after the lock;
+        # unchanged location/gender and instruments: no counter update (the
+        # feedback cache delete runs after commit)
+        self.assertEqual(len(self.submit_statements()), 9)
+        self.assertEqual(len(self.submit_statements(email='other@example.com', caids=None, ucla_loneliness=None)), 7)
+
+        self.assertEqual(Participant.objects.get(email='student@example.com').caids.total_score, 100)
+        self.assertEqual(read_statistics(), compute_statistics())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SubmitConcurrencyTests(TransactionTestCase):
+    @skipUnlessDBFeature('has_select_for_update')
+    def test_concurrent_submissions_of_the_same_email(self):
+        call_command('rebuild_statistics', stdout=StringIO())
+
+        def submit(i):
+            try:
+                payload = survey_payload(
+                    email='race@example.com',
+                    location=['EC', 'CL'][i % 2],
+                    caids=None if i % 3 else survey_payload()['caids'],
+                )
+                return APIClient().post('/api/surveys/submit/', payload, format='json').status_code
+            finally:
+                connection.close()
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            statuses = list(pool.map(submit, range(32)))
+
+        self.assertEqual(set(statuses), {201})
+        self.assertEqual(Participant.objects.filter(email='race@example.com').count(), 1)
+        self.assertEqual(EmailOutbox.objects.filter(status=EmailOutbox.STATUS_PENDING).count(), 1)
+        self.assertEqual(read_statistics(), compute_statistics())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class CursorPaginationTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(7):
+            self.client.post('/api/surveys/submit/', survey_payload(email=f'p{i}@example.com'), format='json')
+        # Ties on created_at must still be paged exactly once
+        Participant.objects.filter(email__in=['p2@example.com', 'p3@example.com', 'p4@example.com']).update(
+            created_at=Participant.objects.get(email='p2@example.com').created_at
+        )
+
+    def test_pages_through_every_participant_once(self):
+        expected = list(Participant.objects.order_by('-created_at', '-id').values_list('email', flat=True))
+
+        emails = []
+        url = '/api/surveys/?cursor=&page_size=3'
+        while url:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.client.get(url)
+            self.assertEqual(response.status_code, 200)
+            self.assertFalse(any('COUNT(' in q['sql'] for q in queries))
+            emails.extend(participant['email'] for participant in response.json()['results'])
+            url = response.json()['next']
+
+        self.assertEqual(emails, expected)
+
+    def test_page_numbers_remain_the_default(self):
+        response = self.client.get('/api/surveys/')
+
+        self.assertEqual(response.json()['count'], 7)
+
+    def test_invalid_cursor(self):
+        response = self.client.get('/api/surveys/', {'cursor': 'not-a-cursor'})
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class SparseFieldsetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for i in range(3):
+            self.client.post('/api/surveys/submit/', survey_payload(email=f'p{i}@example.com'), format='json')
+        self.client.post('/api/surveys/submit/', survey_payload(email='partial@example.com', caids=None), format='json')
+
+    def get(self, url, params):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.json(), [q['sql'] for q in queries]
+
+    def test_fields_prunes_output_and_columns(self):
+        body, queries = self.get('/api/surveys/', {'fields': 'email,age'})
+
+        self.assertEqual(body['results'][0], {'email': 'partial@example.com', 'age': 20})
+        select = queries[-1]
+        self.assertNotIn('university', select)
+        self.assertNotIn('JOIN', select)
+
+    def test_include_selects_only_the_requested_instruments(self):
+        body, queries = self.get('/api/surveys/', {'include': 'caids'})
+
+        participant = body['results'][1]
+        self.assertIn('university', participant)
+        self.assertEqual(participant['caids']['q1'], 5)
+        self.assertNotIn('bergen_tiktok', participant)
+        self.assertIsNone(body['results'][0]['caids'])  # partial@ has none
+        # page count plus one joined SELECT, whatever the page size
+        self.assertEqual(len(queries), 2)
+        self.assertIn('"caids"', queries[-1])
+        self.assertNotIn('"bergen_tiktok"', queries[-1])
+
+    def test_default_output_is_unchanged_and_joined(self):
+        body, queries = self.get('/api/surveys/', {})
+
+        self.assertEqual(len(queries), 2)
+        self.assertEqual(len(body['results'][1]), len(ParticipantSerializer.Meta.fields))
+
+    def test_retrieve_accepts_fields(self):
+        body, queries = self.get('/api/surveys/p0@example.com/', {'fields': 'email,bergen_tiktok'})
+
+        self.assertEqual(set(body), {'email', 'bergen_tiktok'})
+        # ETag lookup plus one joined SELECT
+        self.assertEqual(len(queries), 2)
+
+    def test_unknown_field_is_rejected(self):
+        response = self.client.get('/api/surveys/', {'include': 'passwords'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertIn('include', response.json())
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FastParticipantListTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.post(
+            '/api/surveys/submit/',
+            survey_payload(email='decimals@example.com', caids=None, sociodemographic_data={
+                'gender': 'O', 'gpa_last_semester': '8.5', 'current_semester': '3',
+                'uses_conversational_ai': True, 'ai_daily_hours_weekday': '2.25', 'repeated_cycles': True,
+            }),
+            format='json',
+        )
+        for i in range(3):
+            self.client.post('/api/surveys/submit/', survey_payload(email=f'p{i}@example.com'), format='json')
+
+    def assertSameResponse(self, params):
+        with override_settings(FAST_PARTICIPANT_LIST=False):
+            expected = self.client.get('/api/surveys/', params)
+        with override_settings(FAST_PARTICIPANT_LIST=True):
+            actual = self.client.get('/api/surveys/', params)
+
+        self.assertEqual(actual.status_code, 200)
+        self.assertEqual(actual.content, expected.content)
+
+    def test_fast_list_matches_serializer_output(self):
+        self.assertSameResponse({})
+        self.assertSameResponse({'fields': 'email,gpa_last_semester,ai_daily_hours_weekday'})
+        self.assertSameResponse({'include': 'caids'})
+        self.assertSameResponse({'cursor': '', 'page_size': 2})
+
+    def test_fast_list_runs_one_select_per_page(self):
+        with override_settings(FAST_PARTICIPANT_LIST=True):
+            with self.assertNumQueries(1):
+                self.client.get('/api/surveys/', {'cursor': ''})
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ConditionalGetTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        self.client.post('/api/surveys/submit/', survey_payload(caids=None), format='json')
+
+    def test_unchanged_participant_answers_304_with_one_query(self):
+        # For feedback, the one query is the feedback cache read
+        for url in ['/api/surveys/student@example.com/', '/api/surveys/student@example.com/feedback/']:
+            first = self.client.get(url)
+            self.assertEqual(first.status_code, 200)
+            self.assertIn('Last-Modified', first)
+
+            with self.assertNumQueries(1):
+                response = self.client.get(url, HTTP_IF_NONE_MATCH=first['ETag'])
+            self.assertEqual(response.status_code, 304)
+
+            response = self.client.get(url, HTTP_IF_MODIFIED_SINCE=first['Last-Modified'])
+            self.assertEqual(response.status_code, 304)
+
+    def test_resubmission_changes_the_etag(self):
+        url = '/api/surveys/student@example.com/feedback/'
+        etag = self.client.get(url)['ETag']
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/surveys/submit/', survey_payload(), format='json')
+        response = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+
+        self.assertEqual(response.status_code, 200)
+        self.assertIn('caids', response.json()['instruments'])
+        self.assertNotEqual(response['ETag'], etag)
+
+    def test_instrument_edit_and_rescore_change_the_etag(self):
+        urls = ['/api/surveys/student@example.com/', '/api/surveys/student@example.com/feedback/']
+        etags = {url: self.client.get(url)['ETag'] for url in urls}
+
+        # Admin edit of one instrument row, the participant row untouched
+        instrument = BergenTikTok.objects.get(participant__email='student@example.com')
+        for item in instrument.instrument.items:
+            setattr(instrument, item, 1)
+        with self.captureOnCommitCallbacks(execute=True):
+            instrument.save()
+        for url in urls:
+            response = self.client.get(url, HTTP_IF_NONE_MATCH=etags[url])
+            self.assertEqual(response.status_code, 200)
+            etags[url] = response['ETag']
+        self.assertEqual(response.json()['instruments']['bergen_tiktok']['score'], 6)
+
+        BergenTikTok.objects.update(total_score=30, risk_level='high')
+        with self.captureOnCommitCallbacks(execute=True):
+            call_command('rescore_instruments', stdout=StringIO())
+        for url in urls:
+            self.assertEqual(self.client.get(url, HTTP_IF_NONE_MATCH=etags[url]).status_code, 200)
+
+    def test_etag_depends_on_view_and_fieldset(self):
+        full = self.client.get('/api/surveys/student@example.com/')['ETag']
+        sparse = self.client.get('/api/surveys/student@example.com/', {'fields': 'email'})['ETag']
+        feedback = self.client.get('/api/surveys/student@example.com/feedback/')['ETag']
+
+        self.assertEqual(len({full, sparse, feedback}), 3)
+
+    def test_missing_participant(self):
+        response = self.client.get('/api/surveys/nobody@example.com/feedback/', HTTP_IF_NONE_MATCH='"x"')
+
+        self.assertEqual(response.status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ParticipantLoaderTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        for email in ['a@example.com', 'b@example.com', 'c@example.com']:
+            self.client.post('/api/surveys/submit/', survey_payload(email=email, caids=None), format='json')
+
+    @override_settings(CACHES=dict(settings.CACHES, feedback={'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}))
+    def test_feedback_is_one_query(self):
+        # Without the feedback cache in the way
+        with self.assertNumQueries(1):
+            response = self.client.get('/api/surveys/a@example.com/feedback/')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()['instruments']), 4)
+
+    def test_export_participant_loads_the_participant_once(self):
+        # joined load, then the summary counts
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/surveys/b@example.com/export_participant/')
+
+        wb = openpyxl.load_workbook(BytesIO(b''.join(response.streaming_content)))
+        self.assertEqual(wb['Participants'].max_row, 2)
+        self.assertEqual(wb['CAIDS'].max_row, 1)
+
+    def test_export_participant_not_found(self):
+        response = self.client.get('/api/surveys/nobody@example.com/export_participant/')
+
+        self.assertEqual(response.status_code, 404)
+
+    def test_email_worker_does_not_lazy_load_instruments(self):
+        with CaptureQueriesContext(connection) as queries:
+            call_command('run_email_worker', '--once', stdout=StringIO())
+
+        self.assertEqual(len(mail.outbox), 3)
+        # Only the outbox batch reads (participants and instruments joined)
+        # and the circuit breaker checks before each send
+        selects = [q['sql'] for q in queries if q['sql'].startswith('SELECT')]
+        self.assertTrue(all(
+            sql.startswith(('SELECT "email_outbox"', 'SELECT "circuit_breakers"')) for sql in selects
+        ))
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class InstrumentRegistryTests(TestCase):
+    def test_model_save_scores_from_the_registry(self):
+        APIClient().post('/api/surveys/submit/', survey_payload(), format='json')
+        participant = Participant.objects.load('student@example.com')
+
+        for relation, instrument in REGISTRY.items():
+            row = getattr(participant, relation)
+            self.assertEqual(row.total_score, instrument.score(row))
+            self.assertEqual(row.get_feedback(), instrument.feedback[instrument.level(row.total_score)])
+        self.assertEqual(participant.bergen_tiktok.total_score, 18)
+
+    def test_score_matrix_matches_row_scoring(self):
+        instrument = REGISTRY['ucla_loneliness']
+        matrix = np.random.default_rng(0).integers(1, 5, size=(50, 10))
+
+        scores = instrument.score_matrix(matrix)
+
+        expected = [instrument.score(dict(zip(instrument.items, row.tolist()))) for row in matrix]
+        self.assertEqual(scores.tolist(), expected)
+
+    def test_levels_at_the_cutoffs(self):
+        instrument = REGISTRY['bergen_tiktok']
+
+        self.assertEqual([instrument.level(score) for score in (12, 13, 18, 19)], ['low', 'moderate', 'moderate', 'high'])
+        self.assertEqual(instrument.level_matrix([6, 12, 13, 18, 19, 30]).tolist(), ['low', 'low', 'moderate', 'moderate', 'high', 'high'])
+
+    def test_reverse_keyed_items(self):
+        instrument = Instrument('test', 'Test', ['q1', 'q2'], 1, 4, cutoffs=[4], feedback={}, reverse_items=['q2'])
+
+        self.assertEqual(instrument.score({'q1': 4, 'q2': 1}), 8)
+        self.assertEqual(instrument.score_matrix([[4, 1], [1, 4]]).tolist(), [8, 2])
+
+    def test_score_matrix_rejects_out_of_range_answers(self):
+        instrument = REGISTRY['prefrontal_symptoms']
+
+        with self.assertRaises(ValueError):
+            instrument.score_matrix(np.full((2, 20), 5))
+        with self.assertRaises(ValueError):
+            instrument.score_matrix(np.zeros((2, 19)))
+
+    def test_row_and_batch_scoring_reject_the_same_answers(self):
+        instrument = REGISTRY['prefrontal_symptoms']
+        answers = dict.fromkeys(instrument.items, 0)
+        answers['q7'] = 5
+
+        with self.assertRaises(ValueError):
+            instrument.score(answers)
+        with self.assertRaises(ValueError):
+            instrument.score_matrix([list(answers.values())])
+
+    def test_submission_ranges_come_from_the_registry(self):
+        # prefrontal_symptoms answers run 0-4, the other instruments' do not start at 0
+        response = APIClient().post('/api/surveys/submit/', survey_payload(
+            prefrontal_symptoms={f'q{i}': 0 for i in range(1, 21)},
+            caids={f'q{i}': 0 for i in range(1, 21)},
+        ), format='json')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(list(response.json()), ['caids'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class RescoreInstrumentsTests(TestCase):
+    def setUp(self):
+        client = APIClient()
+        for email in ['a@example.com', 'b@example.com', 'c@example.com']:
+            client.post('/api/surveys/submit/', survey_payload(email=email), format='json')
+        # Stale scores, as if the scoring rule changed after they were saved
+        BergenTikTok.objects.filter(participant__email='a@example.com').update(total_score=12, risk_level='low')
+        CAIDS.objects.update(total_score=None, risk_level=None)
+
+    def test_dry_run_reports_without_writing(self):
+        out = StringIO()
+        call_command('rescore_instruments', '--dry-run', stdout=out)
+
+        self.assertIn('bergen_tiktok: 3 rows, 1 would change', out.getvalue())
+        self.assertIn('low -> moderate: 1', out.getvalue())
+        self.assertIn('caids: 3 rows, 3 would change', out.getvalue())
+        self.assertIn('missing -> high: 3', out.getvalue())
+        self.assertEqual(BergenTikTok.objects.get(participant__email='a@example.com').total_score, 12)
+
+    def test_rescore_writes_changed_rows_in_chunks(self):
+        out = StringIO()
+        call_command('rescore_instruments', '--chunk-size', '2', stdout=out)
+
+        self.assertIn('Rescored 4 rows', out.getvalue())
+        self.assertEqual(set(BergenTikTok.objects.values_list('total_score', flat=True)), {18})
+        self.assertEqual(set(CAIDS.objects.values_list('total_score', flat=True)), {100})
+
+        out = StringIO()
+        call_command('rescore_instruments', stdout=out)
+        self.assertIn('up to date', out.getvalue())
+
+    def test_only_selected_instruments(self):
+        with CaptureQueriesContext(connection) as queries:
+            call_command('rescore_instruments', '--instrument', 'caids', stdout=StringIO())
+
+        self.assertTrue(all('bergen_tiktok' not in q['sql'] for q in queries))
+        self.assertEqual(BergenTikTok.objects.get(participant__email='a@example.com').total_score, 12)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class RiskLevelTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        low_caids = {f'q{i}': 1 for i in range(1, 21)}
+        self.client.post('/api/surveys/submit/', survey_payload(email='a@example.com', location='CL'), format='json')
+        self.client.post('/api/surveys/submit/', survey_payload(email='b@example.com', location='EC'), format='json')
+        self.client.post('/api/surveys/submit_batch/', [
+            survey_payload(email='c@example.com', location='CL', caids=low_caids),
+        ], format='json')
+
+    def test_levels_are_stored_on_single_and_batch_writes(self):
+        levels = dict(CAIDS.objects.values_list('participant__email', 'risk_level'))
+
+        self.assertEqual(levels, {'a@example.com': 'high', 'b@example.com': 'high', 'c@example.com': 'low'})
+        self.assertEqual(BergenTikTok.objects.get(participant__email='c@example.com').risk_level, 'moderate')
+
+    def test_filter_participants_by_level_and_location(self):
+        response = self.client.get('/api/surveys/?location=CL&caids__risk_level=high')
+
+        self.assertEqual([row['email'] for row in response.json()['results']], ['a@example.com'])
+
+    def test_feedback_class_comes_from_the_level(self):
+        participant = Participant.objects.load('c@example.com')
+        html = render_feedback_html({
+            'email': participant.email,
+            'location': participant.get_location_display(),
+            'instruments': generate_feedback(participant)['instruments'],
+        })
+
+        # "Baja dependencia" used to be styled as high risk by substring matching
+        self.assertRegex(html, r'feedback-low">\s*Baja dependencia')
+
+
+class QueryPlanTests(TestCase):
+    """EXPLAIN the hot filters and orderings; none may scan a whole table"""
+
+    def setUp(self):
+        call_command('seed_participants', '--count', '50', stdout=StringIO())
+
+    def assertIndexed(self, queryset, table, full_index_scan=False):
+        """No sort and no table scan; ``full_index_scan`` allows walking an index in order"""
+        if connection.vendor == 'postgresql':
+            # Tiny test tables always look cheaper to scan or to bitmap-scan
+            # and sort; ask for the plan an index allows
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+                cursor.execute('SET LOCAL enable_bitmapscan = off')
+            forbidden = [f'Seq Scan on {table}', 'Sort']
+        else:
+            forbidden = [f'SCAN {table}\n' if full_index_scan else f'SCAN {table}', 'TEMP B-TREE']
+        plan = queryset.explain() + '\n'
+
+        for step in forbidden:
+            self.assertNotIn(step, plan, plan)
+        if connection.vendor == 'postgresql' and not full_index_scan:
+            # With scans disabled, an unindexed filter walks some index whole
+            self.assertIn('Index Cond', plan, plan)
+
+    def test_list_ordering(self):
+        queryset = Participant.objects.order_by('-created_at', '-id')[:100]
+
+        self.assertIndexed(queryset, 'participants', full_index_scan=True)
+
+    def test_export_filters(self):
+        now = timezone.now()
+        queryset = Participant.objects.filter(
+            location='EC', created_at__gte=now - timezone.timedelta(days=30), created_at__lte=now,
+        ).order_by('-created_at')
+
+        self.assertIndexed(queryset, 'participants')
+
+    def test_admin_filters(self):
+        self.assertIndexed(Participant.objects.filter(gender='F').order_by('-created_at'), 'participants')
+        # Walks the partial index, which only holds unsent participants
+        queryset = Participant.objects.filter(feedback_sent=False).order_by('-created_at')
+        self.assertIndexed(queryset, 'participants', full_index_scan=True)
+
+    def test_risk_level_filter(self):
+        self.assertIndexed(CAIDS.objects.filter(risk_level='high', total_score__gte=60), 'caids')
+
+    def test_unindexed_filter_is_caught(self):
+        with self.assertRaises(AssertionError):
+            self.assertIndexed(Participant.objects.filter(university='UTPL'), 'participants')
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PackedResponsesTests(TestCase):
+    def setUp(self):
+        client = APIClient()
+        client.post('/api/surveys/submit/', survey_payload(email='a@example.com'), format='json')
+        client.post('/api/surveys/submit_batch/', [survey_payload(email='b@example.com')], format='json')
+
+    def test_pack_round_trip(self):
+        instrument = REGISTRY['prefrontal_symptoms']
+        answers = {item: i % 5 for i, item in enumerate(instrument.items)}
+
+        packed = instrument.pack(answers)
+
+        self.assertEqual(len(packed), 10)
+        self.assertEqual(instrument.unpack(packed), answers)
+
+    def test_single_and_batch_writes_store_packed_responses(self):
+        for row in BergenTikTok.objects.all():
+            self.assertEqual(row.get_answers(), {item: getattr(row, item) for item in row.instrument.items})
+            self.assertEqual(len(row.responses), 3)
+
+    def test_response_matrix_matches_item_columns(self):
+        instrument = REGISTRY['ucla_loneliness']
+        queryset = UCLALoneliness.objects.order_by('pk')
+
+        matrix = instrument.response_matrix(queryset)
+
+        self.assertEqual(matrix.tolist(), [list(row) for row in queryset.values_list(*instrument.items)])
+        self.assertEqual(instrument.score_matrix(matrix).tolist(), list(queryset.values_list('total_score', flat=True)))
+
+    def test_pack_rejects_out_of_range_answers(self):
+        instrument = REGISTRY['caids']
+
+        with self.assertRaises(ValueError):
+            instrument.pack(dict.fromkeys(instrument.items, 6))
+
+    def test_rescore_backfills_packed_responses(self):
+        CAIDS.objects.update(responses=None)
+        with self.assertRaises(ValueError):
+            REGISTRY['caids'].response_matrix(CAIDS.objects.all())
+
+        call_command('rescore_instruments', '--instrument', 'caids', stdout=StringIO())
+
+        self.assertEqual(REGISTRY['caids'].response_matrix(CAIDS.objects.all()).tolist(), [[5] * 20] * 2)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FeedbackTemplateTests(TestCase):
+    def setUp(self):
+        APIClient().post('/api/surveys/submit/', survey_payload(), format='json')
+        self.participant = Participant.objects.load('student@example.com')
+
+    def test_email_renders_every_instrument(self):
+        email = build_feedback_email(self.participant)
+        html = email.alternatives[0][0]
+
+        self.assertIn('Correo: student@example.com\nUbicación: Ecuador', email.body)
+        self.assertIn('Puntuación: 100\nResultado: Alta dependencia de IA conversacional', email.body)
+        self.assertIn('🤖 CAIDS - Dependencia de IA Conversacional', html)
+        self.assertRegex(html, r'Puntuación: 18</div>\s*<div class="instrument-feedback feedback-moderate">')
+        self.assertEqual(html.count('class="instrument"'), 5)
+
+    def test_blocks_are_rendered_once_per_instrument_and_level(self):
+        template_parts.cache_clear()
+        build_feedback_email(self.participant)
+        misses = template_parts.cache_info().misses
+
+        APIClient().post('/api/surveys/submit/', survey_payload(email='other@example.com'), format='json')
+        build_feedback_email(Participant.objects.load('other@example.com'))
+
+        # Same instruments and levels: nothing new to render
+        self.assertEqual(template_parts.cache_info().misses, misses)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FeedbackCacheTests(TestCase):
+    def setUp(self):
+        clear_feedback_cache()
+        self.client = APIClient()
+        self.client.post('/api/surveys/submit/', survey_payload(caids=None), format='json')
+        self.url = '/api/surveys/student@example.com/feedback/'
+
+    def test_second_read_is_one_cache_read(self):
+        first = self.client.get(self.url)
+
+        with CaptureQueriesContext(connection) as queries:
+            second = self.client.get(self.url)
+
+        self.assertEqual([q['sql'].count('feedback_cache') > 0 for q in queries], [True])
+        self.assertEqual(second.json(), first.json())
+        self.assertEqual(second['ETag'], first['ETag'])
+
+    def test_entries_are_shared_between_processes(self):
+        # Another worker process has its own cache handle on the same table
+        other_worker = DatabaseCache('feedback_cache', {})
+        self.client.get(self.url)
+        self.assertIsNotNone(other_worker.get(feedback_cache_key('student@example.com')))
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post('/api/surveys/submit/', survey_payload(), format='json')
+
+        self.assertIsNone(other_worker.get(feedback_cache_key('student@example.com')))
+        self.assertIn('caids', self.client.get(self.url).json()['instruments'])
+
+    def test_rescore_clears_the_cache(self):
+        self.client.get(self.url)
+        BergenTikTok.objects.update(total_score=12, risk_level='low')
+
+        call_command('rescore_instruments', stdout=StringIO())
+
+        self.assertIsNone(get_cached_feedback('student@example.com'))
+
+    def test_admin_edits_and_deletes_invalidate(self):
+        participant = Participant.objects.get(email='student@example.com')
+
+        self.client.get(self.url)
+        instrument = participant.bergen_tiktok
+        instrument.q1_salience = 1
+        with self.captureOnCommitCallbacks(execute=True):
+            instrument.save()
+        self.assertIsNone(get_cached_feedback('student@example.com'))
+
+        self.client.get(self.url)
+        with self.captureOnCommitCallbacks(execute=True):
+            participant.delete()
+        self.assertIsNone(get_cached_feedback('student@example.com'))
+        self.assertEqual(self.client.get(self.url).status_code, 404)
+
+    def test_cache_status_counts_hits_and_misses(self):
+        before = feedback_cache_stats()
+        self.client.get(self.url)
+        self.client.get(self.url)
+
+        stats = self.client.get('/api/surveys/cache_status/').json()['feedback']
+        self.assertEqual(stats['hits'] - before['hits'], 1)
+        self.assertEqual(stats['misses'] - before['misses'], 1)
+        self.assertEqual(stats['backend'], 'DatabaseCache')
+
+    @override_settings(CACHES=dict(settings.CACHES, feedback={'BACKEND': 'django.core.cache.backends.dummy.DummyCache'}))
+    def test_backend_comes_from_settings(self):
+        # Nothing is kept, so every read goes back to the database
+        self.client.get(self.url)
+        with self.assertNumQueries(1):
+            self.client.get(self.url)
+
+    def test_check_warns_about_process_local_caches(self):
+        self.assertEqual(shared_caches_check(None), [])
+        with override_settings(CACHES=dict(settings.CACHES, feedback={'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'})):
+            self.assertEqual([warning.id for warning in shared_caches_check(None)], ['adiccionestic.W001'])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AggregateCacheTests(TestCase):
+    def setUp(self):
+        # A file cache, so that threads and forked processes share it
+        # without contending for the test database
+        tmpdir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, tmpdir)
+        self.calls_file = os.path.join(tmpdir, 'calls')
+        settings_override = override_settings(
+            AGGREGATE_LOCK_DIR=tmpdir,
+            CACHES=dict(settings.CACHES, aggregates={
+                'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+                'LOCATION': os.path.join(tmpdir, 'cache'),
+                'TIMEOUT': None,
+            }),
+        )
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.calls = 0
+
+    def counting(self, delay=0):
+        def compute():
+            time.sleep(delay)
+            self.calls += 1
+            return self.calls
+        return compute
+
+    def test_fresh_result_is_computed_once(self):
+        total = cached_aggregate('test', ttl=60)(self.counting())
+
+        self.assertEqual([total(), total()], [1, 1])
+        total.invalidate()
+        self.assertEqual(total(), 2)
+
+    def test_concurrent_misses_share_one_computation(self):
+        total = cached_aggregate('test', ttl=60)(self.counting(delay=0.2))
+
+        with ThreadPoolExecutor(max_workers=8) as pool:
+            results = list(pool.map(lambda _: total(), range(8)))
+
+        self.assertEqual(results, [1] * 8)
+        self.assertEqual(self.calls, 1)
+
+    def test_concurrent_misses_in_other_processes_share_one_computation(self):
+        def compute():
+            with open(self.calls_file, 'a') as f:
+                f.write('call\n')
+            time.sleep(0.3)
+            return 42
+
+        total = cached_aggregate('test', ttl=60)(compute)
+
+        def worker():
+            # Drop the inherited database connection unclosed: the parent keeps using it
+            connection.connection = None
+            os._exit(0 if total() == 42 else 1)
+
+        processes = [multiprocessing.get_context('fork').Process(target=worker) for i in range(4)]
+        for process in processes:
+            process.start()
+        for process in processes:
+            process.join(10)
+
+        self.assertEqual([process.exitcode for process in processes], [0] * 4)
+        with open(self.calls_file) as f:
+            self.assertEqual(f.read().count('call'), 1)
+        # The parent reads what a child stored
+        self.assertEqual(total(), 42)
+
+    def test_stale_result_is_served_while_refreshing(self):
+        total = cached_aggregate('test', ttl=0, stale_ttl=60)(self.counting(delay=0.1))
+        total()
+
+        # Stale reads return at once; one background refresh serves them all
+        self.assertEqual([total(), total(), total()], [1, 1, 1])
+        deadline = time.monotonic() + 5
+        while self.calls < 2 and time.monotonic() < deadline:
+            time.sleep(0.02)
+        time.sleep(0.1)
+        self.assertEqual(self.calls, 2)
+
+    def test_lock_excludes_other_holders(self):
+        first, second = FileLock('test'), FileLock('test')
+
+        self.assertTrue(first.acquire())
+        self.assertFalse(second.acquire())
+        first.release()
+        self.assertTrue(second.acquire())
+        second.release()
+
+    def test_statistics_endpoint_is_cached_until_rebuild(self):
+        client = APIClient()
+        client.post('/api/surveys/submit/', survey_payload(), format='json')
+        call_command('rebuild_statistics', stdout=StringIO())
+        client.get('/api/surveys/statistics/')
+
+        client.post('/api/surveys/submit/', survey_payload(email='other@example.com'), format='json')
+        with self.assertNumQueries(0):
+            response = client.get('/api/surveys/statistics/')
+        self.assertEqual(response.json()['total_participants'], 1)
+
+        call_command('rebuild_statistics', stdout=StringIO())
+        self.assertEqual(client.get('/api/surveys/statistics/').json()['total_participants'], 2)
+        self.assertGreater(client.get('/api/surveys/cache_status/').json()['aggregates']['computed'], 0)
+
+
+class MigrationTests(TestCase):
+    def test_every_model_change_has_a_migration(self):
+        # Exits with status 1 when a model change has no migration
+        call_command('makemigrations', 'adiccionestic', '--check', '--dry-run', stdout=StringIO())
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run benchmarks')
+class ParticipantListBenchmark(TestCase):
+    """Rows per second: ParticipantSerializer vs the values() row plan"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_participants', count=5000, stdout=StringIO())
+
+    def test_rows_per_second(self):
+        queryset = Participant.objects.all()
+
+        start = time.perf_counter()
+        expected = ParticipantSerializer(sparse_queryset(queryset, None), many=True).data
+        serializer_elapsed = time.perf_counter() - start
+
+        start = time.perf_counter()
+        plan = participant_row_plan()
+        actual = [plan.build(row) for row in queryset.values(*plan.columns)]
+        plan_elapsed = time.perf_counter() - start
+
+        self.assertEqual(json.dumps(actual), json.dumps(expected))
+        print(
+            f'\nParticipantSerializer: {len(expected) / serializer_elapsed:,.0f} rows/s, '
+            f'row plan: {len(actual) / plan_elapsed:,.0f} rows/s '
+            f'({serializer_elapsed / plan_elapsed:.1f}x)'
+        )
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run benchmarks')
+@override_settings(SECURE_SSL_REDIRECT=False)
+class StatisticsBenchmark(TestCase):
+    """Time the statistics endpoint against 100k seeded participants"""
+
+    @classmethod
+    def setUpTestData(cls):
+        call_command('seed_participants', count=100000, stdout=StringIO())
+        # As after a deploy: the endpoint reads the counters table
+        call_command('rebuild_statistics', stdout=StringIO())
+
+    # Keep the cache traffic out of the query count: only the aggregate is measured
+    @override_settings(CACHES=dict(settings.CACHES, aggregates={'BACKEND': 'django.core.cache.backends.locmem.LocMemCache'}))
+    def test_statistics_100k(self):
+        dashboard_statistics.invalidate()
+        client = APIClient()
+        start = time.perf_counter()
+        with CaptureQueriesContext(connection) as queries:
+            response = client.get('/api/surveys/statistics/')
+        elapsed = time.perf_counter() - start
+
+        self.assertEqual(len(data_queries(queries)), 1)
+
+        self.assertEqual(response.json()['total_participants'], 100000)
+        print(f'\nstatistics over 100k participants: {elapsed * 1000:.1f} ms')
+
+
+@unittest.skipUnless(os.environ.get('RUN_BENCHMARKS'), 'set RUN_BENCHMARKS=1 to run benchmarks')
+@override_settings(SECURE_SSL_REDIRECT=False)
+class FeedbackRenderBenchmark(TestCase):
+    """Per-email render cost with a cold and a warm template_parts() cache"""
+
+    def test_render_1000_emails_cold_and_warm(self):
+        APIClient().post('/api/surveys/submit/', survey_payload(), format='json')
+        participant = Participant.objects.load('student@example.com')
+        context = {
+            'email': participant.email,
+            'location': participant.get_location_display(),
+            'instruments': generate_feedback(participant)['instruments'],
+        }
+
+        def render(cold):
+            start = time.perf_counter()
+            for _ in range(1000):
+                if cold:
+                    template_parts.cache_clear()
+                render_feedback_html(context)
+                render_feedback_text(context)
+            return time.perf_counter() - start
+
+        render(cold=False)
+        cold, warm = render(cold=True), render(cold=False)
+
+        # 1000 emails: total seconds read as ms per email
+        print(f'\nfeedback email render: {cold:.3f} ms cold cache, {warm:.3f} ms warm cache')
+        self.assertLess(warm, cold)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class ExportJobTests(TestCase):
+    def setUp(self):
+        self.client = APIClient()
+        export_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_root)
+        settings_override = override_settings(EXPORT_ROOT=export_root)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+
+        self.client.post('/api/surveys/submit/', survey_payload(email='ec@example.com'), format='json')
+        self.client.post('/api/surveys/submit/', survey_payload(email='cl@example.com', location='CL'), format='json')
+
+    def test_job_lifecycle(self):
+        response = self.client.post('/api/export-jobs/', {'location': 'CL'}, format='json')
+        self.assertEqual(response.status_code, 202)
+        job_url = f"/api/export-jobs/{response.json()['id']}/"
+        self.assertEqual(response.json()['status'], ExportJob.STATUS_QUEUED)
+        self.assertEqual(response.json()['filters'], {'location': 'CL'})
+
+        self.assertEqual(self.client.get(job_url + 'download/').status_code, 409)
+
+        call_command('run_export_worker', '--once', stdout=StringIO())
+
+        job = self.client.get(job_url).json()
+        self.assertEqual(job['status'], ExportJob.STATUS_DONE)
+        self.assertEqual(job['progress'], 100)
+        self.assertEqual(job['total_records'], 1)
+
+        download = self.client.get(job_url + 'download/')
+        self.assertEqual(download.status_code, 200)
+        wb = openpyxl.load_workbook(BytesIO(b''.join(download.streaming_content)))
+        emails = [row[0] for row in wb['Participants'].iter_rows(min_row=2, values_only=True)]
+        self.assertEqual(emails, ['cl@example.com'])
+
+    def test_job_of_a_dead_worker_is_reclaimed(self):
+        job = queue_export_job()
+        self.assertEqual(claim_next_job().pk, job.pk)
+        # Still leased to the first worker
+        self.assertIsNone(claim_next_job())
+
+        ExportJob.objects.filter(pk=job.pk).update(lease_until=timezone.now() - timezone.timedelta(seconds=1))
+        call_command('run_export_worker', '--once', stdout=StringIO())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_DONE)
+        self.assertEqual(job.attempts, 2)
+
+    def test_job_that_keeps_killing_workers_fails(self):
+        job = queue_export_job()
+        ExportJob.objects.filter(pk=job.pk).update(status=ExportJob.STATUS_RUNNING, attempts=3, lease_until=None)
+
+        self.assertIsNone(claim_next_job())
+
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+        self.assertIn('stopped 3 times', job.error)
+
+    def finished_job(self):
+        job = queue_export_job()
+        call_command('run_export_worker', '--once', stdout=StringIO())
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_DONE)
+        return job
+
+    def test_missing_file_fails_the_job(self):
+        job = self.finished_job()
+        os.remove(export_path(job))
+
+        response = self.client.get(f'/api/export-jobs/{job.id}/download/')
+
+        self.assertEqual(response.status_code, 410)
+        job.refresh_from_db()
+        self.assertEqual(job.status, ExportJob.STATUS_FAILED)
+
+    def test_worker_deletes_expired_files(self):
+        job = self.finished_job()
+        ExportJob.objects.filter(pk=job.pk).update(finished_at=timezone.now() - timezone.timedelta(hours=25))
+
+        out = StringIO()
+        call_command('run_export_worker', '--once', stdout=out)
+
+        self.assertIn('Deleted 1 expired export files', out.getvalue())
+        self.assertFalse(os.path.exists(export_path(job)))
+        self.assertEqual(self.client.get(f'/api/export-jobs/{job.id}/download/').status_code, 410)
+
+    def test_invalid_date_is_rejected(self):
+        for value in ['yesterday', '2024-02-30', '2024-13-01', '2024-01-01T25:00']:
+            response = self.client.post('/api/export-jobs/', {'start_date': value}, format='json')
+
+            self.assertEqual(response.status_code, 400, value)
+            self.assertEqual(response.json()['start_date'], ['Formato de fecha inválido (YYYY-MM-DD)'])
+        self.assertFalse(ExportJob.objects.exists())
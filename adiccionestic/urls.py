@@ -1,9 +1,10 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
-from .views import SurveyViewSet
+from .views import SurveyViewSet, ExportJobViewSet
 
 router = DefaultRouter()
 router.register(r'surveys', SurveyViewSet)
+router.register(r'export-jobs', ExportJobViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
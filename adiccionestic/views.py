@@ -1,26 +1,103 @@
-from rest_framework import viewsets, status
+from rest_framework import mixins, viewsets, status
 from rest_framework.decorators import action
+from rest_framework.renderers import JSONRenderer
 from rest_framework.response import Response
-from django.http import HttpResponse
+from django.http import FileResponse, Http404, HttpResponse
+from django.utils.cache import get_conditional_response, patch_cache_control
+from django.utils.http import http_date, quote_etag
 from django.core.mail import send_mail
 from django.template.loader import render_to_string
 from django.conf import settings
-import openpyxl
-from openpyxl.styles import Font, PatternFill, Alignment
+import hashlib
+from collections import Counter
 from datetime import datetime
 from .models import (
-    Participant, BergenTikTok, BergenInstagram,
-    UCLALoneliness, PrefrontalSymptoms, CAIDS
+    INSTRUMENT_RELATIONS, Participant, BergenTikTok, BergenInstagram,
+    UCLALoneliness, PrefrontalSymptoms, CAIDS, ExportJob
 )
 from .serializers import (
-    ParticipantSerializer, SurveySubmissionSerializer,
+    ParticipantSerializer, SurveySubmissionSerializer, ExportJobSerializer,
     BergenTikTokSerializer, BergenInstagramSerializer,
     UCLALonelinessSerializer, PrefrontalSymptomsSerializer,
-    CAIDSSerializer
+    CAIDSSerializer, participant_row_plan, sparse_fields, sparse_queryset
 )
+from .emails import email_status, generate_feedback
+from .feedback_cache import cache_feedback, feedback_cache_stats, get_cached_feedback
+from .instruments import REGISTRY_STAMP
+from .aggregate_cache import aggregate_cache_stats
+from .stats import dashboard_statistics
+from .submissions import upsert_submissions
+from .export_jobs import export_path, mark_export_missing
+from .exports import (
+    ExcelExport, TEXT_FORMATS, filter_participants,
+    streaming_export_response, streaming_file_response, XLSX_CONTENT_TYPE
+)
+from .pagination import KeysetPagination
+from .renderers import XLSXRenderer, CSVRenderer, NDJSONRenderer
 
 from django.views.generic import TemplateView
 
+# Largest upload accepted by submit_batch
+SUBMIT_BATCH_MAX_ITEMS = 1000
+
+
+def lookup_timestamps(email):
+    """Version timestamps of a participant without loading it.
+
+    One indexed lookup by email, LEFT JOINing the instruments' unique
+    participant_id indexes; no instrument rows are loaded. None when the
+    participant does not exist.
+    """
+    rows = list(
+        Participant.objects.filter(email=email).order_by().values_list(
+            'updated_at', *[f'{relation}__updated_at' for relation in INSTRUMENT_RELATIONS]
+        )
+    )
+    return list(rows[0]) if rows else None
+
+
+def loaded_timestamps(participant):
+    """lookup_timestamps() for a participant loaded with its instruments"""
+    timestamps = [participant.updated_at]
+    for relation in INSTRUMENT_RELATIONS:
+        instrument = getattr(participant, relation, None)
+        timestamps.append(instrument.updated_at if instrument is not None else None)
+    return timestamps
+
+
+def participant_validators(request, email, variant, timestamps):
+    """Strong ETag and Last-Modified timestamp for a participant's detail views.
+
+    Returns (None, None) when there are no timestamps (no participant).
+    """
+    if timestamps is None:
+        return None, None
+
+    # Sparse fieldsets and formats change the body, so they are part of the tag
+    params = sorted(request.GET.lists())
+    version = '|'.join([variant, email, repr(params)] + [str(timestamp) for timestamp in timestamps])
+    etag = quote_etag(hashlib.sha256(version.encode('utf-8')).hexdigest())
+    last_modified = max(timestamp for timestamp in timestamps if timestamp is not None)
+    return etag, int(last_modified.timestamp())
+
+
+def conditional_response(request, etag, last_modified):
+    """304 Not Modified when the client's validators still match"""
+    if etag is None:
+        return None
+    return get_conditional_response(request, etag=etag, last_modified=last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    if etag is None or response.status_code != status.HTTP_200_OK:
+        return response
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    # Cache, but revalidate on every poll
+    patch_cache_control(response, private=True, no_cache=True)
+    return response
+
+
 class ExportInterfaceView(TemplateView):
     template_name = 'export_interface.html'
 
@@ -29,6 +106,63 @@ class SurveyViewSet(viewsets.ModelViewSet):
     queryset = Participant.objects.all()
     serializer_class = ParticipantSerializer
     lookup_field = 'email'
+    # Emails contain dots, which the router's default pattern rejects
+    lookup_value_regex = '[^/]+'
+    # ?location=CL&caids__risk_level=high is a filter on indexed columns
+    filterset_fields = ['location'] + [f'{relation}__risk_level' for relation in INSTRUMENT_RELATIONS]
+
+    @property
+    def paginator(self):
+        """Page numbers by default; ?cursor= switches to keyset pagination"""
+        if not hasattr(self, '_paginator') and self.cursor_requested():
+            self._paginator = KeysetPagination()
+        return super().paginator
+
+    def cursor_requested(self):
+        request = getattr(self, 'request', None)
+        return request is not None and KeysetPagination.cursor_query_param in request.query_params
+
+    def list(self, request, *args, **kwargs):
+        if not settings.FAST_PARTICIPANT_LIST:
+            return super().list(request, *args, **kwargs)
+
+        # Same JSON, built from values() rows without model instances
+        fields = self.get_sparse_fields()
+        plan = participant_row_plan(tuple(fields) if fields is not None else None)
+        queryset = self.filter_queryset(super().get_queryset()).values(*plan.columns)
+
+        page = self.paginate_queryset(queryset)
+        if page is not None:
+            return self.get_paginated_response([plan.build(row) for row in page])
+        return Response([plan.build(row) for row in queryset])
+
+    def retrieve(self, request, *args, **kwargs):
+        # Polled after submission: answer 304 before loading anything else
+        email = kwargs['email']
+        etag, last_modified = participant_validators(request, email, 'retrieve', lookup_timestamps(email))
+        not_modified = conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        response = super().retrieve(request, *args, **kwargs)
+        return set_validators(response, etag, last_modified)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action in ('list', 'retrieve'):
+            queryset = sparse_queryset(queryset, self.get_sparse_fields())
+        return queryset
+
+    def get_serializer(self, *args, **kwargs):
+        if self.action in ('list', 'retrieve'):
+            kwargs.setdefault('fields', self.get_sparse_fields())
+        return super().get_serializer(*args, **kwargs)
+
+    def get_sparse_fields(self):
+        """Fields requested with ?fields= / ?include= (None: all of them)"""
+        if not hasattr(self, '_sparse_fields'):
+            self._sparse_fields = sparse_fields(self.request.query_params)
+        return self._sparse_fields
     
     @action(detail=False, methods=['post'])
     def submit(self, request):
@@ -36,11 +170,10 @@ class SurveyViewSet(viewsets.ModelViewSet):
         serializer = SurveySubmissionSerializer(data=request.data)
         
         if serializer.is_valid():
+            # Feedback email is queued in the same transaction and
+            # delivered by run_email_worker
             participant = serializer.save()
-            
-            # Send feedback email
-            self.send_feedback_email(participant)
-            
+
             return Response({
                 'message': 'Encuesta enviada exitosamente',
                 'email': participant.email
@@ -48,620 +181,201 @@ class SurveyViewSet(viewsets.ModelViewSet):
         
         return Response(serializer.errors, status=status.HTTP_400_BAD_REQUEST)
     
+    @action(detail=False, methods=['post'])
+    def submit_batch(self, request):
+        """Submit many surveys at once (offline collection sites)"""
+        items = request.data
+        if not isinstance(items, list):
+            return Response(
+                {'error': 'Se esperaba una lista de encuestas'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        if len(items) > SUBMIT_BATCH_MAX_ITEMS:
+            return Response(
+                {'error': f'Máximo {SUBMIT_BATCH_MAX_ITEMS} encuestas por envío'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+
+        results = [None] * len(items)
+        valid = {}
+        for index, item in enumerate(items):
+            serializer = SurveySubmissionSerializer(data=item)
+            if not serializer.is_valid():
+                results[index] = {'index': index, 'status': 'invalid', 'errors': serializer.errors}
+                continue
+            email = serializer.validated_data['email']
+            if email in valid:
+                # A later upload of the same survey wins
+                results[valid[email][0]] = {'index': valid[email][0], 'email': email, 'status': 'duplicate'}
+            valid[email] = (index, serializer.validated_data)
+
+        saved = upsert_submissions([data for index, data in valid.values()])
+        for (index, data), (participant, created) in zip(valid.values(), saved):
+            results[index] = {
+                'index': index,
+                'email': participant.email,
+                'status': 'created' if created else 'updated',
+            }
+
+        summary = Counter(result['status'] for result in results)
+        return Response({
+            'created': summary['created'],
+            'updated': summary['updated'],
+            'invalid': summary['invalid'],
+            'results': results,
+        })
+
     @action(detail=True, methods=['get'])
     def feedback(self, request, email=None):
         """Get feedback for a participant"""
-        try:
-            participant = Participant.objects.get(email=email)
-            feedback = self.generate_feedback(participant)
-            return Response(feedback)
-        except Participant.DoesNotExist:
-            return Response(
-                {'error': 'Participante no encontrado'},
-                status=status.HTTP_404_NOT_FOUND
-            )
-    
-    @action(detail=False, methods=['get'])
+        # Served from the feedback cache when possible; otherwise one
+        # joined query, with the validators taken from the loaded rows
+        cached = get_cached_feedback(email)
+        if cached is None:
+            try:
+                participant = Participant.objects.load(email)
+            except Participant.DoesNotExist:
+                return Response(
+                    {'error': 'Participante no encontrado'},
+                    status=status.HTTP_404_NOT_FOUND
+                )
+            cached = {'feedback': self.generate_feedback(participant), 'timestamps': loaded_timestamps(participant)}
+            cache_feedback(email, cached['feedback'], cached['timestamps'])
+
+        etag, last_modified = participant_validators(
+            request, email, f'feedback:{REGISTRY_STAMP}', cached['timestamps'],
+        )
+        not_modified = conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+
+        return set_validators(Response(cached['feedback']), etag, last_modified)
+
+    @action(
+        detail=False, methods=['get'],
+        renderer_classes=[JSONRenderer, XLSXRenderer, CSVRenderer, NDJSONRenderer],
+    )
     def export_excel(self, request):
-        """Export all survey data to Excel"""
+        """Export all survey data to Excel (or ?format=csv / ndjson)"""
         # Get filter parameters
         location = request.query_params.get('location', None)
         start_date = request.query_params.get('start_date', None)
         end_date = request.query_params.get('end_date', None)
         
         # Build queryset
-        queryset = Participant.objects.all()
-        
-        if location:
-            queryset = queryset.filter(location=location)
-        
-        if start_date:
-            queryset = queryset.filter(created_at__gte=start_date)
-        
-        if end_date:
-            queryset = queryset.filter(created_at__lte=end_date)
-        
+        queryset = filter_participants(
+            Participant.objects.all(),
+            location=location, start_date=start_date, end_date=end_date,
+        )
+
+        # ?format=csv streams a zip with one CSV per sheet (&layout=wide for
+        # a single CSV, one row per participant); ?format=ndjson one JSON
+        # object per participant
+        export_format = request.query_params.get('format')
+        if export_format == 'json':
+            # JSONRenderer only renders this action's errors; there is no
+            # JSON export, so answer like any other unknown format
+            raise Http404
+        if export_format == 'csv' and request.query_params.get('layout') == 'wide':
+            export_format = 'csv-wide'
+        if export_format in TEXT_FORMATS:
+            timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+            return streaming_export_response(queryset, export_format, f'survey_export_{timestamp}')
+
+        # The workbook is built with write-only sheets and streamed from
+        # disk, keeping memory flat; ?mode=memory keeps the old in-memory
+        # workbook. This does not make a large export finish sooner: when
+        # one can outlast the worker timeout, queue it with POST
+        # /api/export-jobs/ and run_export_worker builds it in the background
+        stream = request.query_params.get('mode') != 'memory'
+
         # Generate Excel file
-        return self._generate_excel_export(queryset)
+        return self._generate_excel_export(queryset, stream=stream)
 
     @action(detail=True, methods=['get'])
     def export_participant(self, request, email=None):
         """Export single participant data to Excel"""
         try:
-            participant = Participant.objects.get(email=email)
-            queryset = Participant.objects.filter(email=email)
-            return self._generate_excel_export(queryset)
+            participant = Participant.objects.load(email)
         except Participant.DoesNotExist:
             return Response(
                 {'error': 'Participante no encontrado'},
                 status=status.HTTP_404_NOT_FOUND
             )
+
+        queryset = Participant.objects.filter(pk=participant.pk)
+        return self._generate_excel_export(queryset, participants=[participant])
+
     @action(detail=False, methods=['get'])
     def statistics(self, request):
         """Get summary statistics of survey data"""
-        total_participants = Participant.objects.count()
-        
-        stats = {
-            'total_participants': total_participants,
-            'by_location': {},
-            'by_gender': {},
-            'instruments': {},
-            'feedback_sent': Participant.objects.filter(feedback_sent=True).count(),
-        }
-        
-        # Location stats
-        for code, name in Participant.LOCATION_CHOICES:
-            count = Participant.objects.filter(location=code).count()
-            stats['by_location'][name] = {
-                'count': count,
-                'percentage': round(count / total_participants * 100, 2) if total_participants > 0 else 0
-            }
-        
-        # Gender stats
-        for code, name in Participant.GENDER_CHOICES:
-            count = Participant.objects.filter(gender=code).count()
-            if count > 0:
-                stats['by_gender'][name] = {
-                    'count': count,
-                    'percentage': round(count / total_participants * 100, 2) if total_participants > 0 else 0
-                }
-        
-        # Instrument completion stats
-        instruments = [
-            ('bergen_tiktok', 'Bergen TikTok'),
-            ('bergen_instagram', 'Bergen Instagram'),
-            ('ucla_loneliness', 'UCLA Loneliness'),
-            ('prefrontal_symptoms', 'Prefrontal Symptoms'),
-            ('caids', 'CAIDS'),
-        ]
-        
-        for attr, name in instruments:
-            count = sum(1 for p in Participant.objects.all() if hasattr(p, attr))
-            stats['instruments'][name] = {
-                'count': count,
-                'percentage': round(count / total_participants * 100, 2) if total_participants > 0 else 0
-            }
-        
-        return Response(stats)
+        return Response(dashboard_statistics())
+
+    @action(detail=False, methods=['get'])
+    def email_status(self, request):
+        """Outbox backlog plus circuit breaker state and send latency"""
+        return Response(email_status())
+
+    @action(detail=False, methods=['get'])
+    def cache_status(self, request):
+        """Feedback and aggregate cache counters of the worker answering"""
+        return Response({'feedback': feedback_cache_stats(), 'aggregates': aggregate_cache_stats()})
     
-    def _generate_excel_export(self, queryset):
+    def _generate_excel_export(self, queryset, stream=True, participants=None):
         """Generate Excel file with survey data"""
-        # Create workbook
-        wb = openpyxl.Workbook()
-        wb.remove(wb.active)
-        
-        # Create sheets
-        self._create_participants_sheet(wb, queryset)
-        self._create_bergen_tiktok_sheet(wb, queryset)
-        self._create_bergen_instagram_sheet(wb, queryset)
-        self._create_ucla_loneliness_sheet(wb, queryset)
-        self._create_prefrontal_symptoms_sheet(wb, queryset)
-        self._create_caids_sheet(wb, queryset)
-        self._create_summary_sheet(wb, queryset)
-        
-        # Prepare response
-        response = HttpResponse(
-            content_type='application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'
-        )
+        export = ExcelExport(queryset, stream=stream, participants=participants)
+
         timestamp = datetime.now().strftime('%Y%m%d_%H%M%S')
-        response['Content-Disposition'] = f'attachment; filename=survey_export_{timestamp}.xlsx'
-        
-        wb.save(response)
+        filename = f'survey_export_{timestamp}.xlsx'
+
+        if stream:
+            return streaming_file_response(export.save, filename)
+
+        # Prepare response
+        response = HttpResponse(content_type=XLSX_CONTENT_TYPE)
+        response['Content-Disposition'] = f'attachment; filename={filename}'
+
+        export.save(response)
         return response
-    
-    def _create_participants_sheet(self, wb, queryset):
-        """Create participants data sheet"""
-        ws = wb.create_sheet("Participants")
-        
-        headers = [
-            'Email', 'Location', 'Country', 'Age', 'Gender', 'Gender Other',
-            'Living With', 'Living With Other', 'University', 'Career',
-            'Current Semester', 'Marital Status', 'Mother Education',
-            'Father Education', 'Mother Age', 'Father Age', 'GPA Last Semester',
-            'Repeated Cycles', 'Repeated Cycles Count', 'Residence Sector',
-            'Socioeconomic Level', 'Income Sources', 
-             'uses_conversational_ai', 'ai_daily_hours_weekday', 'ai_daily_hours_weekend', 'ai_start_age', 'ai_use_purpose',
-             'has_tiktok_account', 'tiktok_daily_hours_weekday', 'tiktok_daily_hours_weekend', 'tiktok_start_age',
-             'has_instagram_account', 'instagram_daily_hours_weekday', 'instagram_daily_hours_weekend', 'instagram_start_age',
-             'parents_control_screen_time', 'has_stable_friend_group', 'has_frequent_positive_communication', 'participates_in_social_activities',
-              'Consent Accepted',
-            'Consent Date', 'Feedback Sent', 'Created At'
-        ]
-        
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            row = [
-                participant.email,
-                participant.get_location_display(),
-                participant.country or '',
-                participant.age or '',
-                participant.get_gender_display() if participant.gender else '',
-                participant.gender_other or '',
-                participant.get_living_with_display() if participant.living_with else '',
-                participant.living_with_other or '',
-                participant.university or '',
-                participant.career or '',
-                participant.get_current_semester_display() if participant.current_semester else '',
-                participant.get_marital_status_display() if participant.marital_status else '',
-                float(participant.gpa_last_semester) if participant.gpa_last_semester else '',
-                'Yes' if participant.repeated_cycles else 'No',
-                participant.repeated_cycles_count or '',
-                participant.get_residence_sector_display() if participant.residence_sector else '',
-                participant.get_socioeconomic_level_display() if participant.socioeconomic_level else '',
-                participant.income_sources or '',
-                
-                'Yes' if participant.uses_conversational_ai else 'No',
-                participant.ai_daily_hours_weekday if participant.uses_conversational_ai else '',
-                participant.ai_daily_hours_weekend if participant.uses_conversational_ai else '',
-                participant.ai_start_age if participant.uses_conversational_ai else '',
-                participant.ai_use_purpose if participant.uses_conversational_ai else '',
-                'Yes' if participant.has_tiktok_account else 'No',
-                participant.tiktok_daily_hours_weekday if participant.has_tiktok_account else '',
-                participant.tiktok_daily_hours_weekend if participant.has_tiktok_account else '',
-                participant.tiktok_start_age if participant.has_tiktok_account else '',
-                'Yes' if participant.has_instagram_account else 'No',
-                participant.instagram_daily_hours_weekday if participant.has_instagram_account else '',
-                participant.instagram_daily_hours_weekend if participant.has_instagram_account else '',
-                participant.instagram_start_age if participant.has_instagram_account else '',
-                'Yes' if participant.parents_control_screen_time else 'No',
-                'Yes' if participant.has_stable_friend_group else 'No',
-                'Yes' if participant.has_frequent_positive_communication else 'No',
-                'Yes' if participant.participates_in_social_activities else 'No',
-                'Yes' if participant.consent_accepted else 'No',
-                participant.consent_date.strftime('%Y-%m-%d %H:%M:%S') if participant.consent_date else '',
-                'Yes' if participant.feedback_sent else 'No',
-                participant.created_at.strftime('%Y-%m-%d %H:%M:%S') if participant.created_at else '',
-            ]
-            ws.append(row)
-        
-        self._auto_adjust_columns(ws)
-    
-    def _create_bergen_tiktok_sheet(self, wb, queryset):
-        """Create Bergen TikTok sheet"""
-        ws = wb.create_sheet("Bergen TikTok")
-        
-        headers = [
-            'Email', 'Q1 Salience', 'Q2 Tolerance', 'Q3 Mood Modification',
-            'Q4 Relapse', 'Q5 Withdrawal', 'Q6 Conflict', 'Total Score',
-            'Feedback', 'Created At'
-        ]
-        
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'bergen_tiktok'):
-                bt = participant.bergen_tiktok
-                ws.append([
-                    participant.email, bt.q1_salience, bt.q2_tolerance,
-                    bt.q3_mood_modification, bt.q4_relapse, bt.q5_withdrawal,
-                    bt.q6_conflict, bt.total_score, bt.get_feedback(),
-                    bt.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-        
-        self._auto_adjust_columns(ws)
-    
-    def _create_bergen_instagram_sheet(self, wb, queryset):
-        """Create Bergen Instagram sheet"""
-        ws = wb.create_sheet("Bergen Instagram")
-        
-        headers = [
-            'Email', 'Q1 Salience', 'Q2 Tolerance', 'Q3 Mood Modification',
-            'Q4 Relapse', 'Q5 Withdrawal', 'Q6 Conflict', 'Total Score',
-            'Feedback', 'Created At'
-        ]
-        
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'bergen_instagram'):
-                bi = participant.bergen_instagram
-                ws.append([
-                    participant.email, bi.q1_salience, bi.q2_tolerance,
-                    bi.q3_mood_modification, bi.q4_relapse, bi.q5_withdrawal,
-                    bi.q6_conflict, bi.total_score, bi.get_feedback(),
-                    bi.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-        
-        self._auto_adjust_columns(ws)
-    
-    def _create_ucla_loneliness_sheet(self, wb, queryset):
-        """Create UCLA Loneliness sheet"""
-        ws = wb.create_sheet("UCLA Loneliness")
-        
-        headers = ['Email'] + [f'Q{i}' for i in range(1, 11)] + ['Total Score', 'Feedback', 'Created At']
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'ucla_loneliness'):
-                ul = participant.ucla_loneliness
-                row = [participant.email]
-                row.extend([getattr(ul, f'q{i}') for i in range(1, 11)])
-                row.extend([
-                    ul.total_score, ul.get_feedback(),
-                    ul.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-                ws.append(row)
-        
-        self._auto_adjust_columns(ws)
-    
-    def _create_prefrontal_symptoms_sheet(self, wb, queryset):
-        """Create Prefrontal Symptoms sheet"""
-        ws = wb.create_sheet("Prefrontal Symptoms")
-        
-        headers = ['Email'] + [f'Q{i}' for i in range(1, 21)] + ['Total Score', 'Feedback', 'Created At']
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'prefrontal_symptoms'):
-                ps = participant.prefrontal_symptoms
-                row = [participant.email]
-                row.extend([getattr(ps, f'q{i}') for i in range(1, 21)])
-                row.extend([
-                    ps.total_score, ps.get_feedback(),
-                    ps.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-                ws.append(row)
-        
-        self._auto_adjust_columns(ws)
-    
-    def _create_caids_sheet(self, wb, queryset):
-        """Create CAIDS sheet"""
-        ws = wb.create_sheet("CAIDS")
-        
-        headers = ['Email'] + [f'Q{i}' for i in range(1, 21)] + ['Total Score', 'Feedback', 'Created At']
-        self._write_header_row(ws, headers)
-        
-        for participant in queryset:
-            if hasattr(participant, 'caids'):
-                caids = participant.caids
-                row = [participant.email]
-                row.extend([getattr(caids, f'q{i}') for i in range(1, 21)])
-                row.extend([
-                    caids.total_score, caids.get_feedback(),
-                    caids.created_at.strftime('%Y-%m-%d %H:%M:%S')
-                ])
-                ws.append(row)
-        
-        self._auto_adjust_columns(ws)
-    
-    def _create_summary_sheet(self, wb, queryset):
-        """Create summary sheet"""
-        ws = wb.create_sheet("Summary", 0)
-        
-        ws['A1'] = 'SURVEY DATA EXPORT'
-        ws['A1'].font = Font(size=16, bold=True)
-        
-        ws['A3'] = 'Export Date:'
-        ws['B3'] = datetime.now().strftime('%Y-%m-%d %H:%M:%S')
-        ws['A4'] = 'Total Records:'
-        ws['B4'] = queryset.count()
-        
-        self._auto_adjust_columns(ws)
-    
-    def _write_header_row(self, ws, headers):
-        """Write styled header row"""
-        ws.append(headers)
-        
-        header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
-        header_font = Font(color='FFFFFF', bold=True)
-        
-        for cell in ws[1]:
-            cell.fill = header_fill
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center', vertical='center')
-    
-    def _auto_adjust_columns(self, ws):
-        """Auto-adjust column widths"""
-        for column in ws.columns:
-            max_length = 0
-            column_letter = column[0].column_letter
-            
-            for cell in column:
-                try:
-                    if len(str(cell.value)) > max_length:
-                        max_length = len(str(cell.value))
-                except:
-                    pass
-            
-            adjusted_width = min(max_length + 2, 50)
-            ws.column_dimensions[column_letter].width = adjusted_width
 
     def generate_feedback(self, participant):
         """Generate feedback for all completed instruments"""
-        feedback = {
-            'email': participant.email,
-            'instruments': {}
-        }
-        
-        if hasattr(participant, 'bergen_tiktok'):
-            feedback['instruments']['bergen_tiktok'] = {
-                'score': participant.bergen_tiktok.total_score,
-                'feedback': participant.bergen_tiktok.get_feedback()
-            }
-        
-        if hasattr(participant, 'bergen_instagram'):
-            feedback['instruments']['bergen_instagram'] = {
-                'score': participant.bergen_instagram.total_score,
-                'feedback': participant.bergen_instagram.get_feedback()
-            }
-        
-        if hasattr(participant, 'ucla_loneliness'):
-            feedback['instruments']['ucla_loneliness'] = {
-                'score': participant.ucla_loneliness.total_score,
-                'feedback': participant.ucla_loneliness.get_feedback()
-            }
-        
-        if hasattr(participant, 'prefrontal_symptoms'):
-            feedback['instruments']['prefrontal_symptoms'] = {
-                'score': participant.prefrontal_symptoms.total_score,
-                'feedback': participant.prefrontal_symptoms.get_feedback()
-            }
-        
-        if hasattr(participant, 'caids'):
-            feedback['instruments']['caids'] = {
-                'score': participant.caids.total_score,
-                'feedback': participant.caids.get_feedback()
-            }
-        
-        return feedback
-    
-    def send_feedback_email(self, participant):
-        """Send feedback email to participant using Mailgun"""
-        from django.core.mail import EmailMultiAlternatives
-        from django.template.loader import render_to_string
-        
-        feedback = self.generate_feedback(participant)
-        
-        subject = 'Resultados de tu Encuesta Psicológica'
-        
-        # Create email context
-        context = {
-            'email': participant.email,
-            'location': participant.get_location_display(),
-            'instruments': feedback['instruments'],
-        }
-        
-        # Render HTML template
-        html_message = self._render_feedback_html(context)
-        
-        # Create plain text version
-        text_message = self._render_feedback_text(context)
-        
-        # Create email with both plain text and HTML
-        email = EmailMultiAlternatives(
-            subject=subject,
-            body=text_message,
-            from_email=settings.DEFAULT_FROM_EMAIL,
-            to=[participant.email],
-        )
-        
-        # Attach HTML version
-        email.attach_alternative(html_message, "text/html")
-        
+        return generate_feedback(participant)
+
+
+class ExportJobViewSet(mixins.CreateModelMixin, mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """Background exports: POST to queue, GET to poll, download when done"""
+    queryset = ExportJob.objects.all()
+    serializer_class = ExportJobSerializer
+
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        serializer.save()
+        return Response(serializer.data, status=status.HTTP_202_ACCEPTED)
+
+    @action(detail=True, methods=['get'])
+    def download(self, request, pk=None):
+        """Download a finished export"""
+        job = self.get_object()
+
+        if job.status == ExportJob.STATUS_EXPIRED:
+            return Response(
+                {'error': 'La exportación expiró; solicítela de nuevo', 'status': job.status},
+                status=status.HTTP_410_GONE
+            )
+        if job.status != ExportJob.STATUS_DONE:
+            return Response(
+                {'error': 'La exportación aún no está lista', 'status': job.status},
+                status=status.HTTP_409_CONFLICT
+            )
+
         try:
-            # Send email via Mailgun
-            result = email.send()
-            
-            if result:
-                participant.feedback_sent = True
-                participant.save()
-                print(f"✅ Email sent successfully to {participant.email}")
-            else:
-                print(f"⚠️ Email sending returned False for {participant.email}")
-                
-        except Exception as e:
-            print(f"❌ Error sending email to {participant.email}: {e}")
-            raise
-
-    def _render_feedback_html(self, context):
-        """Render HTML email template"""
-        from django.template.loader import render_to_string
-        
-        html = f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <meta charset="utf-8">
-            <style>
-                body {{
-                    font-family: 'Segoe UI', Tahoma, Geneva, Verdana, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                }}
-                .container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                    padding: 20px;
-                    background-color: #f9f9f9;
-                }}
-                .header {{
-                    background: linear-gradient(135deg, #6C63FF 0%, #8B7FFF 100%);
-                    color: white;
-                    padding: 30px;
-                    border-radius: 10px 10px 0 0;
-                    text-align: center;
-                }}
-                .header h1 {{
-                    margin: 0;
-                    font-size: 28px;
-                    font-weight: bold;
-                }}
-                .content {{
-                    background: white;
-                    padding: 30px;
-                }}
-                .instrument {{
-                    margin: 20px 0;
-                    padding: 15px;
-                    background: #f5f5f5;
-                    border-left: 4px solid #6C63FF;
-                    border-radius: 5px;
-                }}
-                .instrument-title {{
-                    font-size: 16px;
-                    font-weight: bold;
-                    color: #6C63FF;
-                    margin: 0 0 10px 0;
-                }}
-                .instrument-score {{
-                    font-size: 14px;
-                    color: #666;
-                    margin: 5px 0;
-                }}
-                .instrument-feedback {{
-                    font-size: 16px;
-                    font-weight: bold;
-                    color: #333;
-                    margin: 10px 0 0 0;
-                    padding: 10px;
-                    background: white;
-                    border-radius: 5px;
-                }}
-                .feedback-low {{
-                    background-color: #d4edda;
-                    color: #155724;
-                }}
-                .feedback-moderate {{
-                    background-color: #fff3cd;
-                    color: #856404;
-                }}
-                .feedback-high {{
-                    background-color: #f8d7da;
-                    color: #721c24;
-                }}
-                .footer {{
-                    background: #f5f5f5;
-                    padding: 20px;
-                    border-radius: 0 0 10px 10px;
-                    text-align: center;
-                    font-size: 12px;
-                    color: #666;
-                }}
-                .disclaimer {{
-                    padding: 15px;
-                    background: #e7f3ff;
-                    border-left: 4px solid #2196F3;
-                    margin: 20px 0;
-                    font-size: 13px;
-                    color: #0c5aa0;
-                    border-radius: 5px;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>🎉 Encuesta Completada</h1>
-                    <p>Aquí están tus resultados</p>
-                </div>
-                
-                <div class="content">
-                    <p>Hola,</p>
-                    <p>Gracias por completar nuestra encuesta psicológica. A continuación encontrarás el resumen de tus resultados:</p>
-                    
-                    <div style="margin: 30px 0;">
-        """
-        
-        # Add instrument results
-        instrument_names = {
-            'bergen_tiktok': '📱 Bergen TikTok - Escala de Adicción a TikTok',
-            'bergen_instagram': '📸 Bergen Instagram - Escala de Adicción a Instagram',
-            'ucla_loneliness': '👥 UCLA - Escala de Soledad',
-            'prefrontal_symptoms': '🧠 Síntomas Prefrontales - Inventario Abreviado',
-            'caids': '🤖 CAIDS - Dependencia de IA Conversacional',
-        }
-        
-        for instrument, data in context['instruments'].items():
-            feedback_class = self._get_feedback_class(data['feedback'])
-            html += f"""
-                    <div class="instrument">
-                        <div class="instrument-title">{instrument_names.get(instrument, instrument)}</div>
-                        <div class="instrument-score">Puntuación: {data['score']}</div>
-                        <div class="instrument-feedback feedback-{feedback_class}">
-                            {data['feedback']}
-                        </div>
-                    </div>
-            """
-        
-        html += """
-                    </div>
-                    
-                    <div class="disclaimer">
-                        <strong>⚠️ Descargo de Responsabilidad:</strong><br>
-                        Estos resultados son solo para fines informativos y no constituyen un diagnóstico clínico. 
-                        Si tienes preocupaciones sobre tu salud mental o bienestar, te recomendamos consultar con un 
-                        profesional de la salud mental calificado.
-                    </div>
-                    
-                    <p>Si tienes preguntas sobre tus resultados o la encuesta, no dudes en contactarnos.</p>
-                </div>
-                
-                <div class="footer">
-                    <p>&copy; 2025 Estudio de Evaluación Psicológica. Todos los derechos reservados.</p>
-                    <p>Este es un correo automatizado. Por favor no respondas a este mensaje.</p>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
-        return html
-
-    def _render_feedback_text(self, context):
-        """Render plain text email"""
-        text = "RESULTADOS DE TU ENCUESTA PSICOLÓGICA\n"
-        text += "=" * 50 + "\n\n"
-        text += f"Correo: {context['email']}\n"
-        text += f"Ubicación: {context['location']}\n\n"
-        
-        instrument_names = {
-            'bergen_tiktok': 'Bergen TikTok - Escala de Adicción a TikTok',
-            'bergen_instagram': 'Bergen Instagram - Escala de Adicción a Instagram',
-            'ucla_loneliness': 'UCLA - Escala de Soledad',
-            'prefrontal_symptoms': 'Síntomas Prefrontales - Inventario Abreviado',
-            'caids': 'CAIDS - Dependencia de IA Conversacional',
-        }
-        
-        for instrument, data in context['instruments'].items():
-            text += f"{instrument_names.get(instrument, instrument)}\n"
-            text += "-" * 50 + "\n"
-            text += f"Puntuación: {data['score']}\n"
-            text += f"Resultado: {data['feedback']}\n\n"
-        
-        text += "=" * 50 + "\n"
-        text += "DESCARGO DE RESPONSABILIDAD:\n"
-        text += "Estos resultados son solo para fines informativos y no constituyen\n"
-        text += "un diagnóstico clínico. Si tienes preocupaciones sobre tu salud mental,\n"
-        text += "te recomendamos consultar con un profesional calificado.\n\n"
-        text += "Equipo de Investigación"
-        
-        return text
-
-    def _get_feedback_class(self, feedback_text):
-        """Determine CSS class for feedback styling"""
-        if 'bajo' in feedback_text.lower() or 'mínimo' in feedback_text.lower():
-            return 'low'
-        elif 'moderado' in feedback_text.lower() or 'leve' in feedback_text.lower():
-            return 'moderate'
-        else:
-            return 'high'
\ No newline at end of file
+            fileobj = open(export_path(job), 'rb')
+        except FileNotFoundError:
+            job = mark_export_missing(job)
+            return Response(
+                {'error': 'El archivo de la exportación ya no existe; solicítela de nuevo', 'status': job.status},
+                status=status.HTTP_410_GONE
+            )
+        return FileResponse(fileobj, as_attachment=True, filename=job.file_name)
@@ -25,6 +25,7 @@ BASE_DIR = Path(__file__).resolve().parent.parent
 #SECRET_KEY = config('SECRET_KEY')
 #DEBUG = config('DEBUG', cast=bool)
 import os
+import tempfile
 SECRET_KEY = os.getenv("SECRET_KEY", "asdf567&908-ADDF34")
 DEBUG = os.getenv("DEBUG", "False") == "True"
 
@@ -158,6 +159,33 @@ DATABASES = {
     )
 }
 
+# Feedback responses are cached per participant (adiccionestic/feedback_cache.py).
+# Every web worker and management command must see the same entries, or one
+# worker's invalidation leaves another serving stale feedback, so the default
+# is a database cache table (created by 'createcachetable' on release).
+# FileBasedCache on a LOCATION shared by every process works too; locmem is
+# private to each process and 'manage.py check' warns about it.
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'feedback': {
+        'BACKEND': config('FEEDBACK_CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('FEEDBACK_CACHE_LOCATION', default='feedback_cache'),
+        'TIMEOUT': config('FEEDBACK_CACHE_TIMEOUT', default=3600, cast=int),
+        'OPTIONS': {'MAX_ENTRIES': config('FEEDBACK_CACHE_MAX_ENTRIES', default=100000, cast=int)},
+    },
+    # Dashboard aggregates (adiccionestic/aggregate_cache.py); entries expire
+    # on their own once past AGGREGATE_CACHE_TTL + AGGREGATE_CACHE_STALE_TTL.
+    # Shared for the same reason: processes waiting on another's computation
+    # read its result from here
+    'aggregates': {
+        'BACKEND': config('AGGREGATE_CACHE_BACKEND', default='django.core.cache.backends.db.DatabaseCache'),
+        'LOCATION': config('AGGREGATE_CACHE_LOCATION', default='aggregate_cache'),
+        'TIMEOUT': None,
+    },
+}
+
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': [],  # No authentication for now
     'DEFAULT_PERMISSION_CLASSES': [],       # No permissions for now
@@ -193,9 +221,12 @@ AUTH_PASSWORD_VALIDATORS = [
 
 # Email Configuration
 EMAIL_BACKEND = config('EMAIL_BACKEND')
+# Seconds a send may take before it fails (SMTP backend and Mailgun API calls)
+EMAIL_TIMEOUT = config('EMAIL_TIMEOUT', default=10, cast=float)
 ANYMAIL = {
     "MAILGUN_API_KEY": config('MAILGUN_API_KEY'),
     "MAILGUN_SENDER_DOMAIN": config('MAILGUN_SENDER_DOMAIN'),
+    "REQUESTS_TIMEOUT": EMAIL_TIMEOUT,
     # For EU region:
     # "MAILGUN_API_URL": "https://api.eu.mailgun.net/v3",
 }
@@ -237,6 +268,25 @@ STATIC_ROOT = os.path.join(BASE_DIR, 'staticfiles')
 # WhiteNoise storage
 STATICFILES_STORAGE = 'whitenoise.storage.CompressedManifestStaticFilesStorage'
 
+# Files generated by background export jobs. run_export_worker writes them and
+# the web process serves them, so both must see the same directory (one host,
+# or a volume mounted into both); the download answers 410 for a missing file.
+EXPORT_ROOT = os.getenv('EXPORT_ROOT', os.path.join(BASE_DIR, 'exports'))
+# Finished export files are deleted by run_export_worker after this many hours
+EXPORT_RETENTION_HOURS = int(os.getenv('EXPORT_RETENTION_HOURS', '24'))
+
+# Build GET /api/surveys/ from values() rows instead of ParticipantSerializer
+FAST_PARTICIPANT_LIST = os.getenv('FAST_PARTICIPANT_LIST', 'False') == 'True'
+
+# Cached dashboard aggregates are served as-is for AGGREGATE_CACHE_TTL seconds,
+# then served stale while one worker recomputes them for up to
+# AGGREGATE_CACHE_STALE_TTL more
+AGGREGATE_CACHE_TTL = config('AGGREGATE_CACHE_TTL', default=30, cast=int)
+AGGREGATE_CACHE_STALE_TTL = config('AGGREGATE_CACHE_STALE_TTL', default=300, cast=int)
+# Lock files coalescing aggregate computations when the database has no
+# advisory locks (PostgreSQL uses pg_try_advisory_lock instead)
+AGGREGATE_LOCK_DIR = os.getenv('AGGREGATE_LOCK_DIR', tempfile.gettempdir())
+
 
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.2/ref/settings/#default-auto-field